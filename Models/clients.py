@@ -0,0 +1,54 @@
+"""
+Fábricas preguiçosas (lazy) dos clientes de IA.
+
+Os SDKs da OpenAI e do Gemini são pesados para importar e os clientes só são necessários quando
+um relatório é efetivamente gerado. Cada cliente é criado no primeiro uso, de forma thread-safe,
+e compartilhado pelas chamadas seguintes.
+
+Funções:
+- get_openai_client: Cliente `OpenAI` compartilhado.
+- get_gemini_client: Cliente `genai.Client` compartilhado.
+"""
+
+import os
+import threading
+
+
+# GLOBALS
+
+gemini_key: str | None = os.environ.get("GEMINI_API_KEY")
+openai_key: str | None = os.environ.get("OPENAI_API_KEY")
+
+_lock = threading.Lock()
+_openai_client = None
+_gemini_client = None
+
+
+def get_openai_client():
+    """
+    ### 🔑 get_openai_client
+    Returns the shared `OpenAI` client, creating it on first use (thread-safe).
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                _openai_client = OpenAI(api_key=openai_key)
+    return _openai_client
+
+
+def get_gemini_client():
+    """
+    ### 🔑 get_gemini_client
+    Returns the shared `genai.Client`, creating it on first use (thread-safe).
+    """
+    global _gemini_client
+    if _gemini_client is None:
+        with _lock:
+            if _gemini_client is None:
+                from google import genai
+
+                _gemini_client = genai.Client(api_key=gemini_key)
+    return _gemini_client
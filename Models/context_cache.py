@@ -0,0 +1,176 @@
+"""
+Cache de contexto no provedor para as instruções de sistema grandes.
+
+As instruções de `Prompts/instructions.yaml` têm dezenas de KB e são as mesmas em todos os
+relatórios de um lote. Enviadas como prefixo estável, o provedor reaproveita o processamento:
+
+- Gemini: a instrução vira um `CachedContent` (criado uma vez por modelo e instrução, renovado
+  enquanto o lote dura e apagado no fim); cada relatório só envia o documento.
+- OpenAI: o cache de prefixo é automático; basta a instrução vir sempre primeiro, sozinha na
+  mensagem de sistema, e o documento depois.
+
+O `ContextCache` também soma os tokens de entrada com e sem cache de cada chamada, para o resumo
+do lote.
+
+Classes:
+- ContextCache: Caches do Gemini e contabilidade de tokens de um lote.
+"""
+
+import hashlib
+import threading
+import time
+
+from Models.clients import get_gemini_client
+from Models.workers import PROVIDER_OPENAI, PROVIDER_GEMINI
+
+
+# GLOBALS
+
+DEFAULT_CONTEXT_CACHE = {
+    "enabled": True,
+    "ttl": 3600,  # segundos de vida do cache no Gemini
+    "refresh_margin": 300,  # renova o TTL quando faltar menos que isso
+}
+
+
+class ContextCache:
+    """
+    ### 🧠 ContextCache
+    Provider-side caches of system instructions for one batch of reports, plus cached/uncached token accounting.
+
+    ### 🖥️ Parameters
+        - `ttl` (`int`, optional): Lifetime of each Gemini cache, in seconds. Defaults to the `context_cache`
+          section of `config.yaml` (`3600`).
+        - `enabled` (`bool`, optional): Create Gemini caches. With `False` only tokens are counted. Same default source.
+
+    ### 💡 Example
+    >>> context_cache = ContextCache()
+    >>> GeminiReport(name, "gemini-2.5-pro", legacy_prompt, context_cache=context_cache)
+    >>> context_cache.summary()
+    'gemini: 2 calls, 41230 of 96544 input tokens cached (42.7%), 55314 uncached; context caches: 1'
+    >>> context_cache.close()
+
+    ### 📚 Notes
+    - One Gemini cache per (model, instruction hash), created on the first report that needs it and shared by the
+      threads of the batch. Its TTL is extended while the batch is still using it.
+    - A cache that cannot be created (instruction below the model's minimum, unsupported model) is not retried in
+      the batch: those reports send the instruction as `system_instruction`, uncached.
+    - `close()` deletes the caches this batch created, so nothing is billed for storage after it.
+    """
+
+    def __init__(self, ttl: int | None = None, enabled: bool | None = None):
+        from Tools import load_config_section
+
+        config = load_config_section("context_cache", DEFAULT_CONTEXT_CACHE)
+        self.ttl = int(ttl if ttl is not None else config["ttl"])
+        self.enabled = bool(enabled if enabled is not None else config["enabled"])
+        self.refresh_margin = float(config["refresh_margin"])
+        self._lock = threading.Lock()
+        self._caches: dict[tuple[str, str], tuple[str, float] | None] = {}
+        self._usage: dict[str, dict[str, int]] = {}
+        self.created = 0
+
+    def gemini_cache(self, model: str, system_instruction: str) -> str | None:
+        """
+        ### 🧠 gemini_cache
+        Name of the `CachedContent` holding `system_instruction` for `model`, created on first use, or `None`
+        when caching is off or not possible for it.
+        """
+        if not self.enabled or not system_instruction:
+            return None
+        key = (model, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+        # Um lock só: criar o cache de uma instrução duas vezes custaria mais do que esperar
+        with self._lock:
+            if key in self._caches:
+                entry = self._caches[key]
+                if entry is not None and entry[1] - time.monotonic() < self.refresh_margin:
+                    entry = self._caches[key] = self._refresh(entry[0])
+                return entry[0] if entry is not None else None
+            entry = self._caches[key] = self._create(model, system_instruction, key[1])
+            return entry[0] if entry is not None else None
+
+    def _create(self, model: str, system_instruction: str, digest: str) -> tuple[str, float] | None:
+        """Caller holds the lock."""
+        from google.genai import types
+
+        try:
+            cache = get_gemini_client().caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"eproc-{digest[:12]}",
+                    system_instruction=system_instruction,
+                    ttl=f"{self.ttl}s",
+                ),
+            )
+        except Exception as e:
+            print(f"[🧠]: context cache not created for {model}, instruction sent uncached: {str(e)}")
+            return None
+        print(f"[🧠]: context cache {cache.name} created for {model} ({len(system_instruction)} characters)")
+        self.created += 1
+        return cache.name, time.monotonic() + self.ttl
+
+    def _refresh(self, name: str) -> tuple[str, float] | None:
+        """Caller holds the lock."""
+        from google.genai import types
+
+        try:
+            get_gemini_client().caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s"))
+        except Exception as e:
+            print(f"[🧠]: context cache {name} could not be extended: {str(e)}")
+            return None
+        return name, time.monotonic() + self.ttl
+
+    def invalidate(self, model: str, system_instruction: str) -> None:
+        """Stops using the cache of this instruction (e.g. it expired on the provider side)."""
+        key = (model, hashlib.sha256(system_instruction.encode("utf-8")).hexdigest())
+        with self._lock:
+            self._caches[key] = None
+
+    def record(self, provider: str, input_tokens: int | None, cached_tokens: int | None,
+               output_tokens: int | None) -> None:
+        """Adds the usage of one call."""
+        with self._lock:
+            usage = self._usage.setdefault(provider, {"calls": 0, "input": 0, "cached": 0, "output": 0})
+            usage["calls"] += 1
+            usage["input"] += input_tokens or 0
+            usage["cached"] += cached_tokens or 0
+            usage["output"] += output_tokens or 0
+
+    def record_gemini(self, response) -> None:
+        """Usage from a Gemini `GenerateContentResponse` (`usage_metadata`)."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.record(PROVIDER_GEMINI, usage.prompt_token_count, usage.cached_content_token_count,
+                        usage.candidates_token_count)
+
+    def record_openai(self, response) -> None:
+        """Usage from an OpenAI `ChatCompletion` (`usage.prompt_tokens_details.cached_tokens`)."""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.record(PROVIDER_OPENAI, usage.prompt_tokens, getattr(details, "cached_tokens", 0),
+                        usage.completion_tokens)
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = []
+            for provider, usage in sorted(self._usage.items()):
+                share = usage["cached"] / usage["input"] if usage["input"] else 0.0
+                parts.append(
+                    f"{provider}: {usage['calls']} calls, {usage['cached']} of {usage['input']} input tokens "
+                    f"cached ({share:.1%}), {usage['input'] - usage['cached']} uncached"
+                )
+        return "; ".join(parts or ["no model calls"]) + f"; context caches: {self.created}"
+
+    def close(self) -> None:
+        """Deletes the Gemini caches created by this batch."""
+        with self._lock:
+            names = [entry[0] for entry in self._caches.values() if entry is not None]
+            self._caches = {}
+            # Relatórios que ainda terminarem depois disso seguem sem cache
+            self.enabled = False
+        for name in names:
+            try:
+                get_gemini_client().caches.delete(name=name)
+            except Exception as e:
+                print(f"[🧠]: context cache {name} not deleted (it expires by TTL): {str(e)}")
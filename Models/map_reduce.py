@@ -0,0 +1,234 @@
+"""
+Resumo map-reduce, com orçamento de tokens, para textos de OCR grandes demais para o relatório.
+
+Processos enormes estouram o contexto do modelo ou pagam centenas de milhares de tokens de peças
+processuais. Acima de `max_input_tokens` (medidos com `Tools.count_tokens`), o texto é dividido em
+trechos de até `chunk_tokens`, nas fronteiras de documento do índice de segmentos
+(`<processo>.segments.json`) ou, sem ele, nas fronteiras de página. Cada trecho é resumido em
+paralelo por um modelo barato, que guarda só a evidência médica, e o relatório final é feito sobre
+os resumos. Os resumos passam pelo cache de respostas, então um trecho que não mudou nunca é
+resumido duas vezes.
+
+Funções:
+- measure_tokens: Tokens de um texto para o modelo do relatório.
+- plan_chunks: Divide o texto em trechos dentro do orçamento.
+- condense: Devolve o texto original ou, se grande demais, a evidência condensada.
+"""
+
+import json
+import os
+import re
+import time
+
+from Models.clients import get_openai_client, get_gemini_client
+from Models.workers import get_report_pool, PROVIDER_OPENAI, PROVIDER_GEMINI
+from Models.response_cache import cached_response
+
+
+# GLOBALS
+
+DEFAULT_MAP_REDUCE = {
+    "enabled": True,
+    "max_input_tokens": 200000,  # acima disso o relatório é feito sobre os resumos
+    "chunk_tokens": 40000,
+    "openai_model": "gpt-4o-mini",
+    "gemini_model": "gemini-2.5-flash",
+}
+CHARS_PER_TOKEN = 4  # estimativa quando o modelo não tem tokenizador em `count_tokens`
+
+# Mesmos marcadores de página e sufixo do índice de `cloud_ocr` (sem importar a pilha de OCR)
+PAGE_PATTERN = re.compile(
+    r"------------ Inicio da pagina (\d+) ------------\n\n(.*?)\n\n------------ Fim da pagina \1 ------------",
+    re.DOTALL,
+)
+SEGMENT_SUFFIX = ".segments.json"
+
+MAP_INSTRUCTION = """Você recebe um trecho do texto (OCR) de um processo judicial previdenciário.
+Extraia apenas o que importa para uma perícia médica: documentos médicos (laudos, atestados, receitas,
+exames, prontuários, perícias anteriores), com tipo, data, médico, CRM, CID e achados; dados pessoais e
+profissionais do autor (escolaridade, ocupações, datas); DER, DCB, DID, DII, benefícios e quesitos.
+Cite a página de cada informação como (p. N). Mantenha datas, CIDs e números exatamente como no texto.
+Ignore peças e atos puramente processuais. Se o trecho não tiver nada disso, responda apenas: SEM EVIDÊNCIA MÉDICA.
+Responda em texto simples, sem markdown."""
+
+
+def measure_tokens(text: str, model: str) -> int:
+    """
+    ### 🔢 measure_tokens
+    Tokens of `text` for `model`, measured with `Tools.count_tokens`; models it does not know are estimated at
+    `CHARS_PER_TOKEN` characters per token.
+    """
+    try:
+        from Tools import count_tokens
+
+        return count_tokens(text, model, "input")[0]
+    except Exception:
+        return len(text) // CHARS_PER_TOKEN
+
+
+def _pages(text: str) -> list[tuple[int, str]]:
+    """`(page number, page with its markers)` in file order; text without markers counts as one page."""
+    pages = [(int(match.group(1)), match.group(0)) for match in PAGE_PATTERN.finditer(text)]
+    return pages or [(0, text)]
+
+
+def _segment_units(pages: list[tuple[int, str]], output_path: str | None) -> list[list[tuple[int, str]]]:
+    """Groups the pages by document of the segment index, or one unit per page without it."""
+    index_path = f"{os.path.splitext(output_path)[0]}{SEGMENT_SUFFIX}" if output_path else None
+    if index_path is None or not os.path.exists(index_path):
+        return [[page] for page in pages]
+    try:
+        with open(index_path, "r", encoding="utf-8") as file:
+            segments = json.load(file)["segments"]
+    except Exception as e:
+        print(f"[🧩]: segment index unreadable, splitting on pages: {str(e)}")
+        return [[page] for page in pages]
+    unit_of = {}
+    for number, segment in enumerate(segments):
+        for page_num in range(segment["start"], segment["end"] + 1):
+            unit_of[page_num] = number
+    units: list[list[tuple[int, str]]] = []
+    last = object()
+    for page in pages:
+        unit = unit_of.get(page[0], ("page", page[0]))
+        if units and unit == last:
+            units[-1].append(page)
+        else:
+            units.append([page])
+        last = unit
+    return units
+
+
+def plan_chunks(text: str, chunk_tokens: int, tokens_per_char: float,
+                output_path: str | None = None) -> list[str]:
+    """
+    ### 🧩 plan_chunks
+    Splits an OCR text into chunks of at most `chunk_tokens` tokens.
+
+    ### 📌 Notes
+    - Documents of the segment index are packed whole while they fit; a document over the budget is split on
+      its pages, and a single page over the budget on characters.
+    - Page markers are kept, so the summaries can cite pages.
+    """
+    budget_chars = max(1, int(chunk_tokens / max(tokens_per_char, 1e-9)))
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            chunks.append("".join(current))
+        current, size = [], 0
+
+    def add(piece: str):
+        nonlocal size
+        if size + len(piece) > budget_chars:
+            flush()
+        for start in range(0, len(piece), budget_chars):
+            part = piece[start:start + budget_chars]
+            if size + len(part) > budget_chars:
+                flush()
+            current.append(part)
+            size += len(part)
+
+    for unit in _segment_units(_pages(text), output_path):
+        unit_size = sum(len(page) for _, page in unit)
+        if unit_size <= budget_chars:
+            if size + unit_size > budget_chars:
+                flush()
+            current.extend(page for _, page in unit)
+            size += unit_size
+        else:
+            for _, page in unit:
+                add(page)
+    flush()
+    return chunks
+
+
+def _summarize_chunk(provider: str, model: str, chunk: str, use_cache: bool, context_cache) -> str:
+    """Map step: the medical evidence of one chunk, from the cheap model (or the response cache)."""
+
+    def generate() -> str | None:
+        if provider == PROVIDER_GEMINI:
+            from google.genai import types
+
+            response = get_gemini_client().models.generate_content(
+                model=model,
+                contents=[types.Content(role="user", parts=[types.Part(text=chunk)])],
+                config=types.GenerateContentConfig(system_instruction=MAP_INSTRUCTION, temperature=0.2),
+            )
+            if context_cache is not None:
+                context_cache.record_gemini(response)
+            return response.text if response else None
+        response = get_openai_client().chat.completions.create(
+            model=model,
+            messages=[{"role": "system", "content": MAP_INSTRUCTION}, {"role": "user", "content": chunk}],
+            temperature=0.2,
+        )
+        if context_cache is not None:
+            context_cache.record_openai(response)
+        return response.choices[0].message.content
+
+    summary = cached_response(provider, model, {"temperature": 0.2, "stage": "map"}, MAP_INSTRUCTION, chunk,
+                              generate, use_cache)
+    if not summary:
+        raise RuntimeError("empty chunk summary")
+    return summary
+
+
+def condense(text: str, provider: str, report_model: str, output_path: str | None = None,
+             use_cache: bool = True, context_cache=None) -> str:
+    """
+    ### 🧩 condense
+    Returns `text` unchanged when it fits the `map_reduce` budget of `config.yaml`, and otherwise the medical
+    evidence of each chunk, summarized in parallel by the provider's cheap model.
+
+    ### 🖥️ Parameters
+        - `text` (`str`): The OCR text (`Output/<processo>.txt`).
+        - `provider` (`str`): `"openai"` or `"gemini"`; the chunks go to that provider's cheap model.
+        - `report_model` (`str`): Model of the final report, whose tokenizer measures `text`.
+        - `output_path` (`str`, optional): Path of `text`, to find its segment index. Defaults to `None` (pages only).
+        - `use_cache` (`bool`, optional): Reuse chunk summaries from the response cache. Defaults to `True`.
+        - `context_cache` (`ContextCache`, optional): Batch token accounting. Defaults to `None`.
+
+    ### 🔄 Returns
+    - `str`: The text for the final report.
+
+    #### ⚠️ Raises
+    - `Exception`: If a chunk cannot be summarized; the report then fails instead of running on partial evidence.
+
+    ### 💡 Example
+    >>> content = condense(content, "gemini", "gemini-2.5-pro", "Output/50085259120254047102.txt")
+    """
+    from Tools import load_config_section
+
+    config = load_config_section("map_reduce", DEFAULT_MAP_REDUCE)
+    if not config["enabled"]:
+        return text
+    tokens = measure_tokens(text, report_model)
+    if tokens <= int(config["max_input_tokens"]):
+        return text
+
+    start = time.time()
+    map_model = config["gemini_model"] if provider == PROVIDER_GEMINI else config["openai_model"]
+    chunks = plan_chunks(text, int(config["chunk_tokens"]), tokens / max(len(text), 1), output_path)
+    # Pool próprio: o relatório que espera aqui já ocupa uma vaga do pool de relatórios
+    pool = get_report_pool(provider, "chunk")
+    handles = [
+        pool.submit(f"chunk {number}", _summarize_chunk, provider, map_model, chunk, use_cache, context_cache)
+        for number, chunk in enumerate(chunks, start=1)
+    ]
+    summaries = []
+    for number, (handle, chunk) in enumerate(zip(handles, chunks), start=1):
+        pages = [match.group(1) for match in PAGE_PATTERN.finditer(chunk)]
+        span = f"páginas {pages[0]}-{pages[-1]}" if pages else "sem marcador de página"
+        summaries.append(f"=== Trecho {number} de {len(chunks)} ({span}) ===\n{handle.result().strip()}\n")
+    condensed = "\n".join(summaries)
+    name = os.path.basename(output_path) if output_path else "text"
+    print(
+        f"[🧩]: {name}: {tokens} tokens over the {config['max_input_tokens']} budget, {len(chunks)} chunks "
+        f"summarized with {map_model} -> {measure_tokens(condensed, report_model)} tokens "
+        f"({time.time() - start:.0f}s)"
+    )
+    return condensed
@@ -20,30 +20,30 @@ Dependências:
 """
 
 import os
-import threading
-from openai import OpenAI
 import json
 import time
 from threading import Event
 import sys
 import shutil
 import base64
-from google.genai import types
-from google import genai
 
 
 # Add the parent directory to path so Python can find your modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-# GLOBALS
-
-gemini_key:str | None = os.environ.get("GEMINI_API_KEY")
-openai_key:str | None = os.environ.get("OPENAI_API_KEY")
+from Models.clients import get_openai_client, get_gemini_client
+from Models.workers import (
+    ReportHandle, ReportPool, report_provider, get_report_pool, iter_completed, summarize,
+    PROVIDER_GEMINI, PROVIDER_OPENAI,
+)
+from Models.response_cache import cached_response, get_response_cache
+from Models.context_cache import ContextCache
+from Models.map_reduce import condense
 
+# GLOBALS
+# Os clientes da OpenAI e do Gemini são criados no primeiro uso (ver Models/clients.py)
 
-if gemini_key:
-    genai.Client(api_key=gemini_key)
 #!GENERATION CONFIG
 generation_config = {
  "temperature": 0.5,
@@ -55,7 +55,6 @@ generation_config = {
 
 # Adicione uma variável global para controlar o estado do template
 template_ready = Event()
-client = OpenAI(api_key=openai_key)
 
 def markdown_to_text(markdown_content):
     """
@@ -94,7 +93,8 @@ def markdown_to_text(markdown_content):
 
     return plain_text
 
-def GPTReport(name: str, model: str, system_instruction: str, reasoning_effort: str = "high", threaded: bool = False):
+def GPTReport(name: str, model: str, system_instruction: str, reasoning_effort: str = "high", threaded: bool = False,
+              use_cache: bool = True, context_cache: ContextCache | None = None, map_reduce: bool = True):
     """### 📝 GPTReport
     Generates a medical report from a given text using the `OPENAI` models. This function can operate either synchronously or asynchronously in a separate thread.
 
@@ -103,10 +103,17 @@ def GPTReport(name: str, model: str, system_instruction: str, reasoning_effort:
         - `model` (`str`): The identifier of the model to be used for report generation.
         - `system_instruction` (`str`): Instructions provided to the system for processing.
         - `reasoning_effort` (`str`, optional): The effort level for reasoning. Defaults to `medium`.
-        - `threaded` (`bool`, optional): If set to `True`, the function runs in a separate thread. Defaults to `False`.
+        - `threaded` (`bool`, optional): If set to `True`, the report runs on the shared OpenAI report pool
+          (see `Models/workers.py`) and a handle is returned at once. Defaults to `False`.
+        - `use_cache` (`bool`, optional): Reuse the response of an identical earlier request (same model, settings,
+          instruction and input) from the response cache (see `Models/response_cache.py`). Defaults to `True`.
+        - `context_cache` (`ContextCache`, optional): Batch accounting of cached and uncached input tokens. Defaults to `None`.
+        - `map_reduce` (`bool`, optional): When the text is over the `map_reduce` token budget of `config.yaml`, report on
+          chunk summaries from a cheap model instead of the whole text (see `Models/map_reduce.py`). Defaults to `True`.
 
     #### 🔄 Returns
-        - `None`: The function does not return a value but writes the output to a file.
+        - `bool`: Whether the report was written. The report itself goes to a file.
+        - `ReportHandle`: With `threaded=True`; its `result()` is that `bool`.
 
     #### ⚠️ Raises
         - `FileNotFoundError`: If the specified input file does not exist.
@@ -114,6 +121,8 @@ def GPTReport(name: str, model: str, system_instruction: str, reasoning_effort:
 
     #### 📌 Notes
     - The generated report is saved in the `Reports` directory with the filename format: `{name}_final_report.md`.
+    - The instruction always goes first, alone in the system message, and the document after it: the stable prefix
+      is what OpenAI's automatic prompt caching reuses on every report after the first.
 
     #### 💡 Example
 
@@ -131,6 +140,8 @@ def GPTReport(name: str, model: str, system_instruction: str, reasoning_effort:
             with open(file_path, "r", encoding="utf-8") as f:
                 print(f"Reading file {name}")
                 prompt = f.read()
+                if map_reduce:
+                    prompt = condense(prompt, PROVIDER_OPENAI, model, file_path, use_cache, context_cache)
                 print("Requesting report generation")
                 config = {
                     "model": model,
@@ -150,21 +161,29 @@ def GPTReport(name: str, model: str, system_instruction: str, reasoning_effort:
                     config.pop("temperature")
                     config["reasoning_effort"] = reasoning_effort
 
-                response = client.chat.completions.create(**config)
-                content = response.choices[0].message.content
+                def generate() -> str | None:
+                    response = get_openai_client().chat.completions.create(**config)
+                    if context_cache is not None:
+                        context_cache.record_openai(response)
+                    return response.choices[0].message.content
+
+                settings = {key: value for key, value in config.items() if key != "messages"}
+                content = cached_response(PROVIDER_OPENAI, model, settings, system_instruction, prompt, generate, use_cache)
                 # Use os.path.splitext to drop the extension without leaving a trailing dot
                 base_name = os.path.splitext(name)[0]
                 output_path = os.path.join(".", "Reports", f"{base_name}_final_report.md")
                 with open(output_path, "w", encoding="utf-8") as f:
                     f.write(f"{content}")
                 print(f"Final report generated and saved to {output_path}")
+                return True
 
         except Exception as e:
             print(f"Error processing page {name}: {str(e)}")
+            return False
 
 
     if threaded:
-        threading.Thread(target=wrapper, args=(name,)).start()
+        return get_report_pool(PROVIDER_OPENAI).submit(name, wrapper, name)
     else:
         return wrapper(name)
 
@@ -183,7 +202,7 @@ def clean_and_validate_json(content):
         print("Conteúdo não é um JSON válido após limpeza.")
         return None
 
-def MiniTemplate(model: str, file_path: str, template_event) -> None:
+def MiniTemplate(model: str, file_path: str, template_event, use_cache: bool = True) -> ReportHandle:
     """### 📝 MiniTemplate
     Organizes text using model specified to generate a structured output.
 
@@ -191,9 +210,12 @@ def MiniTemplate(model: str, file_path: str, template_event) -> None:
     - `model` (`str`): The model identifier to be used for processing.
     - `file_path` (`str`): The path to the input file containing the text to be organized.
     - `template_event` (`Event`, optional): A threading event (Barrier) to signal when the template is ready. Defaults to None.
+    - `use_cache` (`bool`, optional): Reuse the template of an identical earlier request from the response cache.
+      Defaults to `True`.
 
     #### 🔄 Returns
-    - `None`: The function does not return a value but writes the output to a file.
+    - `ReportHandle`: Handle of the job on the shared OpenAI report pool; its `result()` is `True` once the
+      template is written to `laudo_template.json`, `False` on failure.
 
     #### ⚠️ Raises
     - `FileNotFoundError`: If the specified file path does not exist.
@@ -201,7 +223,7 @@ def MiniTemplate(model: str, file_path: str, template_event) -> None:
 
     #### 📌 Notes
     - Ensure the file at `file_path` is accessible and contains valid text data.
-    - The function leverages threading for asynchronous processing when `template_event` is provided.
+    - The template is generated on the report pool; `template_event` is also set when it is ready.
 
     #### 💡 Example
 
@@ -216,9 +238,7 @@ def MiniTemplate(model: str, file_path: str, template_event) -> None:
             with open(file_path, "r", encoding="utf-8") as f:
                 prompt = f.read()
             print(f"Awaking {model}")
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
+            messages = [
                     {
                         "role": "system",
                         "content": """
@@ -371,10 +391,14 @@ Retorne APENAS o JSON abaixo, sem markdown ou formatação adicional:
                         "role": "user",
                         "content": f"CONTEUDO PROCESSUAL: {prompt}",
                     },
-                ],
-                temperature=0.3,
+                ]
+            content: str | None = cached_response(
+                PROVIDER_OPENAI, model, {"temperature": 0.3}, messages[0]["content"], messages[1]["content"],
+                lambda: get_openai_client().chat.completions.create(
+                    model=model, messages=messages, temperature=0.3,
+                ).choices[0].message.content,
+                use_cache,
             )
-            content:str | None = response.choices[0].message.content
             print("Saving template")
 
             with open(os.path.join(".", "laudo_template.json"), "w", encoding="utf-8") as f:
@@ -383,14 +407,18 @@ Retorne APENAS o JSON abaixo, sem markdown ou formatação adicional:
             # Set the event to signal template is ready
             if template_event:
                 template_event.set()
+            return True
 
         except Exception as e:
             print(f"Error processing template: {str(e)}")
+            return False
 
-    threading.Thread(target=wrapper, args=(file_path, template_event)).start()
+    return get_report_pool(PROVIDER_OPENAI).submit(file_path, wrapper, file_path, template_event)
 
 
-def GeminiReport(name: str, model_name: str, system_instruction: str, threaded: bool = False) -> None | bool:
+def GeminiReport(name: str, model_name: str, system_instruction: str, threaded: bool = False,
+                 use_cache: bool = True, context_cache: ContextCache | None = None,
+                 map_reduce: bool = True) -> bool | ReportHandle:
     """
     ## 📝 Generate the Final Report from PDF
 
@@ -402,11 +430,20 @@ def GeminiReport(name: str, model_name: str, system_instruction: str, threaded:
         - `name` (`str`): The name of the input file to process.
         - `system_instruction` (`str`): The system instruction to use.
         - `model_name` (`str`): The name of the model to use.
-        - `threaded` (`bool, optional`): Whether to run the function in a new thread. Defaults to `False`.
+        - `threaded` (`bool, optional`): Whether to run the report on the shared Gemini report pool (see
+          `Models/workers.py`) and return a `ReportHandle` at once, whose `result()` is the `bool`. Defaults to `False`.
+        - `use_cache` (`bool, optional`): Reuse the response of an identical earlier request from the response cache
+          (see `Models/response_cache.py`). Defaults to `True`.
+        - `context_cache` (`ContextCache, optional`): Batch-wide Gemini context cache: the instruction is cached once on
+          the provider and each report only sends the document. Defaults to `None` (instruction sent with every call).
+        - `map_reduce` (`bool, optional`): When the text is over the `map_reduce` token budget of `config.yaml`, report on
+          chunk summaries from a cheap model instead of the whole text (see `Models/map_reduce.py`). Defaults to `True`.
 
 
     #### 📌 Notes
         - The output file will be written to the `Reports` directory and will have the filename: `{name}_final_report.md`.
+        - The instruction goes as `system_instruction` (or inside the context cache), never in the user content, so the
+          prefix is the same for every document.
 
 
     >>> GeminiReport("patient_file.pdf", model="gemini-1.5-flash-latest", threaded=True)
@@ -428,7 +465,8 @@ def GeminiReport(name: str, model_name: str, system_instruction: str, threaded:
             print(f"Starting GeminiReport for file: {name}")
 
             print("Initializing Gemini client...")
-            gemini_client = genai.Client(api_key=gemini_key)
+            from google.genai import types
+            gemini_client = get_gemini_client()
 
             #!CHECKING FILE PATH
             if not os.path.exists(md_path):
@@ -439,6 +477,8 @@ def GeminiReport(name: str, model_name: str, system_instruction: str, threaded:
             with open(md_path, "r", encoding="utf-8") as f:
                 content = f.read()
                 print(f"Content read. File size: {len(content)} characters")
+            if map_reduce:
+                content = condense(content, PROVIDER_GEMINI, model_name, md_path, use_cache, context_cache)
 
             #!PATH FOR THE REPORT FILE
             # Use os.path.splitext to drop the extension without leaving a trailing dot
@@ -451,21 +491,35 @@ def GeminiReport(name: str, model_name: str, system_instruction: str, threaded:
             start_time = time.time()
             try:
                 print("Generating content...")
-                response = gemini_client.models.generate_content(
-                    model=model_name,
-                    contents=[
-                        types.Content(
-                            role="user",
-                            parts=[
-                                types.Part(text=system_instruction),
-                                types.Part(text=f"DOCUMENTO:{content}")
-                            ]
-                        )
-                    ]
-                )
-                if response:
+
+                contents = [types.Content(role="user", parts=[types.Part(text=f"DOCUMENTO:{content}")])]
+                uncached = types.GenerateContentConfig(system_instruction=system_instruction)
+
+                def generate() -> str | None:
+                    cache_name = context_cache.gemini_cache(model_name, system_instruction) if context_cache else None
+                    if cache_name:
+                        try:
+                            response = gemini_client.models.generate_content(
+                                model=model_name, contents=contents,
+                                config=types.GenerateContentConfig(cached_content=cache_name),
+                            )
+                        except Exception as e:
+                            # Cache expirado ou apagado no provedor: segue sem ele
+                            print(f"[🧠]: context cache {cache_name} unusable, sending the instruction: {str(e)}")
+                            context_cache.invalidate(model_name, system_instruction)
+                            response = gemini_client.models.generate_content(
+                                model=model_name, contents=contents, config=uncached)
+                    else:
+                        response = gemini_client.models.generate_content(
+                            model=model_name, contents=contents, config=uncached)
+                    if context_cache is not None:
+                        context_cache.record_gemini(response)
+                    return response.text if response else None
+
+                settings = {"system_instruction": "config"}
+                answer = cached_response(PROVIDER_GEMINI, model_name, settings, system_instruction, content, generate, use_cache)
+                if answer:
                     print("Content generated. Processing response...")
-                    answer = response.text
                     print(f"Writing response to file: {output_path}")
                     with open( os.path.join(".", "Reports", f"{base_name}_final_report.md"), "w", encoding="utf-8") as f:
                         f.write("\n" + answer)
@@ -488,15 +542,26 @@ def GeminiReport(name: str, model_name: str, system_instruction: str, threaded:
             print(f"Error in GeminiReport: {str(e)}")
             return False
 
-    print(f"Starting GeminiReport in a new thread for file: {name}.md")
     if threaded:
-        t = threading.Thread(target=wrapper, args=(name,))
-        t.start()
-
+        print(f"Starting GeminiReport in the report pool for file: {name}")
+        return get_report_pool(PROVIDER_GEMINI).submit(name, wrapper, name)
     else:
         return wrapper(name)
 
-def Generate_Final_Report(model, system_instruction, reasoning_effort: str = "medium")-> None:
+def _move_processed(name: str) -> None:
+    """
+    Moves an OCR output and its sidecars (segment index, word layout, medical-only text), if any, to 'Output/Processed'.
+    """
+    shutil.move(os.path.join("Output", name), os.path.join("Output", "Processed", name))
+    for suffix in (".segments.json", ".layout.bin", ".medical.txt"):
+        sidecar = f"{os.path.splitext(name)[0]}{suffix}"
+        if os.path.exists(os.path.join("Output", sidecar)):
+            shutil.move(os.path.join("Output", sidecar), os.path.join("Output", "Processed", sidecar))
+
+
+def Generate_Final_Report(model, system_instruction, reasoning_effort: str = "medium",
+                          max_concurrency: int | None = None, timeout: float | None = None,
+                          use_cache: bool = True) -> None:
     """
     ### 📄 Generate_Final_Report
     Coordinates the creation of a final report for each file in the 'Output' directory using the specified model and system instructions. The function supports multiple model types (e.g., 'gemini', 'gpt', 'o1', 'o3', 'o4-mini') and moves processed files to the 'Processed' subdirectory. This function is intended for batch processing of output files and assumes the presence of required report generation classes and a valid directory structure.
@@ -505,6 +570,13 @@ def Generate_Final_Report(model, system_instruction, reasoning_effort: str = "me
         - `model` (`str`): The name of the model to use for report generation. Must include one of the supported model identifiers (e.g., 'gemini', 'gpt', 'o1', 'o3', 'o4-mini').
         - `system_instruction` (`str`): Instruction string that guides the report generation process for the selected model.
         - `reasoning_effort` (`str`, optional): The reasoning effort level for `GPT reasoning models - "o" series. Defaults to "medium"`.
+        - `max_concurrency` (`int`, optional): Reports generated at the same time. Defaults to the provider's limit in the
+          `report_concurrency` section of `config.yaml`, shared with every other batch of the same provider.
+        - `timeout` (`float`, optional): Seconds to wait for the whole batch. Reports still queued after it are
+          cancelled and their files stay in 'Output'; reports already sent to the provider are waited for, since
+          they run to the end anyway. Defaults to `None` (no limit).
+        - `use_cache` (`bool`, optional): Answer unchanged requests from the response cache
+          (`Cache/llm_responses.sqlite3`); `False` always calls the model. Defaults to `True`.
 
     ### 🔄 Returns
         - `None`: This function performs file operations and report generation but does not return a value.
@@ -512,6 +584,13 @@ def Generate_Final_Report(model, system_instruction, reasoning_effort: str = "me
     ### ⚠️ Raises
         - `Exception`: Raised if an error occurs during report generation or file movement, with a descriptive message indicating the context and source of the error.
 
+    ### 📌 Notes
+    - Each file is a `ReportHandle` in the provider's pool; reports are written as they complete, in any order.
+    - The batch summary reports the outcome and latency of every file, and the input tokens served from the provider's
+      prompt cache (see `Models/context_cache.py`). Gemini context caches created for the batch are deleted at the end,
+      once no report of the batch is running.
+    - A file moves to 'Output/Processed' only after its report succeeds. Failed files stay in 'Output' for the next run.
+
     ### 💡 Example
 
     >>> Generate_Final_Report('gemini', 'Summarize the case details')
@@ -520,35 +599,88 @@ def Generate_Final_Report(model, system_instruction, reasoning_effort: str = "me
 
 
     try:
-        output_items = [item for item in os.listdir("Output") if os.path.isfile(os.path.join("Output", item))]
-
-        if output_items:
-            if "gemini" in model:
-                for name in output_items:
-                     GeminiReport(name, model, system_instruction)
-                     shutil.move(os.path.join("Output", name), os.path.join("Output", "Processed", name))
-
-            elif "gpt" in model or "o1" in model or "o3" in model or "o4-mini" in model:
-                for name in output_items:
-                    GPTReport(name, model, system_instruction, reasoning_effort)
-                    shutil.move(os.path.join("Output", name), os.path.join("Output", "Processed", name))
+        # Só os .txt são entradas; o índice de segmentos (.segments.json) acompanha o .txt
+        output_items = [
+            item for item in os.listdir("Output")
+            if os.path.isfile(os.path.join("Output", item)) and item.endswith(".txt")
+            and not item.endswith(".medical.txt")
+        ]
+
+        provider = report_provider(model)
+        if output_items and provider is not None:
+            def report(name: str) -> bool:
+                if provider == PROVIDER_GEMINI:
+                    return GeminiReport(name, model, system_instruction, use_cache=use_cache, context_cache=context_cache)
+                return GPTReport(name, model, system_instruction, reasoning_effort, use_cache=use_cache,
+                                 context_cache=context_cache)
+
+            pool = ReportPool(max_concurrency, name=f"report-{provider}") if max_concurrency else get_report_pool(provider)
+            start = time.time()
+            cache_before = get_response_cache().stats() if use_cache else None
+            # A instrução é a mesma para o lote inteiro: vai uma vez para o cache do provedor
+            context_cache = ContextCache()
+            handles = []
+            moved = set()
+
+            def collect(handle) -> None:
+                try:
+                    done = handle.result()
+                except Exception as e:
+                    print(f"Error generating the report of {handle.name}: {str(e)}")
+                    done = False
+                if done:
+                    _move_processed(handle.name)
+                    moved.add(handle.name)
+
+            try:
+                handles = [pool.submit(name, report, name) for name in output_items]
+                # Cada relatório é tratado assim que termina, na ordem em que terminam
+                for handle in iter_completed(handles, timeout):
+                    collect(handle)
+            finally:
+                # Os já enviados ao provedor terminam de qualquer jeito e usam os caches de contexto:
+                # espera por eles antes de apagar os caches e de fechar o resumo
+                running = [handle for handle in handles if not handle.done()]
+                if running:
+                    print(f"[⏳]: waiting for {len(running)} reports already sent to {provider}")
+                    for handle in iter_completed(running):
+                        collect(handle)
+                if max_concurrency:
+                    pool.shutdown(wait=True, cancel_pending=True)
+                context_cache.close()
+            stats = [handle.stats() for handle in handles]
+            print(f"[📝]: {len(stats)} reports in {time.time() - start:.0f}s: {summarize(stats)}")
+            kept = sorted(set(output_items) - moved)
+            if kept:
+                print(f"[⚠️]: report failed or not done in time, files kept in Output: {kept}")
+            print(f"[🧠]: prompt tokens: {context_cache.summary()}")
+            if cache_before is not None:
+                cache_after = get_response_cache().stats()
+                print(
+                    f"[🗄️]: response cache: {cache_after['hits'] - cache_before['hits']} hits, "
+                    f"{cache_after['misses'] - cache_before['misses']} misses (model calls)"
+                )
     except Exception as e:
         print(f"Erro Detectado: {e}")
 
-def Gemini_PDF_Report(model:str, system_instruction:str, file:str)-> None:
+def Gemini_PDF_Report(model:str, system_instruction:str, file:str, use_cache: bool = True)-> None:
     """
     ### 📄 Gemini_Generate_Report
-    Generates a final report for a given file using the Gemini model.
+    Generates a final report for a given file using the Gemini model. With `use_cache`, an identical earlier request
+    (same model, settings, instruction and PDF bytes) is answered from the response cache.
     """
+    from google.genai import types
+
     parts = []
     name: str = file.split("-")[1]
     print("File Name is: ", name)
 
     with open(file, "rb") as f:
-        parts.append(types.Part.from_bytes(
-        mime_type="application/pdf",
-        data=base64.b64encode(f.read()).decode("utf-8"),
-        ))
+        pdf_bytes = f.read()
+    parts.append(types.Part.from_bytes(
+    mime_type="application/pdf",
+    data=base64.b64encode(pdf_bytes).decode("utf-8"),
+    ))
 
     try:
         print("Sending request to Gemini model...")
@@ -566,16 +698,19 @@ def Gemini_PDF_Report(model:str, system_instruction:str, file:str)-> None:
             response_mime_type="text/plain",
             system_instruction=system_instruction,
         )
-        gemini_client = genai.Client(api_key=gemini_key)
 
-        response = gemini_client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=generate_content_config,
-        )
-        if response:
+        def generate() -> str | None:
+            response = get_gemini_client().models.generate_content(
+                model=model,
+                contents=contents,
+                config=generate_content_config,
+            )
+            return response.text if response else None
+
+        settings = {"temperature": 0.6, "thinking_budget": 32768, "response_mime_type": "text/plain"}
+        answer = cached_response(PROVIDER_GEMINI, model, settings, system_instruction, pdf_bytes, generate, use_cache)
+        if answer:
             print("Response received from Gemini model...")
-            answer = response.text
             with open(os.path.join(".", "Reports", f"{name}_final_report.md"), "w", encoding="utf-8") as f:
                 f.write(markdown_to_text(answer))
             print("Report saved successfully")
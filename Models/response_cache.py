@@ -0,0 +1,216 @@
+"""
+Cache persistente das respostas dos modelos de IA.
+
+Gerar de novo o relatório de um processo que não mudou (depois de uma queda, ou de uma correção
+que não mexe no prompt) cobra a chamada inteira outra vez e espera minutos pela resposta. As
+respostas ficam num arquivo SQLite, endereçadas pelo conteúdo: provedor, modelo, configuração de
+geração, hash da instrução de sistema e hash do texto de entrada. Qualquer mudança em um deles
+é uma chave nova. Entradas expiram após um TTL e, acima do limite de tamanho, as menos usadas
+são apagadas.
+
+Classes:
+- ResponseCache: O cache em si (thread-safe).
+
+Funções:
+- get_response_cache: Instância compartilhada, criada no primeiro uso.
+- cached_response: Consulta o cache e, na falta, chama o modelo e guarda a resposta.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# GLOBALS
+
+DEFAULT_RESPONSE_CACHE_PATH = os.path.join("Cache", "llm_responses.sqlite3")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB de respostas
+DEFAULT_TTL = 30 * 24 * 3600  # 30 dias
+EVICTION_TARGET = 0.9  # ao estourar o limite, reduz para 90%
+
+_lock = threading.Lock()
+_response_cache = None
+
+
+def _digest(data: str | bytes) -> str:
+    return hashlib.sha256(data.encode("utf-8") if isinstance(data, str) else data).hexdigest()
+
+
+class ResponseCache:
+    """
+    ### 🗄️ ResponseCache
+    Persistent cache of model responses backed by SQLite, with a time-to-live and least-recently-used
+    eviction once the stored responses exceed `max_bytes`.
+
+    ### 🖥️ Parameters
+        - `path` (`str`, optional): SQLite file. Defaults to `Cache/llm_responses.sqlite3`.
+        - `max_bytes` (`int`, optional): Size budget for the stored responses. Defaults to 256 MB.
+        - `ttl` (`float`, optional): Seconds a response stays valid; `0` never expires. Defaults to 30 days.
+
+    ### 💡 Example
+    >>> cache = ResponseCache()
+    >>> key = cache.key_for("gemini", "gemini-2.5-pro", {"temperature": 0.5}, system_instruction, content)
+    >>> cache.get(key) is None
+    True
+    >>> cache.put(key, "texto do relatorio")
+
+    ### 📚 Notes
+    - Same design as `cloud_ocr.cache.PageCache`: one connection behind a lock, WAL mode so several runs can
+      share the file, `hits` and `misses` counted since the instance was created.
+    - An expired entry counts as a miss and is deleted when found.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESPONSE_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+            self._conn.commit()
+            self._size = self._total_size()
+
+    @staticmethod
+    def key_for(provider: str, model: str, config: dict, system_instruction: str, content: str | bytes) -> str:
+        """
+        Hash of everything that decides the response: provider, model, generation config (any JSON-able dict),
+        the system instruction and the input (text or file bytes), each hashed on its own.
+        """
+        parts = {
+            "provider": provider,
+            "model": model,
+            "config": config,
+            "system": _digest(system_instruction or ""),
+            "input": _digest(content),
+        }
+        return _digest(json.dumps(parts, sort_keys=True, default=str))
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached response for `key` or `None` on a miss (also when expired)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._size -= row[1]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = "") -> None:
+        """Stores the response for `key` and evicts the least recently used ones if over budget."""
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            # Substituir uma resposta existente não pode somar o tamanho dela duas vezes
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._conn.commit()
+            self._size += size - (row[0] if row is not None else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _total_size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Deletes expired, then least recently used responses until under `EVICTION_TARGET` of the budget. Caller holds the lock."""
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        # Outro processo pode ter escrito no mesmo arquivo: recalcula antes de apagar
+        self._size = self._total_size()
+        target = int(self.max_bytes * EVICTION_TARGET)
+        if self._size <= self.max_bytes:
+            self._conn.commit()
+            return
+        removed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if self._size - removed <= target:
+                break
+            victims.append((key,))
+            removed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._conn.commit()
+        self._size -= removed
+
+    def stats(self) -> dict:
+        """Hit and miss counters plus the current stored size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    ### 🗄️ get_response_cache
+    Returns the shared `ResponseCache`, creating it on first use (thread-safe).
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
+
+
+def cached_response(provider: str, model: str, config: dict, system_instruction: str, content: str | bytes,
+                    generate, use_cache: bool = True) -> str | None:
+    """
+    ### 🗄️ cached_response
+    Returns the cached response for this request or calls `generate()` and caches its (non-empty) result.
+    `use_cache=False` bypasses the cache in both directions.
+
+    ### 💡 Example
+    >>> text = cached_response("openai", model, {"temperature": 0.3}, system_instruction, prompt, lambda: call(prompt))
+    """
+    if not use_cache:
+        return generate()
+    cache = get_response_cache()
+    key = cache.key_for(provider, model, config, system_instruction, content)
+    response = cache.get(key)
+    if response is not None:
+        print(f"[🗄️]: {model} response served from the response cache")
+        return response
+    response = generate()
+    if response:
+        cache.put(key, response, model)
+    return response
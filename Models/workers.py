@@ -0,0 +1,259 @@
+"""
+Pools de execução compartilhados para a geração de relatórios.
+
+Cada chamada a um modelo espera minutos pela resposta, sem usar CPU. Os relatórios de um lote
+rodam em paralelo, num pool por provedor (`openai`, `gemini`), com o limite de chamadas simultâneas
+da seção `report_concurrency` do `config.yaml`, para não estourar a cota de nenhum dos dois.
+
+Cada job devolve um `ReportHandle` (resultado, cancelamento, timeout, latência e desfecho), e
+`wait_all` espera um lote inteiro de handles.
+
+Classes:
+- ReportHandle: Handle de um relatório submetido.
+- ReportPool: Pool limitado, com fila limitada (quem submete espera quando ela enche).
+
+Funções:
+- report_provider: Provedor de um modelo (`"openai"`, `"gemini"` ou `None`).
+- get_report_pool: Pool compartilhado de um provedor (por etapa), criado no primeiro uso.
+- iter_completed: Handles na ordem em que terminam.
+- wait_all: Espera um lote e devolve latência e desfecho de cada arquivo.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Iterator
+
+
+# GLOBALS
+
+CONFIG_PATH = "config.yaml"
+
+PROVIDER_OPENAI = "openai"
+PROVIDER_GEMINI = "gemini"
+
+DEFAULT_REPORT_CONCURRENCY = {PROVIDER_OPENAI: 4, PROVIDER_GEMINI: 4, "queue": 32}
+
+OUTCOME_PENDING = "pending"
+OUTCOME_OK = "ok"
+OUTCOME_FAILED = "failed"  # o relatório devolveu False
+OUTCOME_ERROR = "error"  # o relatório levantou exceção
+OUTCOME_CANCELLED = "cancelled"
+OUTCOME_TIMEOUT = "timeout"
+
+_lock = threading.Lock()
+_pools: dict[str, "ReportPool"] = {}
+
+
+def report_provider(model: str) -> str | None:
+    """
+    ### 🏷️ report_provider
+    Provider that serves `model`, by the same name rules `Generate_Final_Report` always used.
+    """
+    if "gemini" in model:
+        return PROVIDER_GEMINI
+    if "gpt" in model or "o1" in model or "o3" in model or "o4-mini" in model:
+        return PROVIDER_OPENAI
+    return None
+
+
+def report_concurrency(provider: str, path: str = CONFIG_PATH) -> tuple[int, int]:
+    """
+    ### ⚙️ report_concurrency
+    Reports of `provider` allowed in flight at once and jobs allowed to wait behind them, from the
+    `report_concurrency` section of `config.yaml` (defaults in `DEFAULT_REPORT_CONCURRENCY`).
+    """
+    # Tools é pesado para importar: só quando o primeiro pool é criado
+    from Tools import load_config_section
+
+    limits = load_config_section("report_concurrency", DEFAULT_REPORT_CONCURRENCY, path)
+    return max(1, int(limits.get(provider, 1))), max(0, int(limits["queue"]))
+
+
+class ReportHandle:
+    """
+    ### 🎫 ReportHandle
+    Future-like handle of one report job submitted to a `ReportPool`.
+
+    ### 🖥️ Parameters
+        - `name` (`str`): The file the job works on, used in logs and batch stats.
+        - `future` (`Future`): The pool's future.
+        - `timeout` (`float`, optional): Seconds from submission after which `result()` gives up. Defaults to `None`.
+
+    ### 📚 Notes
+    - `cancel()` only stops a job that has not started; a request already sent to the provider runs to the end.
+    - `latency` counts from the start of the job, not from submission; `queued` is the wait before it.
+    """
+
+    def __init__(self, name: str, future: Future, timeout: float | None = None):
+        self.name = name
+        self.future = future
+        self.submitted = time.monotonic()
+        self.deadline = self.submitted + timeout if timeout is not None else None
+        self.started: float | None = None
+        self.finished: float | None = None
+        self.timed_out = False
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def cancel(self) -> bool:
+        return self.future.cancel()
+
+    def result(self, timeout: float | None = None):
+        """
+        Waits for the job and returns its result, re-raising its exception.
+        Raises `TimeoutError` after `timeout` seconds or past the handle's own deadline, whichever comes first.
+        """
+        if self.deadline is not None:
+            remaining = max(0.0, self.deadline - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        try:
+            return self.future.result(timeout)
+        except FutureTimeoutError:
+            self.timed_out = True
+            raise TimeoutError(f"report of {self.name} not done after {time.monotonic() - self.submitted:.0f}s")
+
+    @property
+    def outcome(self) -> str:
+        if self.future.cancelled():
+            return OUTCOME_CANCELLED
+        if not self.future.done():
+            return OUTCOME_TIMEOUT if self.timed_out else OUTCOME_PENDING
+        if self.future.exception() is not None:
+            return OUTCOME_ERROR
+        return OUTCOME_FAILED if self.future.result() is False else OUTCOME_OK
+
+    @property
+    def latency(self) -> float | None:
+        if self.started is None:
+            return None
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def queued(self) -> float:
+        return (self.started or time.monotonic()) - self.submitted
+
+    def stats(self) -> dict:
+        return {"name": self.name, "outcome": self.outcome, "queued_s": self.queued, "latency_s": self.latency}
+
+
+class ReportPool:
+    """
+    ### 🧵 ReportPool
+    Bounded worker pool for report jobs, with a bounded queue: once `workers + queue` jobs are pending,
+    `submit` blocks until one finishes (backpressure), instead of piling up file reads and requests.
+
+    ### 🖥️ Parameters
+        - `workers` (`int`): Jobs running at once.
+        - `queue` (`int`, optional): Jobs allowed to wait for a worker. Defaults to `32`.
+        - `name` (`str`, optional): Thread name prefix. Defaults to `"report"`.
+
+    ### 💡 Example
+    >>> pool = ReportPool(4)
+    >>> handles = [pool.submit(name, GeminiReport, name, model, prompt) for name in names]
+    >>> wait_all(handles, timeout=1800)
+    """
+
+    def __init__(self, workers: int, queue: int = DEFAULT_REPORT_CONCURRENCY["queue"], name: str = "report"):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def submit(self, name: str, fn: Callable, *args, timeout: float | None = None,
+               block_timeout: float | None = None, **kwargs) -> ReportHandle:
+        """
+        ### 🧵 submit
+        Runs `fn(*args, **kwargs)` on the pool and returns its `ReportHandle`.
+
+        #### ⚠️ Raises
+        - `TimeoutError`: The queue stayed full for `block_timeout` seconds.
+        """
+        if not self._slots.acquire(timeout=block_timeout):
+            raise TimeoutError(f"report queue full, {name} not submitted")
+        handle: ReportHandle | None = None
+        ready = threading.Event()
+
+        def run():
+            ready.wait()
+            handle.started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                handle.finished = time.monotonic()
+
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            self._slots.release()
+            raise
+        handle = ReportHandle(name, future, timeout)
+        ready.set()
+        # Libera a vaga ao terminar, ser cancelado ou falhar
+        future.add_done_callback(lambda _: self._slots.release())
+        return handle
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+
+def get_report_pool(provider: str, stage: str = "report") -> ReportPool:
+    """
+    ### 🧵 get_report_pool
+    Returns the shared pool of `provider` for `stage`, creating it on first use (thread-safe) with the limits of
+    `report_concurrency(provider)`.
+
+    ### 📌 Notes
+    - Jobs that wait on other jobs (a report waiting on its chunk summaries) must use another `stage`: in the same
+      pool, a batch of waiting reports could hold every worker and never let the chunks run.
+    """
+    key = f"{stage}-{provider}"
+    pool = _pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(key)
+            if pool is None:
+                workers, queue = report_concurrency(provider)
+                pool = _pools[key] = ReportPool(workers, queue, key)
+    return pool
+
+
+def iter_completed(handles: list[ReportHandle], timeout: float | None = None) -> Iterator[ReportHandle]:
+    """
+    ### ⏳ iter_completed
+    Yields the handles in the order their jobs finish. After `timeout` seconds the unfinished handles are
+    cancelled (if still queued), marked as timed out and not yielded.
+    """
+    by_future = {handle.future: handle for handle in handles}
+    try:
+        for future in as_completed(by_future, timeout):
+            yield by_future[future]
+    except FutureTimeoutError:
+        for handle in handles:
+            if not handle.done():
+                handle.cancel()
+                handle.timed_out = True
+
+
+def wait_all(handles: list[ReportHandle], timeout: float | None = None) -> list[dict]:
+    """
+    ### ⏳ wait_all
+    Waits for a batch of handles (up to `timeout` seconds in total) and returns, per file, its `outcome`
+    (`ok`, `failed`, `error`, `cancelled`, `timeout`), seconds `queued_s` and `latency_s`.
+    """
+    for _ in iter_completed(handles, timeout):
+        pass
+    return [handle.stats() for handle in handles]
+
+
+def summarize(stats: list[dict]) -> str:
+    """One-line batch summary: outcomes and latency of the finished jobs."""
+    outcomes: dict[str, int] = {}
+    for row in stats:
+        outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+    latencies = sorted(row["latency_s"] for row in stats if row["latency_s"] is not None)
+    text = ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))
+    if latencies:
+        text += f"; latency avg {sum(latencies) / len(latencies):.0f}s, max {latencies[-1]:.0f}s"
+    return text
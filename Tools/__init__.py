@@ -4,67 +4,14 @@ Tools package initialization
 from .tools import WorkflowLogger
 from .tools import ProgressBar
 from .tools import count_tokens
+from .tools import load_config_section
 from .tools import check_presence
-from .config_manager import ConfigManager, config
-from .enhanced_logger import EnhancedLogger, create_logger
-from .state_manager import (
-    StateManager,
-    ProcessStatus,
-    ProcessStep,
-    create_state_manager,
-)
-from .retry_manager import (
-    RetryManager,
-    RetryConfig,
-    RetryStrategy,
-    create_retry_manager,
-    with_retry,
-)
-from .resource_manager import ResourceManager, create_resource_manager
-from .validator import (
-    Validator,
-    ValidationResult,
-    ProcessNumberValidation,
-    JSONValidation,
-    create_validator,
-)
-from .navigation_manager import (
-    NavigationManager,
-    ElementSelector,
-    NavigationResult,
-    WaitStrategy,
-    create_navigation_manager,
-)
 
 
 __all__ = [
     "WorkflowLogger",
     "ProgressBar",
     "count_tokens",
+    "load_config_section",
     "check_presence",
-    "ConfigManager",
-    "config",
-    "EnhancedLogger",
-    "create_logger",
-    "StateManager",
-    "ProcessStatus",
-    "ProcessStep",
-    "create_state_manager",
-    "RetryManager",
-    "RetryConfig",
-    "RetryStrategy",
-    "create_retry_manager",
-    "with_retry",
-    "ResourceManager",
-    "create_resource_manager",
-    "Validator",
-    "ValidationResult",
-    "ProcessNumberValidation",
-    "JSONValidation",
-    "create_validator",
-    "NavigationManager",
-    "ElementSelector",
-    "NavigationResult",
-    "WaitStrategy",
-    "create_navigation_manager",
 ]
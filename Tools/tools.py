@@ -3,6 +3,7 @@
 import tiktoken
 from tqdm import tqdm
 import os
+import yaml
 
 # ■■■■■■■■■■■
 #  LOGGING SETUP
@@ -459,6 +460,36 @@ def count_tokens(file_path, model_name, mode):
         raise RuntimeError(f"Erro ao contar tokens: {str(e)}")
 
 
+def load_config_section(section: str, defaults: dict, path: str = "config.yaml") -> dict:
+    """
+    ### ⚙️ load_config_section
+    Reads one section of `config.yaml`, filling missing keys from `defaults`. A missing or unreadable
+    file falls back to the defaults.
+
+    ### 📌 Notes
+    - Only the keys of `defaults` are read. Any other key in the section is reported as unknown and ignored,
+      so a typo shows up in the log instead of silently leaving the setting at its default.
+
+    ### 💡 Example
+    >>> load_config_section("retry", {"max_attempts": 3, "base_delay": 1.0})
+    {'max_attempts': 5, 'base_delay': 1.0}
+    """
+    values = dict(defaults)
+    if not os.path.exists(path):
+        return values
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            data = yaml.safe_load(file) or {}
+        settings = data.get(section) or {}
+        unknown = sorted(str(key) for key in settings if key not in defaults)
+        if unknown:
+            print(f"[⚠️]: unknown keys in '{section}' of {path} ignored: {', '.join(unknown)}")
+        values.update({k: v for k, v in settings.items() if k in defaults})
+    except Exception as e:
+        print(f"[⚠️]: could not read '{section}' from {path}: {str(e)}")
+    return values
+
+
 #!/usr/bin/env python3
 """
 SimplePushbullet - Uma implementação minimalista e elegante para envio de notificações
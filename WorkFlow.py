@@ -1,11 +1,10 @@
 
 import os
 import time
-from Models.models import Generate_Final_Report
-from Browsing.EPROC import EPROC_Download
 import yaml
-from cloud_ocr.recognizer import Recognize
-from run_one_at_time import run_processes_sequentially
+
+# As etapas (OCR, modelos, navegador) são importadas só quando usadas: `import WorkFlow` não
+# carrega os SDKs da OpenAI/Gemini/Vision nem o Selenium.
 
 
 def load_PROMPT() -> dict | None:
@@ -70,6 +69,7 @@ def run_autofill_processing() -> dict | None:
         - Returns detailed processing statistics for monitoring
     """
     print("[🤖]: starting autofill processing system")
+    from run_one_at_time import run_processes_sequentially
 
     try:
         if True:
@@ -171,6 +171,8 @@ def execute_complete_workflow(model: str = "gemini-2.5-pro") -> bool:
         print(f"\n[🧠]: starting AI report generation with model: {model}")
         print(f"Starting report generation with model: {model}")
 
+        from Models.models import Generate_Final_Report
+
         report_start_time = time.time()
         Generate_Final_Report(model, legacy_prompt)
         report_end_time = time.time()
@@ -242,35 +244,38 @@ def execute_complete_workflow(model: str = "gemini-2.5-pro") -> bool:
         return False
 
 
-data = load_PROMPT()
-
-
-legacy_prompt = data["legacy_prompt"]
-
-lista_processos = [
-    "50085259120254047102",
-    "50091615720254047102",
-    "50083907920254047102",
-    "50084236920254047102",
-    "50092109820254047102",
-    "50092602720254047102",
-    "50092577220254047102",
-    "50092187520254047102",
-    "50092542020254047102",
-    "50094274420254047102",
-    "50092854020254047102",
-    "50094282920254047102",
-    "50094326620254047102",
-    "50094387320254047102",
-    "50093876220254047102",
-    "50090438120254047102",
-    "50091295220254047102",
-    "50094058320254047102",
-    "50089927020254047102",
-    "50093096820254047102",
-    "50094967620254047102",
-    "50094863220254047102",
-    "50095166720254047102",
-]
-Recognize()
-Generate_Final_Report("gemini-2.5-pro", legacy_prompt)
+if __name__ == "__main__":
+    from cloud_ocr.recognizer import Recognize
+    from Models.models import Generate_Final_Report
+
+    data = load_PROMPT()
+
+    legacy_prompt = data["legacy_prompt"]
+
+    lista_processos = [
+        "50085259120254047102",
+        "50091615720254047102",
+        "50083907920254047102",
+        "50084236920254047102",
+        "50092109820254047102",
+        "50092602720254047102",
+        "50092577220254047102",
+        "50092187520254047102",
+        "50092542020254047102",
+        "50094274420254047102",
+        "50092854020254047102",
+        "50094282920254047102",
+        "50094326620254047102",
+        "50094387320254047102",
+        "50093876220254047102",
+        "50090438120254047102",
+        "50091295220254047102",
+        "50094058320254047102",
+        "50089927020254047102",
+        "50093096820254047102",
+        "50094967620254047102",
+        "50094863220254047102",
+        "50095166720254047102",
+    ]
+    Recognize()
+    Generate_Final_Report("gemini-2.5-pro", legacy_prompt)
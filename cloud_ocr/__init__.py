@@ -4,5 +4,6 @@ This is a simple OCR library that uses the Google Cloud Vision API to extract te
 
 from .cloud_ocr import  OCR
 from .recognizer import Recognize
+from .backends import OcrBackend, VisionBackend, FakeBackend
 
-__all__ = ['OCR', 'Recognize']
+__all__ = ['OCR', 'Recognize', 'OcrBackend', 'VisionBackend', 'FakeBackend']
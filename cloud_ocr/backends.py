@@ -0,0 +1,312 @@
+"""
+### 🔌 Backends Module
+OCR backends behind a common `OcrBackend` protocol. `VisionBackend` wraps Google Cloud Vision; the
+Vision SDK is only imported and `key.json` only read when the first page is sent, and the client is
+shared by every backend instance (`get_vision_client`). `FakeBackend` runs offline and returns the page's text
+layer or canned text with configurable latency and error rate, so throughput, concurrency and retry
+behaviour can be measured without credentials or network access.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Protocol, runtime_checkable
+
+import fitz
+
+from .batching import VisionBatcher, annotate_request, DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCH_BYTES, DEFAULT_MAX_WAIT
+from .layout import Word, text_layer_words, words_from_annotation
+
+
+# GLOBAL VARIABLES
+
+KEY_PATH = os.path.join("cloud_ocr", "key.json")
+
+# Códigos google.rpc no campo `error` de cada imagem do Vision
+TRANSIENT_CODES = {4, 8, 10, 13, 14}  # DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+QUOTA_CODE = 8  # RESOURCE_EXHAUSTED
+
+
+class TransientOcrError(Exception):
+    """Recoverable backend failure (quota, throttling, unavailable). Safe to retry. `quota` marks quota errors."""
+
+    def __init__(self, message: str, quota: bool = False):
+        super().__init__(message)
+        self.quota = quota
+
+
+@runtime_checkable
+class OcrBackend(Protocol):
+    """
+    ### 🔌 OcrBackend
+    Anything that turns an encoded page image into text.
+
+    - `name` (`str`): Short identifier, also part of the page cache key.
+    - `detect_text(content, page=None) -> str`: Returns the detected text (`""` when there is none) and
+      raises on failure. `page` is optional context for backends that can use it.
+    - `stats() -> dict`: Counters for the run summary.
+
+    Backends may also implement `detect_layout(content, page=None) -> tuple[str, list[Word]]`, returning the
+    text and its words with confidence and bounding box (see `layout`). It is optional: `OCR` falls back to
+    `detect_text` without words when it is missing.
+    """
+
+    name: str
+
+    def detect_text(self, content: bytes, page: fitz.Page | None = None) -> str:
+        ...
+
+    def stats(self) -> dict:
+        ...
+
+
+def create_vision_client(key_path: str = KEY_PATH):
+    """
+    ### 🔑 create_vision_client
+    Builds an `ImageAnnotatorClient` from the service account in `key_path` (relative to the working directory).
+
+    #### ⚠️ Raises
+    - `Exception`: If `key.json` cannot be read or the credentials are invalid.
+    """
+    from google.cloud import vision
+    from google.oauth2 import service_account
+
+    try:
+        with open(os.path.join(os.getcwd(), key_path), "r") as file:
+            key = json.load(file)
+    except Exception as e:
+        print(f"Error loading key.json: {str(e)}")
+        raise
+    credentials = service_account.Credentials.from_service_account_info(key)
+    return vision.ImageAnnotatorClient(credentials=credentials)
+
+
+_vision_client = None
+_vision_lock = threading.Lock()
+
+
+def get_vision_client():
+    """
+    ### 🔑 get_vision_client
+    Returns the shared `ImageAnnotatorClient`, creating it on first use (thread-safe).
+    """
+    global _vision_client
+    if _vision_client is None:
+        with _vision_lock:
+            if _vision_client is None:
+                _vision_client = create_vision_client()
+    return _vision_client
+
+
+class VisionBackend:
+    """
+    ### 👁️ VisionBackend
+    Google Cloud Vision text detection, optionally batched across threads.
+
+    ### 🖥️ Parameters
+        - `client` (`vision.ImageAnnotatorClient`, optional): Client to use. Defaults to the shared client
+          from `get_vision_client`, built from `key.json` on first use.
+        - `batch_size` (`int`, optional): Pages per `batch_annotate_images` call; `1` sends one
+          `text_detection` call per page. Defaults to `1`.
+        - `max_wait` (`float`, optional): See `VisionBatcher`. Defaults to `0.2`.
+        - `max_batch_bytes` (`int`, optional): Encoded image bytes per batch; see `VisionBatcher`.
+          Defaults to 7 MB.
+
+    ### 💡 Example
+    >>> backend = VisionBackend(batch_size=8)
+    >>> backend.detect_text(content)
+    'Texto detectado...'
+    """
+
+    name = "vision"
+
+    def __init__(self, client=None, batch_size: int = 1, max_wait: float = DEFAULT_MAX_WAIT,
+                 max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES):
+        self._client = client
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_batch_bytes = max_batch_bytes
+        self.calls = 0
+        self.batch_capacity = None
+        self._batcher: VisionBatcher | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_vision_client()
+        return self._client
+
+    @property
+    def batcher(self) -> VisionBatcher | None:
+        if self.batch_size <= 1:
+            return None
+        if self._batcher is None:
+            client = self.client
+            with self._lock:
+                if self._batcher is None:
+                    self._batcher = VisionBatcher(client, self.batch_size, self.max_wait, self.batch_capacity,
+                                                  self.max_batch_bytes)
+        return self._batcher
+
+    def cap_batches(self, capacity) -> None:
+        """Sends each batch once it holds `capacity()` pages, when fewer than `batch_size` can be in flight."""
+        with self._lock:
+            self.batch_capacity = capacity
+            if self._batcher is not None:
+                self._batcher.capacity = capacity
+
+    def _annotate(self, content: bytes, document: bool = False):
+        """Sends one image (batched or not) and returns its response, raising on a per-image error."""
+        batcher = self.batcher
+        if batcher is not None:
+            response = batcher.annotate(content, document)
+        else:
+            with self._lock:
+                self.calls += 1
+            image = annotate_request(self.client, content, document).image
+            if document:
+                response = self.client.document_text_detection(image=image)  # type: ignore[attr-defined]
+            else:
+                response = self.client.text_detection(image=image)  # type: ignore[attr-defined]
+
+        # Verifica se há erro
+        if response.error.message:
+            code = getattr(response.error, "code", 0)
+            if code in TRANSIENT_CODES:
+                raise TransientOcrError(response.error.message, quota=code == QUOTA_CODE)
+            raise Exception(
+                '{}\nPara mais detalhes: {}'.format(
+                    response.error.message,
+                    response.error.details
+                )
+            )
+        return response
+
+    def detect_text(self, content: bytes, page: fitz.Page | None = None) -> str:
+        response = self._annotate(content)
+        # A primeira anotação contém todo o texto
+        return response.text_annotations[0].description if response.text_annotations else ""
+
+    def detect_layout(self, content: bytes, page: fitz.Page | None = None) -> tuple[str, list[Word]]:
+        """
+        Text and words of a page. Uses `DOCUMENT_TEXT_DETECTION`, billed like `TEXT_DETECTION`, which
+        also fills the word confidences of `full_text_annotation`.
+        """
+        response = self._annotate(content, document=True)
+        annotation = getattr(response, "full_text_annotation", None)
+        if response.text_annotations:
+            text = response.text_annotations[0].description
+        else:
+            text = getattr(annotation, "text", "") or ""
+        return text, words_from_annotation(annotation)
+
+    def stats(self) -> dict:
+        if self._batcher is not None:
+            return self._batcher.stats()
+        return {"requests": self.calls, "images": self.calls}
+
+
+class FakeBackend:
+    """
+    ### 🧪 FakeBackend
+    Deterministic offline backend for benchmarks and dry runs.
+
+    ### 🖥️ Parameters
+        - `latency` (`float`, optional): Seconds slept per page, mimicking a Vision round trip. Defaults to `0.0`.
+        - `jitter` (`float`, optional): Extra random latency, uniform in `[0, jitter]`. Defaults to `0.0`.
+        - `error_rate` (`float`, optional): Probability of raising `TransientOcrError`. Defaults to `0.0`.
+        - `quota` (`float`, optional): Pages per second accepted, like a Vision quota; calls above it in any
+          one-second window raise a quota `TransientOcrError`. `0` means unlimited. Defaults to `0.0`.
+        - `canned_text` (`str`, optional): Text returned for every page. Defaults to the page's text layer
+          (or a placeholder when no page is given).
+        - `seed` (`int`, optional): Seed for latency jitter and errors, for repeatable runs. Defaults to `None`.
+
+    ### 💡 Example
+    >>> Recognize(backend=FakeBackend(latency=0.8, error_rate=0.02, seed=1))
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 canned_text: str | None = None, seed: int | None = None, quota: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.canned_text = canned_text
+        self.quota = quota
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self._random = random.Random(seed)
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+
+    def detect_text(self, content: bytes, page: fitz.Page | None = None) -> str:
+        return self.detect_layout(content, page)[0]
+
+    def detect_layout(self, content: bytes, page: fitz.Page | None = None) -> tuple[str, list[Word]]:
+        """Text as in `detect_text`, with the words of the page's text layer (confidence `1.0`)."""
+        with self._lock:
+            self.calls += 1
+            if self.quota > 0:
+                # Janela deslizante de 1 segundo, como a cota por minuto do Vision em escala menor
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.quota:
+                    self.rejected += 1
+                    raise TransientOcrError("fake backend: 429 quota exceeded", quota=True)
+                self._recent.append(now)
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise TransientOcrError("fake backend: simulated transient error")
+        if self.canned_text is not None:
+            return self.canned_text, []
+        if page is not None:
+            return page.get_text("text").strip(), text_layer_words(page)
+        return f"fake text ({len(content)} bytes)", []
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.calls, "images": self.calls, "errors": self.errors, "rejected": self.rejected}
+
+
+_default_backend: VisionBackend | None = None
+_default_lock = threading.Lock()
+
+
+def get_backend(backend: "str | OcrBackend" = "vision", **kwargs) -> OcrBackend:
+    """
+    ### 🔌 get_backend
+    Resolves a backend name (`"vision"` or `"fake"`) to a new instance; instances are returned unchanged.
+
+    #### ⚠️ Raises
+    - `ValueError`: If the name is unknown.
+    """
+    if not isinstance(backend, str):
+        return backend
+    if backend == "vision":
+        return VisionBackend(**kwargs)
+    if backend == "fake":
+        kwargs.pop("batch_size", None)
+        return FakeBackend(**kwargs)
+    raise ValueError(f"Unknown OCR backend: {backend}. Use 'vision' or 'fake'")
+
+
+def get_default_backend() -> VisionBackend:
+    """Shared unbatched `VisionBackend`, used by `OCR` when no backend is given."""
+    global _default_backend
+    if _default_backend is None:
+        with _default_lock:
+            if _default_backend is None:
+                _default_backend = VisionBackend()
+    return _default_backend
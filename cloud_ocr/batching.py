@@ -0,0 +1,155 @@
+"""
+### 📦 Batching Module
+Groups the pages requested by concurrent OCR workers into `batch_annotate_images` calls, so N pages
+cost one Vision round trip instead of N. Each worker still receives the response for its own page.
+"""
+
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable
+
+
+# GLOBAL VARIABLES
+
+MAX_BATCH_SIZE = 16  # limite do Vision por BatchAnnotateImagesRequest
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT = 0.2  # segundos que uma página espera o lote encher
+# O Vision recusa requisições acima de ~10 MB; o conteúdo vai em base64 (+33%), então 7 MB de imagem cabem
+DEFAULT_MAX_BATCH_BYTES = 7 * 1024 * 1024
+
+
+def annotate_request(client, content: bytes, document: bool = False):
+    """
+    ### 📦 annotate_request
+    `AnnotateImageRequest` for one image. A client with its own `annotate_request(content, document)` (such as
+    `FakeVisionClient`) builds it, so the Vision SDK is only imported for the real client.
+    """
+    build = getattr(client, "annotate_request", None)
+    if build is not None:
+        return build(content, document)
+
+    from google.cloud import vision
+
+    feature = vision.Feature.Type.DOCUMENT_TEXT_DETECTION if document else vision.Feature.Type.TEXT_DETECTION
+    return vision.AnnotateImageRequest(
+        image=vision.Image(content=content),
+        features=[vision.Feature(type_=feature)],
+    )
+
+
+class VisionBatcher:
+    """
+    ### 📦 VisionBatcher
+    Collects text-detection requests from many threads and sends them to Vision in batches.
+
+    ### 🖥️ Parameters
+        - `client` (`vision.ImageAnnotatorClient`): Client used for the batch calls. Any object with a
+          compatible `batch_annotate_images` works (see `fake_vision`).
+        - `batch_size` (`int`, optional): Images per request, capped at 16. Defaults to `8`.
+        - `max_wait` (`float`, optional): Seconds a page waits for its batch to fill before the partial
+          batch is sent. Defaults to `0.2`.
+        - `capacity` (`Callable[[], int]`, optional): Current number of pages that can be in flight (e.g. the
+          limit of an `AimdController`); a batch is sent as soon as it holds that many pages. Defaults to `None`.
+        - `max_batch_bytes` (`int`, optional): Encoded image bytes per request. A batch is sent before the
+          next image would pass this limit. Defaults to 7 MB.
+
+    ### 💡 Example
+    >>> batcher = VisionBatcher(client, batch_size=8)
+    >>> response = batcher.annotate(content)   # blocks until the batch holding this page returns
+    >>> response.text_annotations[0].description
+
+    ### 📚 Notes
+    - No background thread: the worker that completes a batch sends it, and a worker whose page is still
+      queued after `max_wait` sends the partial batch.
+    - Keep `batch_size` at or below the number of OCR workers, otherwise every batch waits for `max_wait`.
+      When that number changes during the run, pass it as `capacity`.
+    - A single image larger than `max_batch_bytes` is still sent, alone in its batch.
+    - `requests` and `images` count the RPCs sent and the pages they carried.
+    """
+
+    def __init__(self, client, batch_size: int = DEFAULT_BATCH_SIZE, max_wait: float = DEFAULT_MAX_WAIT,
+                 capacity: Callable[[], int] | None = None, max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES):
+        self.client = client
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_wait = max_wait
+        self.capacity = capacity
+        self.max_batch_bytes = max_batch_bytes
+        self.requests = 0
+        self.images = 0
+        self._queue: list[tuple] = []
+        self._queued_bytes = 0
+        self._lock = threading.Lock()
+
+    def annotate(self, content: bytes, document: bool = False):
+        """
+        Text detection for one image. Returns the `AnnotateImageResponse` of this image
+        (check `error.message` and `text_annotations` as with `text_detection`). With `document`, the
+        request uses `DOCUMENT_TEXT_DETECTION` (word confidences in `full_text_annotation`); each request
+        carries its own feature, so both kinds can share a batch.
+        """
+        future: Future = Future()
+        request = annotate_request(self.client, content, document)
+        size = len(content)
+        batches = []
+        with self._lock:
+            # Envia o que já está na fila se esta imagem passaria do limite de bytes
+            if self._queue and self._queued_bytes + size > self.max_batch_bytes:
+                batches.append(self._take())
+            self._queue.append((request, future, size))
+            self._queued_bytes += size
+            if len(self._queue) >= self._fill_target() or self._queued_bytes >= self.max_batch_bytes:
+                batches.append(self._take())
+        for batch in batches:
+            self._send(batch)
+
+        try:
+            return future.result(timeout=self.max_wait)
+        except FutureTimeout:
+            with self._lock:
+                queued = any(f is future for _, f, _ in self._queue)
+                batch = self._take() if queued else None
+            if batch:
+                self._send(batch)
+            return future.result()
+
+    def _fill_target(self) -> int:
+        """Pages that make a batch full: `batch_size`, or fewer when fewer can be in flight. Caller holds the lock."""
+        if self.capacity is None:
+            return self.batch_size
+        return max(1, min(self.batch_size, int(self.capacity())))
+
+    def _take(self) -> list:
+        """Pops up to `batch_size` queued requests, within `max_batch_bytes` (at least one). Caller holds the lock."""
+        count = 0
+        total = 0
+        for _, _, size in self._queue[:self.batch_size]:
+            if count and total + size > self.max_batch_bytes:
+                break
+            count += 1
+            total += size
+        batch = self._queue[:count]
+        del self._queue[:count]
+        self._queued_bytes -= total
+        return batch
+
+    def _send(self, batch: list) -> None:
+        with self._lock:
+            self.requests += 1
+            self.images += len(batch)
+        try:
+            response = self.client.batch_annotate_images(requests=[request for request, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        # As respostas vêm na mesma ordem das requisições
+        responses = list(response.responses)
+        for index, (_, future, _) in enumerate(batch):
+            if index < len(responses):
+                future.set_result(responses[index])
+            else:
+                future.set_exception(Exception(f"Vision returned {len(responses)} responses for {len(batch)} images"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "images": self.images}
@@ -0,0 +1,373 @@
+"""
+### ⏱️ Benchmark Module
+Offline benchmarks for the OCR pipeline. Nothing here calls the Vision API; only the local
+rendering and encoding stages are measured.
+
+Run from the project root:
+
+    python -m cloud_ocr.benchmark encoding Processos/Processed/<arquivo>.PDF --pages 50
+    python -m cloud_ocr.benchmark throughput Processos/Processed/<arquivo>.PDF --workers 4 8 16 --latency 0.8
+    python -m cloud_ocr.benchmark throughput Processos/Processed/<arquivo>.PDF --workers 16 --quota 10 --rps 0 10
+    python -m cloud_ocr.benchmark throughput Processos/Processed/<arquivo>.PDF --workers 4 16 64 --quota 20 --rps 0 --adaptive
+    python -m cloud_ocr.benchmark render Processos/Processed/<arquivo>.PDF --processes 1 2 4 8
+    python -m cloud_ocr.benchmark imports --budget-ms 500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from PIL import Image
+
+from .encoding import encode_page, page_image_bytes, SUPPORTED_FORMATS, DEFAULT_QUALITY
+from .resolution import RenderChoice, choose_render, render_matrix
+from .backends import FakeBackend
+from .ratelimit import RateLimitedBackend, RetryPolicy
+from .concurrency import AimdController, AdaptiveBackend
+from .cloud_ocr import OCR
+from .render_pool import RenderPool
+from .scheduler import PageScheduler, DocumentJob
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# GLOBAL VARIABLES
+
+# SDKs que não devem ser carregados por `import WorkFlow`
+HEAVY_MODULES = ("openai", "google.genai", "google.cloud.vision", "selenium")
+
+
+def _peak_rss_mb() -> float | None:
+    """Peak resident set size of the current process, in MB (`None` where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _legacy_encode(page: fitz.Page, page_num: int, temp_dir: str) -> bytes:
+    """The original path: pixmap -> PIL image -> temporary PNG on disk -> read back -> delete."""
+    pix = page.get_pixmap(matrix=fitz.Identity)  # type: ignore
+    img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", 0, 1)
+    temp_image_path = os.path.join(temp_dir, f"page{page_num}.png")
+    img.save(temp_image_path)
+    with open(temp_image_path, "rb") as image_file:
+        content = image_file.read()
+    os.remove(temp_image_path)
+    return content
+
+
+def _run_encoding_case(pdf_path: str, mode: str, image_format: str, quality: int, max_pages: int | None) -> dict:
+    """
+    Encodes the pages of `pdf_path` with one strategy. Runs inside a fresh worker process so the
+    peak RSS reported belongs to this case only.
+    """
+    document = fitz.open(pdf_path)
+    latencies = []
+    total_bytes = 0
+    try:
+        pages = range(len(document) if max_pages is None else min(max_pages, len(document)))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for page_num in pages:
+                start = time.perf_counter()
+                if mode == "legacy":
+                    content = _legacy_encode(document[page_num], page_num, temp_dir)
+                elif mode == "adaptive":
+                    dpi, grayscale = choose_render(document[page_num])
+                    content = encode_page(document[page_num], image_format, quality, render_matrix(dpi), grayscale)
+                elif mode == "pipeline":
+                    content = page_image_bytes(document[page_num], image_format, quality,
+                                               render_options=RenderChoice())[0]
+                else:
+                    content = encode_page(document[page_num], image_format, quality)
+                latencies.append(time.perf_counter() - start)
+                total_bytes += len(content)
+    finally:
+        document.close()
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "mode": mode,
+        "format": image_format,
+        "pages": count,
+        "mean_ms": (sum(latencies) / count * 1000) if count else 0.0,
+        "p95_ms": (latencies[min(count - 1, int(count * 0.95))] * 1000) if count else 0.0,
+        "avg_kb": (total_bytes / count / 1024) if count else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def benchmark_encoding(pdf_path: str, formats: tuple = SUPPORTED_FORMATS, quality: int = DEFAULT_QUALITY,
+                       max_pages: int | None = None) -> list[dict]:
+    """
+    ### ⏱️ benchmark_encoding
+    Compares per-page latency, payload size and peak RSS of the legacy temp-file PNG path against
+    the in-memory encoder for each requested format, at 72 DPI RGB (`memory`) and with the per-page
+    DPI/grayscale policy of `resolution.choose_render` (`adaptive`, time includes the policy itself), and as
+    `OCR` does it (`pipeline`: embedded image of scanned pages, the policy only for the pages it renders).
+
+    ### 🖥️ Parameters
+    - `pdf_path` (`str`): PDF used as workload.
+    - `formats` (`tuple`, optional): Formats for the in-memory path. Defaults to all supported formats.
+    - `quality` (`int`, optional): Lossy quality for JPEG and WebP. Defaults to `85`.
+    - `max_pages` (`int`, optional): Limit the number of pages. Defaults to the whole document.
+
+    ### 🔄 Returns
+    - `list[dict]`: One row per case with `mean_ms`, `p95_ms`, `avg_kb` and `peak_rss_mb`.
+
+    ### 💡 Example
+
+    >>> rows = benchmark_encoding("Processos/processo.PDF", max_pages=20)
+    """
+    cases = [("legacy", "png")] + [(mode, fmt) for fmt in formats for mode in ("memory", "adaptive", "pipeline")]
+    results = []
+    for mode, image_format in cases:
+        # One process per case: ru_maxrss never goes down inside a process
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(
+                executor.submit(_run_encoding_case, pdf_path, mode, image_format, quality, max_pages).result()
+            )
+    return results
+
+
+def benchmark_throughput(pdf_path: str, workers: tuple = (4, 8, 16), latency: float = 0.8, jitter: float = 0.2,
+                         error_rate: float = 0.0, max_pages: int | None = None, quota: float = 0.0,
+                         rates: tuple = (None,), adaptive: bool = False) -> list[dict]:
+    """
+    ### ⏱️ benchmark_throughput
+    Runs the OCR stage over `pdf_path` with the offline `FakeBackend` for each worker count and
+    reports pages per second. Every page goes to the backend (no text layer, no cache).
+
+    ### 🖥️ Parameters
+    - `pdf_path` (`str`): PDF used as workload.
+    - `workers` (`tuple`, optional): Concurrency levels to compare. Defaults to `(4, 8, 16)`.
+    - `latency` (`float`, optional): Simulated round trip per page, in seconds. Defaults to `0.8`.
+    - `jitter` (`float`, optional): Extra random latency per page. Defaults to `0.2`.
+    - `error_rate` (`float`, optional): Fraction of simulated backend failures. Defaults to `0.0`.
+    - `max_pages` (`int`, optional): Limit the number of pages. Defaults to the whole document.
+    - `quota` (`float`, optional): Pages per second the fake server accepts before answering with quota
+      errors; `0` is unlimited. Defaults to `0.0`.
+    - `rates` (`tuple`, optional): Client-side limits to compare, in pages per second, through
+      `RateLimitedBackend` with the `retry` policy of `config.yaml`. `None` sends pages unpaced and
+      without retries; `0` retries without pacing. Defaults to `(None,)`.
+    - `adaptive` (`bool`, optional): Also run an `"aimd"` case per rate, where an `AimdController` starting at the
+      smallest worker count and capped at the largest picks the concurrency. Defaults to `False`.
+
+    ### 🔄 Returns
+    - `list[dict]`: One row per worker count and rate with `seconds`, `pages_per_s`, `rejected` (quota errors
+      seen by the server), `retries`, `failed` and `concurrency` (the steady state picked by the `"aimd"` case).
+    """
+    results = []
+    cases = [(count, rate) for count in list(workers) + (["aimd"] if adaptive else []) for rate in rates]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count, rate in cases:
+            fake = FakeBackend(latency=latency, jitter=jitter, error_rate=error_rate, seed=0, quota=quota)
+            backend = fake
+            controller = None
+            if count == "aimd":
+                controller = AimdController(initial=min(workers), minimum=1, maximum=max(workers))
+                backend = AdaptiveBackend(fake, controller)
+            if rate is not None:
+                backend = RateLimitedBackend(backend, requests_per_second=rate, bytes_per_minute=0,
+                                             retry=RetryPolicy.from_config())
+
+            def page_fn(job: DocumentJob, page_num: int):
+                if max_pages is not None and page_num >= max_pages:
+                    return "skipped", ""
+                # O FakeBackend lê a página: o documento é compartilhado pelas threads
+                with job.document_lock:
+                    page = job.document[page_num]
+                return "ocr", OCR(page, page_num, backend=backend, document_lock=job.document_lock)
+
+            scheduler = PageScheduler(page_fn, max_workers=controller.maximum if controller else count)
+            job = DocumentJob(pdf_path, os.path.join(temp_dir, f"{count}-{rate}.txt"))
+            start = time.perf_counter()
+            scheduler.submit(job)
+            scheduler.wait()
+            elapsed = time.perf_counter() - start
+            pages = job.stats.get("ocr", 0) + job.stats.get("failed", 0)
+            results.append({
+                "workers": count,
+                "rate": "-" if rate is None else rate,
+                "pages": pages,
+                "seconds": elapsed,
+                "pages_per_s": pages / elapsed if elapsed else 0.0,
+                "rejected": fake.rejected,
+                "retries": backend.stats().get("retries", 0),
+                "failed": job.stats.get("failed", 0),
+                "concurrency": controller.steady_state() if controller else count,
+            })
+    return results
+
+
+def benchmark_render(pdf_path: str, processes: tuple = (1, 2, 4, 8), workers: int = 16, latency: float = 0.05,
+                     max_pages: int | None = None) -> list[dict]:
+    """
+    ### ⏱️ benchmark_render
+    Runs the OCR stage over `pdf_path` with a fast `FakeBackend`, so rendering and encoding dominate, once with
+    pages rendered in the worker threads (`"threads"`) and once per process count with a `RenderPool`.
+
+    ### 🖥️ Parameters
+    - `pdf_path` (`str`): PDF used as workload.
+    - `processes` (`tuple`, optional): Render process counts to compare. Defaults to `(1, 2, 4, 8)`.
+    - `workers` (`int`, optional): OCR worker threads in every case. Defaults to `16`.
+    - `latency` (`float`, optional): Simulated round trip per page, in seconds. Defaults to `0.05`.
+    - `max_pages` (`int`, optional): Limit the number of pages. Defaults to the whole document.
+
+    ### 🔄 Returns
+    - `list[dict]`: One row per case with `seconds`, `pages_per_s` and `speedup` over the threads case.
+
+    ### 📚 Notes
+    - Process start-up is not timed: each pool renders one page before the clock starts.
+    - Above `os.cpu_count()` processes the extra workers only add contention.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for count in ["threads"] + list(processes):
+            backend = FakeBackend(latency=latency, jitter=0.0, seed=0)
+            renderer = RenderPool(count) if count != "threads" else None
+            if renderer is not None:
+                renderer.render(pdf_path, 0, "png", DEFAULT_QUALITY)
+
+            def page_fn(job: DocumentJob, page_num: int):
+                if max_pages is not None and page_num >= max_pages:
+                    return "skipped", ""
+                with job.document_lock:
+                    page = job.document[page_num]
+                return "ocr", OCR(page, page_num, backend=backend, renderer=renderer,
+                                  document_lock=job.document_lock)
+
+            scheduler = PageScheduler(page_fn, max_workers=workers)
+            job = DocumentJob(pdf_path, os.path.join(temp_dir, f"{count}.txt"))
+            try:
+                start = time.perf_counter()
+                scheduler.submit(job)
+                scheduler.wait()
+                elapsed = time.perf_counter() - start
+            finally:
+                if renderer is not None:
+                    renderer.close()
+            pages = job.stats.get("ocr", 0)
+            results.append({
+                "render": count if count == "threads" else f"{count} processes",
+                "pages": pages,
+                "seconds": elapsed,
+                "pages_per_s": pages / elapsed if elapsed else 0.0,
+            })
+    baseline = results[0]["pages_per_s"]
+    for row in results:
+        row["speedup"] = row["pages_per_s"] / baseline if baseline else 0.0
+    return results
+
+
+def benchmark_imports(modules: tuple = ("WorkFlow",), runs: int = 3) -> list[dict]:
+    """
+    ### ⏱️ benchmark_imports
+    Times a cold `import` of each module in a fresh interpreter (best of `runs`) and lists the heavy SDKs
+    (`HEAVY_MODULES`) it pulled in, which should be none now that clients are created on first use.
+    """
+    probe = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "__import__(sys.argv[1])\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [m for m in json.loads(sys.argv[2]) if m in sys.modules]\n"
+        "print(json.dumps({'ms': elapsed * 1000, 'heavy': heavy}))\n"
+    )
+    results = []
+    for module in modules:
+        timings, heavy = [], []
+        for _ in range(runs):
+            completed = subprocess.run(
+                [sys.executable, "-c", probe, module, json.dumps(HEAVY_MODULES)],
+                capture_output=True, text=True, cwd=os.getcwd(),
+            )
+            if completed.returncode != 0:
+                raise RuntimeError(f"import {module} failed:\n{completed.stderr.strip()}")
+            sample = json.loads(completed.stdout.strip().splitlines()[-1])
+            timings.append(sample["ms"])
+            heavy = sample["heavy"]
+        results.append({"module": module, "import_ms": min(timings), "heavy_sdks": ",".join(heavy) or "-"})
+    return results
+
+
+def print_table(rows: list[dict]) -> None:
+    """Prints benchmark rows as an aligned table."""
+    if not rows:
+        return
+    columns = list(rows[0].keys())
+    cells = [[f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="OCR pipeline benchmarks (no Vision calls)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    encoding = commands.add_parser("encoding", help="legacy temp-file PNG vs in-memory encoders")
+    encoding.add_argument("pdf", help="PDF file used as workload")
+    encoding.add_argument("--pages", type=int, default=None, help="maximum number of pages")
+    encoding.add_argument("--quality", type=int, default=DEFAULT_QUALITY, help="JPEG/WebP quality")
+    encoding.add_argument("--formats", nargs="+", default=list(SUPPORTED_FORMATS), help="formats to compare")
+
+    throughput = commands.add_parser("throughput", help="OCR stage throughput with the offline fake backend")
+    throughput.add_argument("pdf", help="PDF file used as workload")
+    throughput.add_argument("--pages", type=int, default=None, help="maximum number of pages")
+    throughput.add_argument("--workers", type=int, nargs="+", default=[4, 8, 16], help="concurrency levels")
+    throughput.add_argument("--latency", type=float, default=0.8, help="simulated seconds per page")
+    throughput.add_argument("--jitter", type=float, default=0.2, help="extra random seconds per page")
+    throughput.add_argument("--error-rate", type=float, default=0.0, help="simulated failure rate")
+    throughput.add_argument("--quota", type=float, default=0.0, help="pages/s accepted by the fake server (0 = unlimited)")
+    throughput.add_argument("--adaptive", action="store_true", help="add an AIMD case capped at the largest --workers")
+    throughput.add_argument("--rps", type=float, nargs="+", default=None,
+                            help="client rate limits to compare (pages/s, 0 = retries only); omit for no limiter")
+
+    render = commands.add_parser("render", help="page rendering in worker threads vs a process pool")
+    render.add_argument("pdf", help="PDF file used as workload")
+    render.add_argument("--pages", type=int, default=None, help="maximum number of pages")
+    render.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8], help="render process counts")
+    render.add_argument("--workers", type=int, default=16, help="OCR worker threads")
+    render.add_argument("--latency", type=float, default=0.05, help="simulated seconds per page")
+
+    imports = commands.add_parser("imports", help="cold import time of the workflow entry points")
+    imports.add_argument("modules", nargs="*", default=["WorkFlow"], help="modules to import")
+    imports.add_argument("--runs", type=int, default=3, help="fresh interpreters per module (best is kept)")
+    imports.add_argument("--budget-ms", type=float, default=None, help="exit with status 1 above this time")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "encoding":
+        print_table(benchmark_encoding(args.pdf, tuple(args.formats), args.quality, args.pages))
+    elif args.command == "render":
+        print_table(benchmark_render(args.pdf, tuple(args.processes), args.workers, args.latency, args.pages))
+    elif args.command == "imports":
+        rows = benchmark_imports(tuple(args.modules), args.runs)
+        print_table(rows)
+        over = [r for r in rows if r["heavy_sdks"] != "-" or
+                (args.budget_ms is not None and r["import_ms"] > args.budget_ms)]
+        if over:
+            print(f"[❌]: over budget or loading SDKs eagerly: {', '.join(r['module'] for r in over)}")
+            sys.exit(1)
+    else:
+        print_table(benchmark_throughput(
+            args.pdf, tuple(args.workers), args.latency, args.jitter, args.error_rate, args.pages,
+            args.quota, tuple(args.rps) if args.rps else (None,), args.adaptive,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+### 🗄️ Cache Module
+Content-addressed, persistent cache of OCR results. Pages are keyed by a SHA-256 hash of the
+encoded page image, so a re-downloaded process only pays Vision calls for the pages that changed.
+The store is a single SQLite file with LRU eviction bounded by total text size.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+# GLOBAL VARIABLES
+
+DEFAULT_CACHE_PATH = os.path.join("Cache", "ocr_pages.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB de texto
+EVICTION_TARGET = 0.9  # ao estourar o limite, reduz para 90%
+
+
+class PageCache:
+    """
+    ### 🗄️ PageCache
+    Persistent OCR page cache backed by SQLite, with least-recently-used eviction once the stored
+    text exceeds `max_bytes`.
+
+    ### 🖥️ Parameters
+        - `path` (`str`, optional): SQLite file. Defaults to `Cache/ocr_pages.sqlite3`.
+        - `max_bytes` (`int`, optional): Size budget for the stored text. Defaults to 512 MB.
+
+    ### 💡 Example
+    >>> cache = PageCache()
+    >>> key = cache.key_for(content, "vision", "png")
+    >>> cache.get(key) is None
+    True
+    >>> cache.put(key, "texto da pagina")
+
+    ### 📚 Notes
+    - Thread-safe: a single connection is shared behind a lock, so one instance can serve every OCR worker.
+    - WAL mode lets several `Recognize` runs share the same file.
+    - `hits` and `misses` count lookups since the instance was created.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_access ON pages(last_access)")
+            self._conn.commit()
+            self._size = self._total_size()
+
+    @staticmethod
+    def key_for(content: bytes, *namespace: str) -> str:
+        """
+        Hash of the encoded page bytes. The namespace (backend name, image format) is part of the key,
+        so PNG and JPEG renders, or results from different backends, never collide.
+        """
+        digest = hashlib.sha256(":".join(namespace).encode("utf-8"))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """Returns the cached text for `key` (possibly empty) or `None` on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        """Stores the text for `key` and evicts the least recently used pages if over budget."""
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            # Substituir uma página existente não pode somar o tamanho dela duas vezes
+            row = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time()),
+            )
+            self._conn.commit()
+            self._size += size - (row[0] if row is not None else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _total_size(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def _evict(self) -> None:
+        """Deletes least recently used pages until the store is under `EVICTION_TARGET` of the budget. Caller holds the lock."""
+        # Outro processo pode ter escrito no mesmo arquivo: recalcula antes de apagar
+        self._size = self._total_size()
+        target = int(self.max_bytes * EVICTION_TARGET)
+        if self._size <= self.max_bytes:
+            return
+        removed = 0
+        cursor = self._conn.execute("SELECT key, size FROM pages ORDER BY last_access ASC")
+        victims = []
+        for key, size in cursor:
+            if self._size - removed <= target:
+                break
+            victims.append((key,))
+            removed += size
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", victims)
+        self._conn.commit()
+        self._size -= removed
+
+    def stats(self) -> dict:
+        """Hit and miss counters plus the current stored size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes": self._size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,39 +1,83 @@
 import threading
-from google.cloud import vision
-from google.oauth2 import service_account
+from contextlib import nullcontext
 import fitz
 from PIL import Image
-import json
+import io
 import os
-from pathlib import Path
+from .encoding import page_image_bytes, EncodeStats, DEFAULT_FORMAT, DEFAULT_QUALITY
+from .resolution import RenderChoice, is_low_confidence, better_text, RETRY_DPI
+from .cache import PageCache
+from .backends import OcrBackend, get_default_backend
+from .dedup import PageDeduplicator, PageSignature, page_signature, BLANK_TEXT
+from .layout import LayoutWriter, Word, pack_result, unpack_result
+from .render_pool import RenderPool
 
 
 # GLOBAL VARIABLES
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-key = {}
 
-try:
-    key_path = os.path.join(os.getcwd(), "cloud_ocr", "key.json")
-    with open(key_path, "r") as file:
-        key = json.load(file)
-except Exception as e:
-    print(f"Error loading key.json: {str(e)}")
-    raise
 
-credentials = service_account.Credentials.from_service_account_info(key)
-client = vision.ImageAnnotatorClient(credentials=credentials)
+def format_page(page_num: int, text: str) -> str:
+    """
+    Wraps the text of a page with the start and end markers used in the `Output/*.txt` files.
+    """
+    return f"\n\n------------ Inicio da pagina {page_num} ------------\n\n{text}\n\n------------ Fim da pagina {page_num} ------------\n\n"
+
+
+class _LockedPage:
+    """A `fitz.Page` whose attribute reads and method calls hold the document lock, for backends that read the page."""
+
+    def __init__(self, page: fitz.Page, lock: threading.Lock):
+        self._page = page
+        self._lock = lock
 
+    def __getattr__(self, name: str):
+        with self._lock:
+            value = getattr(self._page, name)
+        if not callable(value):
+            return value
 
-def OCR(page: fitz.Page, page_num: int, thread: bool = False) -> str:
+        def call(*args, **kwargs):
+            with self._lock:
+                return value(*args, **kwargs)
+        return call
+
+
+def OCR(page: fitz.Page, page_num: int, thread: bool = False,
+        image_format: str = DEFAULT_FORMAT, quality: int = DEFAULT_QUALITY,
+        cache: PageCache | None = None, use_embedded: bool = True,
+        encode_stats: EncodeStats | None = None, backend: OcrBackend | None = None,
+        adaptive_resolution: bool = True, dedup: PageDeduplicator | None = None,
+        layout: LayoutWriter | None = None, renderer: RenderPool | None = None,
+        document_lock: "threading.Lock | None" = None) -> str:
     """
     ### 📝 OCR
-    Processes a PDF page to extract text using the Google Cloud Vision API.
+    Processes a PDF page to extract text using an OCR backend (Google Cloud Vision by default).
 
     ### 🖥️ Parameters
     - `page` (`fitz.Page`): The PDF page to be processed.
-    - `page_num` (`int`): The page number, used for naming the temporary image file.
+    - `page_num` (`int`): The page number, used in the page start and end markers.
     - `thread` (`bool`, optional): If `True`, the OCR process runs in a separate thread. Defaults to `False`.
+    - `image_format` (`str`, optional): Encoding sent to Vision: `"png"`, `"jpeg"` or `"webp"`. Defaults to `"png"`.
+    - `quality` (`int`, optional): Lossy quality for JPEG and WebP. Defaults to `85`.
+    - `cache` (`PageCache`, optional): Persistent page cache checked before calling Vision. Defaults to `None`.
+    - `use_embedded` (`bool`, optional): Send the original embedded image of single-image (scanned) pages
+      instead of rendering them. Defaults to `True`.
+    - `encode_stats` (`EncodeStats`, optional): Collects bytes uploaded and encode time per path. Defaults to `None`.
+    - `backend` (`OcrBackend`, optional): Backend that detects the text (see `backends`). Defaults to a
+      shared, unbatched `VisionBackend`.
+    - `adaptive_resolution` (`bool`, optional): Choose DPI and grayscale per rendered page (see `resolution`) and
+      retry once at `RETRY_DPI` when the result looks unreliable. `False` renders at 72 DPI RGB. Defaults to `True`.
+    - `dedup` (`PageDeduplicator`, optional): Skips blank pages and reuses the text of visually identical
+      pages (see `dedup`). Defaults to `None`.
+    - `layout` (`LayoutWriter`, optional): Also collect the words of the page with their confidence and
+      bounding box (see `layout`), using the backend's `detect_layout`. Defaults to `None` (text only).
+    - `renderer` (`RenderPool`, optional): Render, encode and sign the page in a worker process that opens
+      the PDF itself (see `render_pool`), instead of in this thread. Defaults to `None`.
+    - `document_lock` (`threading.Lock`, optional): Held whenever this thread reads the page, when other threads
+      share its `fitz.Document` (which is not thread-safe). It is released while waiting on the backend.
+      Defaults to `None` (the document belongs to this thread).
 
     ### 🔄 Returns
     - `str`: The detected text from the page, formatted with page start and end markers.
@@ -42,9 +86,16 @@ def OCR(page: fitz.Page, page_num: int, thread: bool = False) -> str:
     - `Exception`: Raised if there is an error during image processing or text detection.
 
     ### 📌 Notes
-    - The function temporarily saves the page as a PNG image for text detection.
-    - The temporary image file is deleted after processing.
-    - Ensure that the Google Cloud Vision API credentials are correctly configured.
+    - The page is encoded in memory (see `encoding.page_image_bytes`); nothing is written to disk.
+    - With a `cache`, the page is keyed by the hash of its encoded bytes; unchanged pages are never re-sent.
+    - The render policy only runs for pages that are rendered; scanned pages sent as their embedded image skip it.
+    - The high-DPI retry always renders the page, also for scanned pages first sent as their embedded image.
+      Without word confidences, it needs the page's ink (from the `dedup` signature, or computed for suspect
+      text only), so signature and near-blank pages are not sent twice.
+    - With a `renderer`, the page must belong to a document opened from a file (`page.parent.name`).
+    - With a `layout`, cached results carry the words too, under their own cache keys; a `dedup` shared with
+      text-only runs must use a different namespace.
+    - With the Vision backend, ensure that the Google Cloud Vision API credentials are correctly configured.
 
     ### 💡 Example
 
@@ -52,33 +103,87 @@ def OCR(page: fitz.Page, page_num: int, thread: bool = False) -> str:
     'Detected text from page 1...'
     """
 
+    lock = document_lock if document_lock is not None else nullcontext()
+    # O backend fake lê a camada de texto da página durante a chamada
+    backend_page = _LockedPage(page, document_lock) if document_lock is not None else page
+
+    def _detect(ocr_backend: OcrBackend, content: bytes, content_format: str,
+                page: fitz.Page) -> tuple[str, list[Word]]:
+        # Consulta o cache antes de chamar o backend
+        namespace = (ocr_backend.name, content_format) + (("layout",) if layout is not None else ())
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key_for(content, *namespace)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return unpack_result(cached) if layout is not None else (cached, [])
+
+        # Realiza a detecção de texto
+        detect_layout = getattr(ocr_backend, "detect_layout", None) if layout is not None else None
+        if detect_layout is not None:
+            text, words = detect_layout(content, page)
+        else:
+            text, words = ocr_backend.detect_text(content, page), []
+        if cache is not None:
+            cache.put(cache_key, pack_result(text, words) if layout is not None else text)
+        return text, words
+
+    def _encode(page: fitz.Page, embedded: bool, dpi: int | None = None,
+                grayscale: bool | None = None) -> tuple[bytes, str, int | None, bool | None]:
+        if renderer is not None:
+            # Renderiza em outro processo, que abre o PDF por conta própria
+            return renderer.render(page.parent.name, page.number, image_format, quality, embedded,
+                                   adaptive_resolution, dpi, grayscale, encode_stats)
+        # DPI e cor só são escolhidos se a página for renderizada (não para a imagem embutida)
+        choice = RenderChoice(adaptive_resolution, dpi, grayscale)
+        with lock:
+            content, content_format = page_image_bytes(
+                page, image_format, quality, embedded, encode_stats, render_options=choice)
+        return content, content_format, choice.dpi, choice.grayscale
+
+    def _signature(page: fitz.Page) -> PageSignature:
+        if renderer is not None:
+            return renderer.signature(page.parent.name, page.number)
+        with lock:
+            return page_signature(page)
+
+    def _recognize(ocr_backend: OcrBackend, page: fitz.Page,
+                   signature: PageSignature | None = None) -> tuple[str, list[Word]]:
+        # Codifica a página direto em memória, sem arquivo temporário
+        content, content_format, dpi, grayscale = _encode(page, use_embedded)
+        text, words = _detect(ocr_backend, content, content_format, backend_page)
+
+        # Resultado duvidoso: tenta de novo uma vez, renderizando com mais DPI
+        ink = (lambda: signature.ink) if signature is not None else (lambda: _signature(page).ink)
+        if adaptive_resolution and (dpi is None or dpi < RETRY_DPI) and is_low_confidence(text, words, ink):
+            if encode_stats is not None:
+                encode_stats.add_retry()
+            content, content_format, _, _ = _encode(page, False, RETRY_DPI, grayscale)
+            retry_text, retry_words = _detect(ocr_backend, content, content_format, backend_page)
+            if better_text(text, retry_text, words, retry_words) != text:
+                text, words = retry_text, retry_words
+        return text, words
+
     def _OCR(page: fitz.Page, page_num: int) -> str:
-        pix = page.get_pixmap(matrix=fitz.Identity)  # type: ignore
-        img = Image.frombuffer(
-            "RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", 0, 1)
-        temp_image_path = Path(__file__).parent / f"page{page_num}.png"
-        img.save(temp_image_path)
-        # Lê o arquivo da imagem
+        ocr_backend = backend if backend is not None else get_default_backend()
         try:
-            content = None
-            with open(temp_image_path, 'rb') as image_file:
-                content = image_file.read()
-            os.remove(temp_image_path)
-            # Realiza a detecção de texto
-            response = client.text_detection(  # type: ignore[attr-defined]
-                image=vision.Image(content=content))
-
-            # Verifica se há erro
-            if response.error.message:
-                raise Exception(
-                    '{}\nPara mais detalhes: {}'.format(
-                        response.error.message,
-                        response.error.details
-                    )
-                )
-            # Retorna o texto completo (primeira anotação contém todo o texto)
-            if response.text_annotations:
-                return f"\n\n------------ Inicio da pagina {page_num} ------------\n\n{response.text_annotations[0].description}\n\n------------ Fim da pagina {page_num} ------------\n\n"
+            if dedup is not None:
+                # Página em branco ou já vista: não chama o backend
+                signature = _signature(page)
+                if dedup.skip_blank(signature):
+                    return format_page(page_num, BLANK_TEXT)
+                if layout is not None:
+                    text, words = unpack_result(
+                        dedup.resolve(signature, lambda: pack_result(*_recognize(ocr_backend, page, signature))))
+                else:
+                    text, words = dedup.resolve(signature, lambda: _recognize(ocr_backend, page, signature)[0]), []
+            else:
+                text, words = _recognize(ocr_backend, page)
+            if layout is not None:
+                layout.add_page(page_num, words)
+
+            if text:
+                return format_page(page_num, text)
             else:
                 return "Não foi possivel detectar texto"
         except Exception as e:
@@ -96,14 +201,10 @@ def OCR_Single_Image(path: str) -> str:
     """
     try:
         img = Image.open(path)
-        temp_image_path = os.path.join("Temp",f"page.png")
-        img.save(temp_image_path)
-        content = None
-        with open(temp_image_path, 'rb') as image_file:
-            content = image_file.read()
-        os.remove(temp_image_path)
-        response = client.text_detection(image=vision.Image(content=content))  # type: ignore[attr-defined]
-        return   response.text_annotations[0].description
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        content = buffer.getvalue()
+        return get_default_backend().detect_text(content)
     except Exception as e:
         print(f"Error processing image: {str(e)}")
         raise
@@ -0,0 +1,218 @@
+"""
+### 🎚️ Concurrency Module
+Self-tuning limit of OCR requests in flight (AIMD: additive increase, multiplicative decrease).
+OCR is network-bound, so the right concurrency depends on the API latency and quota, not on the
+CPU count. The limit grows by one per round while latency and errors stay healthy, stops growing
+when latency degrades, and is cut in half when the API throttles. Each change is logged, so the
+steady-state concurrency of a run is visible in its output.
+"""
+
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+import fitz
+
+from Tools import load_config_section
+
+from .backends import OcrBackend
+from .layout import Word
+from .ratelimit import is_quota_error
+
+
+# GLOBAL VARIABLES
+
+DEFAULT_CONCURRENCY = {
+    "initial": 0,  # 0 usa cpu_count * 2, o antigo valor fixo
+    "minimum": 2,
+    "maximum": 64,
+}
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_THROTTLED = "throttled"
+
+
+class AimdController:
+    """
+    ### 🎚️ AimdController
+    Adaptive limit of concurrent requests. Callers take a slot with `acquire()` and give it back with
+    `release(latency, outcome)`; the limit is re-evaluated once per round (as many completions as the limit).
+
+    ### 🖥️ Parameters
+        - `initial` (`int`, optional): Starting limit. Defaults to the `ocr_concurrency` section of
+          `config.yaml` (`0` there means `cpu_count * 2`).
+        - `minimum` (`int`, optional): Lowest limit. Same default source (`2`).
+        - `maximum` (`int`, optional): Highest limit. Same default source (`64`).
+        - `increase` (`float`, optional): Added to the limit after a healthy round. Defaults to `1.0`.
+        - `decrease` (`float`, optional): Factor applied on throttling or errors. Defaults to `0.5`.
+        - `latency_tolerance` (`float`, optional): A round whose mean latency is above `baseline * tolerance`
+          holds the limit instead of increasing it. Defaults to `1.5`.
+        - `error_threshold` (`float`, optional): Error fraction of a round that triggers a decrease. Defaults to `0.1`.
+        - `log` (`bool`, optional): Print each change of the limit. Defaults to `True`.
+
+    ### 💡 Example
+    >>> controller = AimdController(initial=8, maximum=48)
+    >>> controller.acquire()
+    >>> controller.release(0.82, OUTCOME_OK)
+    >>> controller.summary()
+    'steady state 22 in flight (range 8-26), 3 increases held by latency, 2 decreases (2 on throttling)'
+
+    ### 📚 Notes
+    - The latency baseline is the best round mean seen, allowed to creep up 2% per round, so a service that
+      becomes slower for good is not read as congestion forever.
+    - A throttled request cuts the limit at once, but only once per round: a burst of 429s from one
+      overloaded moment counts as one signal.
+    """
+
+    def __init__(self, initial: int | None = None, minimum: int | None = None, maximum: int | None = None,
+                 increase: float = 1.0, decrease: float = 0.5, latency_tolerance: float = 1.5,
+                 error_threshold: float = 0.1, log: bool = True):
+        config = load_config_section("ocr_concurrency", DEFAULT_CONCURRENCY)
+        self.minimum = max(1, int(minimum if minimum is not None else config["minimum"]))
+        self.maximum = max(self.minimum, int(maximum if maximum is not None else config["maximum"]))
+        initial = int(initial if initial is not None else config["initial"]) or int(os.cpu_count() * 2)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.log = log
+        self.in_flight = 0
+        self.baseline: float | None = None
+        self.increases = 0
+        self.holds = 0
+        self.decreases = 0
+        self.throttle_decreases = 0
+        self.low = self.high = int(self.limit)
+        self._latencies: list[float] = []
+        self._errors = 0
+        self._throttled_this_round = False
+        self._history: deque = deque(maxlen=20)
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Blocks until a request slot is free under the current limit."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, outcome: str = OUTCOME_OK) -> None:
+        """Returns a slot with the latency (seconds) and outcome of the request, and adjusts the limit."""
+        with self._condition:
+            self.in_flight -= 1
+            self._latencies.append(latency)
+            if outcome != OUTCOME_OK:
+                self._errors += 1
+            if outcome == OUTCOME_THROTTLED and not self._throttled_this_round:
+                self._throttled_this_round = True
+                self.throttle_decreases += 1
+                self._set(self.limit * self.decrease, "throttled")
+            elif len(self._latencies) >= int(self.limit):
+                self._end_round()
+            self._condition.notify_all()
+
+    def _end_round(self) -> None:
+        """Caller holds the condition."""
+        mean = statistics.fmean(self._latencies)
+        error_rate = self._errors / len(self._latencies)
+        detail = f"{mean * 1000:.0f} ms avg, {error_rate:.0%} errors"
+        if self._throttled_this_round:
+            pass
+        elif error_rate > self.error_threshold:
+            self._set(self.limit * self.decrease, f"errors: {detail}")
+        elif self.baseline is not None and mean > self.baseline * self.latency_tolerance:
+            self.holds += 1
+        else:
+            self._set(self.limit + self.increase, f"healthy: {detail}")
+        if not error_rate:
+            self.baseline = mean if self.baseline is None else min(mean, self.baseline * 1.02)
+        self._history.append(int(self.limit))
+        self._latencies = []
+        self._errors = 0
+        self._throttled_this_round = False
+
+    def _set(self, value: float, reason: str) -> None:
+        old = int(self.limit)
+        self.limit = float(min(self.maximum, max(self.minimum, value)))
+        new = int(self.limit)
+        if new > old:
+            self.increases += 1
+        elif new < old:
+            self.decreases += 1
+        self.low, self.high = min(self.low, new), max(self.high, new)
+        if self.log and new != old:
+            print(f"[🎚️]: OCR concurrency {old} -> {new} ({reason})")
+
+    def steady_state(self) -> int:
+        """Median limit over the last rounds."""
+        with self._condition:
+            history = list(self._history) or [int(self.limit)]
+        return int(statistics.median(history))
+
+    def summary(self) -> str:
+        steady = self.steady_state()
+        with self._condition:
+            return (
+                f"steady state {steady} in flight (range {self.low}-{self.high}), "
+                f"{self.holds} increases held by latency, "
+                f"{self.decreases} decreases ({self.throttle_decreases} on throttling)"
+            )
+
+
+class AdaptiveBackend:
+    """
+    ### 🎚️ AdaptiveBackend
+    Wraps any `OcrBackend` so that every call takes a slot from an `AimdController` and reports its latency
+    and outcome. It keeps the wrapped backend's `name`, so cache keys do not change.
+
+    ### 🖥️ Parameters
+        - `backend` (`OcrBackend`): The backend that does the work.
+        - `controller` (`AimdController`, optional): Defaults to one built from `config.yaml`.
+
+    ### 💡 Example
+    >>> backend = RateLimitedBackend(AdaptiveBackend(VisionBackend(batch_size=8)))
+
+    ### 📚 Notes
+    - Put it inside `RateLimitedBackend`, so each retry attempt is measured and a quota error reaches the
+      controller before the backoff sleep (which is not counted as in flight).
+    - Failures are re-raised unchanged; quota errors count as `throttled`, any other failure as `error`.
+    - A batching backend (`VisionBackend.cap_batches`) closes its batches at the current limit. Otherwise, with
+      the limit below `batch_size`, every batch would wait `max_wait` and that wait would read as latency.
+    """
+
+    def __init__(self, backend: OcrBackend, controller: AimdController | None = None):
+        self.backend = backend
+        self.name = backend.name
+        self.controller = controller if controller is not None else AimdController()
+        cap_batches = getattr(backend, "cap_batches", None)
+        if cap_batches is not None:
+            cap_batches(lambda: int(self.controller.limit))
+
+    def _call(self, detect, content: bytes, page: fitz.Page | None):
+        self.controller.acquire()
+        start = time.monotonic()
+        outcome = OUTCOME_OK
+        try:
+            return detect(content, page)
+        except Exception as e:
+            outcome = OUTCOME_THROTTLED if is_quota_error(e) else OUTCOME_ERROR
+            raise
+        finally:
+            self.controller.release(time.monotonic() - start, outcome)
+
+    def detect_text(self, content: bytes, page: fitz.Page | None = None) -> str:
+        return self._call(self.backend.detect_text, content, page)
+
+    def detect_layout(self, content: bytes, page: fitz.Page | None = None) -> tuple[str, list[Word]]:
+        detect_layout = getattr(self.backend, "detect_layout", None)
+        if detect_layout is None:
+            return self._call(self.backend.detect_text, content, page), []
+        return self._call(detect_layout, content, page)
+
+    def stats(self) -> dict:
+        stats = dict(self.backend.stats())
+        stats["concurrency"] = self.controller.steady_state()
+        return stats
@@ -0,0 +1,179 @@
+"""
+### 🧹 Dedup Module
+Cheap pre-OCR stage. Each page that would go to OCR gets a grayscale render, from which an ink density
+and a perceptual hash are computed. Blank separators are skipped, and pages that look the same as one
+already recognized (repeated certificates, signature pages, the same medical attachment
+uploaded in several events) reuse its text, within the run and across runs through the page cache.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+import fitz
+from PIL import Image, ImageDraw
+
+from .cache import PageCache
+from .encoding import scanned_image_xref
+
+
+# GLOBAL VARIABLES
+
+SIGNATURE_DPI = 72  # abaixo disso "Pagina 2" e "Pagina 3" geram a mesma imagem
+GRAY_LEVELS_SHIFT = 4  # quantiza para 16 níveis de cinza antes do hash
+INK_DELTA = 48  # pixel é "tinta" quando está este tanto mais escuro que o fundo
+BLANK_INK = 0.0005  # fração de tinta abaixo da qual a página é considerada em branco
+BLANK_TEXT = "Pagina em branco"
+
+
+class PageSignature:
+    """
+    Ink density (`0.0`-`1.0`) and perceptual hash (SHA-256 digest) of a page, and whether it has text-layer
+    content besides a signature stamp (such a page is never blank, whatever its ink).
+    """
+
+    __slots__ = ("ink", "hash", "has_text")
+
+    def __init__(self, ink: float, hash: bytes, has_text: bool = False):
+        self.ink = ink
+        self.hash = hash
+        self.has_text = has_text
+
+    @property
+    def blank(self) -> bool:
+        return self.ink < BLANK_INK and not self.has_text
+
+
+def _render_gray(page: fitz.Page) -> tuple[Image.Image, bool]:
+    """
+    Low-DPI grayscale render and whether the page has text-layer content. On a scanned page the text overlay
+    (EPROC signature stamp) is painted out and does not count as content.
+    """
+    scale = SIGNATURE_DPI / 72
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)  # type: ignore
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+    blocks = page.get_text("blocks")
+    if scanned_image_xref(page) is None:
+        # Texto curto de página nativa (atestado de uma linha) é conteúdo, não carimbo
+        return image, any(block[4].strip() for block in blocks)
+
+    # O carimbo muda a cada evento/página: sem ele, o mesmo anexo enviado duas vezes tem o mesmo hash
+    draw = ImageDraw.Draw(image)
+    for block in blocks:
+        draw.rectangle([block[0] * scale, block[1] * scale, block[2] * scale, block[3] * scale], fill=255)
+    return image, False
+
+
+def page_signature(page: fitz.Page) -> PageSignature:
+    """
+    ### 🧹 page_signature
+    Computes the ink density and perceptual hash of a page.
+
+    ### 📌 Notes
+    - Ink is counted relative to the page background (the most common gray level), so yellowed or gray
+      scans of blank sheets still count as blank.
+    - The stamp is only painted out of scanned pages (a single full-page image, see
+      `encoding.scanned_image_xref`). Any other page with text in its text layer is never blank.
+    - The hash is a digest of the 72 DPI render quantized to 16 gray levels, with the stamp painted out.
+      It ignores how the page is stored (re-saved PDF, different stamp, event or page number) but not what
+      it shows: a single changed digit gives a different hash. Similarity hashes (dHash, pHash) were not
+      used because at the sizes they work on, pages of the same form with different values collide, and
+      reusing the wrong text in a medical report is worse than one extra OCR call.
+    """
+    image, has_text = _render_gray(page)
+    histogram = image.histogram()
+    background = max(range(256), key=histogram.__getitem__)
+    ink = sum(histogram[:max(0, background - INK_DELTA)]) / max(1, image.width * image.height)
+
+    quantized = image.point(lambda level: level >> GRAY_LEVELS_SHIFT)
+    digest = hashlib.sha256(f"{image.width}x{image.height}:".encode("ascii"))
+    digest.update(quantized.tobytes())
+    return PageSignature(ink, digest.digest(), has_text)
+
+
+class PageDeduplicator:
+    """
+    ### 🧹 PageDeduplicator
+    Skips blank pages and shares one OCR result among visually identical pages.
+
+    ### 🖥️ Parameters
+        - `cache` (`PageCache`, optional): Persistent store for hash -> text, so a page already recognized in an
+          earlier run (another process with the same attachment) is reused too. Defaults to `None` (this run only).
+        - `namespace` (`str`, optional): Part of the cache key, usually the backend name. Defaults to `""`.
+
+    ### 💡 Example
+    >>> dedup = PageDeduplicator(cache, "vision")
+    >>> OCR(page, 1, dedup=dedup)
+    >>> dedup.summary()
+    '12 blank pages skipped, 30 duplicates reused (8 from earlier runs): 42 backend calls avoided'
+
+    ### 📚 Notes
+    - Thread-safe. When two workers hit the same page at once, the second waits for the first instead of
+      calling the backend again.
+    - Keeps the text of every distinct page seen in the run (a few KB per page).
+    """
+
+    def __init__(self, cache: PageCache | None = None, namespace: str = ""):
+        self.cache = cache
+        self.namespace = namespace
+        self.blank = 0
+        self.duplicates = 0
+        self.reused = 0
+        self._seen: dict[bytes, Future] = {}
+        self._lock = threading.Lock()
+
+    def skip_blank(self, signature: PageSignature) -> bool:
+        """`True` (and counted) when the page is blank and should not be recognized."""
+        if not signature.blank:
+            return False
+        with self._lock:
+            self.blank += 1
+        return True
+
+    def resolve(self, signature: PageSignature, recognize: Callable[[], str]) -> str:
+        """Returns the text of a page with this signature, calling `recognize` only for the first one."""
+        with self._lock:
+            future = self._seen.get(signature.hash)
+            owner = future is None
+            if owner:
+                future = self._seen[signature.hash] = Future()
+            else:
+                self.duplicates += 1
+        if not owner:
+            return future.result()
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.key_for(signature.hash, "phash", self.namespace)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                with self._lock:
+                    self.reused += 1
+                future.set_result(cached)
+                return cached
+
+        try:
+            text = recognize()
+        except Exception as e:
+            # Libera a assinatura: a próxima página igual tenta de novo
+            with self._lock:
+                self._seen.pop(signature.hash, None)
+            future.set_exception(e)
+            raise
+        if self.cache is not None:
+            self.cache.put(cache_key, text)
+        future.set_result(text)
+        return text
+
+    def calls_avoided(self) -> int:
+        with self._lock:
+            return self.blank + self.duplicates + self.reused
+
+    def summary(self) -> str:
+        with self._lock:
+            return (
+                f"{self.blank} blank pages skipped, {self.duplicates + self.reused} duplicates reused "
+                f"({self.reused} from earlier runs): {self.blank + self.duplicates + self.reused} backend calls avoided"
+            )
@@ -0,0 +1,245 @@
+"""
+### 🖼️ Encoding Module
+In-memory page encoding for the OCR pipeline. Pages are rendered with `fitz` and encoded straight
+from the pixmap into a `bytes` buffer, so no temporary image file is ever written to disk.
+
+Scanned pages that are a single full-page image can skip rendering altogether: the original
+embedded image bytes (usually JPEG) are sent to the OCR backend unchanged.
+"""
+
+import threading
+import time
+from typing import Callable
+
+import fitz
+
+
+# GLOBAL VARIABLES
+
+SUPPORTED_FORMATS = ("png", "jpeg", "webp")
+DEFAULT_FORMAT = "png"
+DEFAULT_QUALITY = 85
+
+PATH_EMBEDDED = "embedded"
+PATH_RENDERED = "rendered"
+
+# Formatos que o Vision aceita como vieram do PDF
+PASSTHROUGH_FORMATS = {"jpeg", "jpg", "png", "gif", "bmp", "tiff", "tif", "webp"}
+MIN_IMAGE_COVERAGE = 0.85
+MAX_OVERLAY_CHARS = 200  # carimbo de assinatura sobre a imagem ainda conta como página escaneada
+
+
+def normalize_format(image_format: str) -> str:
+    """
+    ### 🔤 normalize_format
+    Normalizes an image format name (`"PNG"`, `"jpg"`, `"JPEG"`, `"WebP"`...) to one of `SUPPORTED_FORMATS`.
+
+    #### ⚠️ Raises
+    - `ValueError`: If the format is not supported.
+    """
+    fmt = image_format.lower().strip().lstrip(".")
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(
+            f"Unsupported image format: {image_format}. Use one of {', '.join(SUPPORTED_FORMATS)}"
+        )
+    return fmt
+
+
+def encode_pixmap(pix: fitz.Pixmap, image_format: str = DEFAULT_FORMAT, quality: int = DEFAULT_QUALITY) -> bytes:
+    """
+    ### 🖼️ encode_pixmap
+    Encodes a `fitz.Pixmap` into an in-memory image buffer.
+
+    ### 🖥️ Parameters
+    - `pix` (`fitz.Pixmap`): The rendered page.
+    - `image_format` (`str`, optional): `"png"`, `"jpeg"` or `"webp"`. Defaults to `"png"`.
+    - `quality` (`int`, optional): Lossy quality (1-100) for JPEG and WebP. Ignored for PNG. Defaults to `85`.
+
+    ### 🔄 Returns
+    - `bytes`: The encoded image.
+
+    ### 📌 Notes
+    - PNG and JPEG are encoded natively by MuPDF (`pix.tobytes`). WebP goes through Pillow's in-memory encoder.
+    """
+    fmt = normalize_format(image_format)
+    if fmt == "png":
+        return pix.tobytes("png")
+    if fmt == "jpeg":
+        return pix.tobytes("jpeg", jpg_quality=quality)
+    return pix.pil_tobytes(format="WEBP", quality=quality)
+
+
+def encode_page(page: fitz.Page, image_format: str = DEFAULT_FORMAT, quality: int = DEFAULT_QUALITY,
+                matrix: fitz.Matrix = fitz.Identity, grayscale: bool = False) -> bytes:
+    """
+    ### 🖼️ encode_page
+    Renders a PDF page and returns the encoded image bytes, without touching the disk.
+
+    ### 🖥️ Parameters
+    - `page` (`fitz.Page`): The PDF page to be rendered.
+    - `image_format` (`str`, optional): `"png"`, `"jpeg"` or `"webp"`. Defaults to `"png"`.
+    - `quality` (`int`, optional): Lossy quality for JPEG and WebP. Defaults to `85`.
+    - `matrix` (`fitz.Matrix`, optional): Render transformation. Defaults to `fitz.Identity` (72 DPI).
+    - `grayscale` (`bool`, optional): Render a single gray channel instead of RGB. Defaults to `False`.
+
+    ### 🔄 Returns
+    - `bytes`: The encoded page image.
+
+    ### 💡 Example
+
+    >>> content = encode_page(document[0], "jpeg", 80)
+    """
+    pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY if grayscale else fitz.csRGB)  # type: ignore
+    return encode_pixmap(pix, image_format, quality)
+
+
+class EncodeStats:
+    """
+    ### 📊 EncodeStats
+    Thread-safe counters of pages, bytes uploaded and encode time per encoding path
+    (`PATH_EMBEDDED` or `PATH_RENDERED`), shared by every OCR worker of a run.
+
+    ### 💡 Example
+    >>> stats = EncodeStats()
+    >>> stats.add(PATH_RENDERED, 120_000, 0.031)
+    >>> stats.summary()
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = {PATH_EMBEDDED: 0, PATH_RENDERED: 0}
+        self.bytes = {PATH_EMBEDDED: 0, PATH_RENDERED: 0}
+        self.seconds = {PATH_EMBEDDED: 0.0, PATH_RENDERED: 0.0}
+        self.grayscale = 0
+        self.retries = 0
+
+    def add(self, path: str, nbytes: int, seconds: float, grayscale: bool = False) -> None:
+        with self._lock:
+            self.pages[path] += 1
+            self.bytes[path] += nbytes
+            self.seconds[path] += seconds
+            self.grayscale += int(grayscale)
+
+    def add_retry(self) -> None:
+        """Counts a page re-rendered at a higher DPI after a low-confidence result."""
+        with self._lock:
+            self.retries += 1
+
+    def estimated_time_saved(self) -> float:
+        """Embedded pages x average render time, minus the time spent extracting them (seconds)."""
+        with self._lock:
+            if not self.pages[PATH_RENDERED]:
+                return 0.0
+            avg_render = self.seconds[PATH_RENDERED] / self.pages[PATH_RENDERED]
+            return max(0.0, self.pages[PATH_EMBEDDED] * avg_render - self.seconds[PATH_EMBEDDED])
+
+    def summary(self) -> str:
+        total_bytes = self.bytes[PATH_EMBEDDED] + self.bytes[PATH_RENDERED]
+        return (
+            f"{self.pages[PATH_EMBEDDED]} embedded / {self.pages[PATH_RENDERED]} rendered pages, "
+            f"{self.grayscale} grayscale, {self.retries} high-DPI retries, "
+            f"{total_bytes / (1024 * 1024):.1f} MB uploaded, "
+            f"~{self.estimated_time_saved():.2f}s encode time saved"
+        )
+
+
+def scanned_image_xref(page: fitz.Page, min_coverage: float = MIN_IMAGE_COVERAGE,
+                       max_overlay_chars: int = MAX_OVERLAY_CHARS) -> int | None:
+    """
+    ### 🖼️ scanned_image_xref
+    xref of the single image that makes up a scanned page, or `None` when the page is not a scan: more than
+    one image, a soft mask, an image covering less than `min_coverage` of the page, or more than
+    `max_overlay_chars` characters of text on top of it (a signature stamp is allowed).
+    """
+    images = page.get_images(full=True)
+    if len(images) != 1:
+        return None
+    xref, smask = images[0][0], images[0][1]
+    if smask:
+        return None
+
+    rects = page.get_image_rects(xref)
+    if len(rects) != 1:
+        return None
+    page_area = abs(page.rect)
+    if not page_area or abs(rects[0] & page.rect) / page_area < min_coverage:
+        return None
+
+    text = page.get_text("text")
+    if sum(1 for ch in text if not ch.isspace()) > max_overlay_chars:
+        return None
+    return xref
+
+
+def extract_page_image(page: fitz.Page, min_coverage: float = MIN_IMAGE_COVERAGE,
+                       max_overlay_chars: int = MAX_OVERLAY_CHARS) -> tuple[bytes, str] | None:
+    """
+    ### 🖼️ extract_page_image
+    Returns the original embedded image of a single-image (scanned) page, or `None` for composite pages.
+
+    ### 🖥️ Parameters
+    - `page` (`fitz.Page`): The PDF page.
+    - `min_coverage` (`float`, optional): Minimum fraction of the page the image must cover. Defaults to `0.85`.
+    - `max_overlay_chars` (`int`, optional): Maximum text on top of the image (signature stamps). Defaults to `200`.
+
+    ### 🔄 Returns
+    - `tuple[bytes, str] | None`: (image bytes, format) or `None` when the page must be rendered.
+
+    ### 📌 Notes
+    - JPEG/PNG/TIFF... are returned byte-for-byte. Formats Vision does not accept (JBIG2, JPX) are decoded
+      at their native resolution and encoded as PNG, which still skips rasterizing the page.
+    - Images with a soft mask, cropped images and pages with several images are treated as composite
+      (see `scanned_image_xref`).
+    """
+    xref = scanned_image_xref(page, min_coverage, max_overlay_chars)
+    if xref is None:
+        return None
+
+    extracted = page.parent.extract_image(xref)
+    if not extracted or not extracted.get("image"):
+        return None
+    ext = extracted["ext"].lower()
+    if ext in PASSTHROUGH_FORMATS:
+        return extracted["image"], "jpeg" if ext == "jpg" else ext
+
+    pix = fitz.Pixmap(page.parent, xref)
+    if pix.colorspace is None:
+        return None
+    if pix.colorspace.n > 3:
+        pix = fitz.Pixmap(fitz.csRGB, pix)
+    return pix.tobytes("png"), "png"
+
+
+def page_image_bytes(page: fitz.Page, image_format: str = DEFAULT_FORMAT, quality: int = DEFAULT_QUALITY,
+                     use_embedded: bool = True, stats: EncodeStats | None = None,
+                     matrix: fitz.Matrix = fitz.Identity, grayscale: bool = False,
+                     render_options: Callable[[fitz.Page], tuple[fitz.Matrix, bool]] | None = None) -> tuple[bytes, str]:
+    """
+    ### 🖼️ page_image_bytes
+    Image payload for the OCR backend: the original embedded image for single-image pages
+    (when `use_embedded`), otherwise the page rendered with `matrix`/`grayscale` and encoded with `encode_page`.
+
+    ### 🔄 Returns
+    - `tuple[bytes, str]`: (image bytes, format of the bytes).
+
+    ### 📌 Notes
+    - `render_options`, when given, is called only if the page is rendered, and its `(matrix, grayscale)` replace
+      `matrix`/`grayscale` (see `resolution.RenderChoice`). Its time counts as encode time.
+    """
+    start = time.perf_counter()
+    if use_embedded:
+        embedded = extract_page_image(page)
+        if embedded is not None:
+            if stats is not None:
+                stats.add(PATH_EMBEDDED, len(embedded[0]), time.perf_counter() - start)
+            return embedded
+        start = time.perf_counter()
+
+    if render_options is not None:
+        matrix, grayscale = render_options(page)
+    content = encode_page(page, image_format, quality, matrix, grayscale)
+    if stats is not None:
+        stats.add(PATH_RENDERED, len(content), time.perf_counter() - start, grayscale)
+    return content, normalize_format(image_format)
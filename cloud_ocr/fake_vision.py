@@ -0,0 +1,89 @@
+"""
+### 🧪 Fake Vision Module
+Local stand-in for `vision.ImageAnnotatorClient`. It answers `text_detection`,
+`document_text_detection` and `batch_annotate_images` without network access and records how many requests and images it
+received, so batching and caching can be checked offline. It builds its own requests (`annotate_request`), so the
+Vision SDK does not need to be installed.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable
+
+
+def _full_text(text: str):
+    """`full_text_annotation` with one block per line and one word box per whitespace-separated token."""
+    blocks = []
+    for row, line in enumerate(text.split("\n")):
+        words = [
+            SimpleNamespace(
+                confidence=0.99,
+                symbols=[SimpleNamespace(text=token)],
+                bounding_box=SimpleNamespace(vertices=[
+                    SimpleNamespace(x=column * 100, y=row * 20), SimpleNamespace(x=column * 100 + 90, y=row * 20),
+                    SimpleNamespace(x=column * 100 + 90, y=row * 20 + 16), SimpleNamespace(x=column * 100, y=row * 20 + 16),
+                ]),
+            )
+            for column, token in enumerate(line.split())
+        ]
+        if words:
+            blocks.append(SimpleNamespace(paragraphs=[SimpleNamespace(words=words)]))
+    pages = [SimpleNamespace(width=1000, height=1400, blocks=blocks)] if blocks else []
+    return SimpleNamespace(text=text, pages=pages)
+
+
+def _response(text: str):
+    """Minimal object with the same shape as an `AnnotateImageResponse`."""
+    annotations = [SimpleNamespace(description=text)] if text else []
+    return SimpleNamespace(error=SimpleNamespace(message="", details=[]), text_annotations=annotations,
+                           full_text_annotation=_full_text(text))
+
+
+class FakeVisionClient:
+    """
+    ### 🧪 FakeVisionClient
+    Records requests and returns deterministic text for each image.
+
+    ### 🖥️ Parameters
+        - `text_fn` (`Callable[[bytes], str]`, optional): Maps image bytes to the detected text.
+          Defaults to a string with the image size.
+        - `latency` (`float`, optional): Seconds slept per request, to mimic the round trip. Defaults to `0.0`.
+
+    ### 💡 Example
+    >>> fake = FakeVisionClient()
+    >>> backend = VisionBackend(client=fake, batch_size=8)
+    >>> fake.requests, fake.images
+    (0, 0)
+    """
+
+    def __init__(self, text_fn: Callable[[bytes], str] | None = None, latency: float = 0.0):
+        self.text_fn = text_fn or (lambda content: f"fake text ({len(content)} bytes)")
+        self.latency = latency
+        self.requests = 0
+        self.images = 0
+        self._lock = threading.Lock()
+
+    def _count(self, images: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.images += images
+        if self.latency:
+            time.sleep(self.latency)
+
+    def annotate_request(self, content: bytes, document: bool = False):
+        """Request shaped like `vision.AnnotateImageRequest` (`image.content`, `features`), built without the SDK."""
+        feature = "DOCUMENT_TEXT_DETECTION" if document else "TEXT_DETECTION"
+        return SimpleNamespace(image=SimpleNamespace(content=content), features=[SimpleNamespace(type_=feature)])
+
+    def text_detection(self, image=None, **kwargs):
+        self._count(1)
+        return _response(self.text_fn(image.content))
+
+    def document_text_detection(self, image=None, **kwargs):
+        return self.text_detection(image=image, **kwargs)
+
+    def batch_annotate_images(self, requests=None, **kwargs):
+        requests = list(requests or [])
+        self._count(len(requests))
+        return SimpleNamespace(responses=[_response(self.text_fn(r.image.content)) for r in requests])
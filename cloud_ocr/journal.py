@@ -0,0 +1,144 @@
+"""
+### 📓 Journal Module
+Append-only, per-document checkpoint of recognized pages. Every finished page is appended to a JSONL
+file as soon as it completes, so a run that dies on page 700 of 800 resumes from the journal and only
+recognizes the pages that are missing. The final `.txt` is assembled from the journal in page order.
+"""
+
+import hashlib
+import json
+import os
+
+
+# GLOBAL VARIABLES
+
+DEFAULT_JOURNAL_DIR = os.path.join("Cache", "journal")
+JOURNAL_VERSION = 1
+
+
+def file_fingerprint(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of the file contents. A journal is only replayed for the exact same PDF."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PageJournal:
+    """
+    ### 📓 PageJournal
+    JSONL journal of one document: a header line with the PDF fingerprint, then one line per page with
+    `page`, `kind`, `hash` and `text`.
+
+    ### 🖥️ Parameters
+        - `path` (`str`): Journal file, e.g. `Cache/journal/<processo>.jsonl`.
+        - `source` (`str`): Fingerprint of the PDF (see `file_fingerprint`).
+
+    ### 💡 Example
+    >>> journal = PageJournal("Cache/journal/processo.jsonl", file_fingerprint(pdf_path))
+    >>> done = journal.replay()          # {page: (kind, text)} of a previous, interrupted run
+    >>> journal.append(3, "ocr", text)
+    >>> journal.assemble("Output/processo.txt.part")
+    >>> journal.remove()
+
+    ### 📚 Notes
+    - A journal written for a different PDF (re-downloaded with new pages) is discarded.
+    - A line torn by a crash, or whose text does not match its hash, is ignored and that page is redone.
+    - When a page appears more than once, the last entry wins.
+    - Each line is flushed as it is written, so the journal survives the process dying; it is not fsync'ed
+      per page, which would cost more than re-recognizing the few pages an OS crash could lose.
+    - Not thread-safe on its own: `DocumentJob` calls it under its lock.
+    """
+
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.source = source
+        self._offsets: dict[int, int] = {}
+        self._file = None
+
+    def replay(self) -> dict[int, tuple[str, str]]:
+        """Reads the valid entries of a previous run, then opens the journal for appending."""
+        entries: dict[int, tuple[str, str]] = {}
+        valid_end = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as file:
+                header = self._parse(file.readline())
+                if header and header.get("source") == self.source and header.get("version") == JOURNAL_VERSION:
+                    valid_end = file.tell()
+                    while True:
+                        offset = file.tell()
+                        line = file.readline()
+                        if not line:
+                            break
+                        entry = self._parse(line)
+                        if not line.endswith(b"\n") or not entry or _text_hash(entry.get("text", "")) != entry.get("hash"):
+                            # Linha cortada pela queda: descarta daqui em diante
+                            break
+                        entries[entry["page"]] = (entry["kind"], entry["text"])
+                        self._offsets[entry["page"]] = offset
+                        valid_end = file.tell()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if valid_end:
+            self._file = open(self.path, "r+b")
+            self._file.truncate(valid_end)
+            self._file.seek(valid_end)
+        else:
+            entries.clear()
+            self._offsets.clear()
+            self._file = open(self.path, "wb")
+            self._write({"version": JOURNAL_VERSION, "source": self.source})
+        return entries
+
+    @staticmethod
+    def _parse(line: bytes) -> dict | None:
+        try:
+            value = json.loads(line)
+        except ValueError:
+            return None
+        return value if isinstance(value, dict) else None
+
+    def _write(self, value: dict) -> int:
+        offset = self._file.tell()
+        self._file.write(json.dumps(value, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._file.flush()
+        return offset
+
+    def append(self, page_num: int, kind: str, text: str) -> None:
+        """Checkpoints one finished page."""
+        if self._file is None:
+            self.replay()
+        self._offsets[page_num] = self._write(
+            {"page": page_num, "kind": kind, "hash": _text_hash(text), "text": text}
+        )
+
+    def assemble(self, output_path: str, pages: set[int] | None = None) -> int:
+        """Writes the text of every journaled page (or only of `pages`), in page order, to `output_path`."""
+        self._file.flush()
+        written = 0
+        with open(self.path, "rb") as source, open(output_path, "w", encoding="utf-8") as output:
+            for page_num in sorted(self._offsets):
+                if pages is not None and page_num not in pages:
+                    continue
+                source.seek(self._offsets[page_num])
+                output.write(json.loads(source.readline())["text"])
+                written += 1
+        return written
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        """Deletes the journal once the output is safely in place."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,408 @@
+"""
+### 🧱 Layout Module
+Optional structured OCR output: every recognized word with its page, block, confidence and bounding
+box, stored per document in a compact columnar file (`Output/<processo>.layout.bin`) that is read
+through `mmap`. Each column is a flat array, and a per-page row index lets a reader touch only the
+pages it asks for. This supports re-OCR of just the low-confidence regions of a page, and fast
+region-based extraction of dates and CIDs without reading the whole `.txt`.
+
+File layout (all offsets in bytes, columns aligned to 8):
+- `EPLAYOUT` magic, `uint32` little-endian header length, UTF-8 JSON header;
+- one array per column: `page` (`uint32`), `block` (`uint16`), `confidence` (`float32`),
+  `x0`, `y0`, `x1`, `y1` (`uint16`, box normalized to the page and scaled to 0-65535),
+  `text_end` (`uint32`, end offset of each word in the text heap);
+- the text heap, the UTF-8 text of every word back to back.
+"""
+
+import array
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+
+import fitz
+
+
+# GLOBAL VARIABLES
+
+LAYOUT_SUFFIX = ".layout.bin"
+LAYOUT_MAGIC = b"EPLAYOUT"
+LAYOUT_VERSION = 1
+COORD_SCALE = 65535
+LOW_CONFIDENCE = 0.6  # abaixo disso a palavra é candidata a nova leitura
+
+# (nome, typecode do módulo array)
+COLUMNS = (
+    ("page", "I"),
+    ("block", "H"),
+    ("confidence", "f"),
+    ("x0", "H"),
+    ("y0", "H"),
+    ("x1", "H"),
+    ("y1", "H"),
+    ("text_end", "I"),
+)
+
+# Padrões tolerantes a espaços: o OCR costuma separar "/" e "." em palavras próprias
+DATE_PATTERN = re.compile(r"\b\d{1,2}\s?[/.-]\s?\d{1,2}\s?[/.-]\s?\d{2,4}\b")
+CID_PATTERN = re.compile(r"\b[A-TV-Z]\s?\d{2}(?:\s?\.\s?\d{1,2})?\b")
+
+# Uma palavra: (block, confidence, x0, y0, x1, y1, text), caixa normalizada para 0.0-1.0 da página
+Word = tuple[int, float, float, float, float, float, str]
+
+
+def layout_path(output_path: str) -> str:
+    """`Output/<processo>.txt` -> `Output/<processo>.layout.bin`."""
+    return f"{os.path.splitext(output_path)[0]}{LAYOUT_SUFFIX}"
+
+
+def pack_result(text: str, words: list[Word]) -> str:
+    """Text and words of a page as one string, for the page cache and the dedup store."""
+    return json.dumps({"text": text, "words": words}, ensure_ascii=False, separators=(",", ":"))
+
+
+def unpack_result(value: str) -> tuple[str, list[Word]]:
+    """Inverse of `pack_result`."""
+    data = json.loads(value)
+    return data["text"], [tuple(word) for word in data["words"]]
+
+
+def text_layer_words(page: fitz.Page) -> list[Word]:
+    """Words of a born-digital page from its text layer, with confidence `1.0`."""
+    width, height = page.rect.width or 1.0, page.rect.height or 1.0
+    return [
+        (block, 1.0, x0 / width, y0 / height, x1 / width, y1 / height, text)
+        for x0, y0, x1, y1, text, block, *_ in page.get_text("words")
+    ]
+
+
+def words_from_annotation(annotation) -> list[Word]:
+    """
+    ### 🧱 words_from_annotation
+    Words of a Vision `full_text_annotation` (`pages` -> `blocks` -> `paragraphs` -> `words`), with the
+    word confidence and the box normalized by the annotated image size.
+    """
+    words: list[Word] = []
+    block_num = 0
+    for annotated_page in getattr(annotation, "pages", None) or []:
+        width = float(annotated_page.width or 1)
+        height = float(annotated_page.height or 1)
+        for block in annotated_page.blocks:
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    vertices = list(word.bounding_box.vertices)
+                    if vertices:
+                        xs = [vertex.x for vertex in vertices]
+                        ys = [vertex.y for vertex in vertices]
+                        box = (min(xs) / width, min(ys) / height, max(xs) / width, max(ys) / height)
+                    else:
+                        box = (0.0, 0.0, 0.0, 0.0)
+                    text = "".join(symbol.text for symbol in word.symbols)
+                    words.append((block_num, float(word.confidence), *box, text))
+            block_num += 1
+    return words
+
+
+def _coord(value: float) -> int:
+    return int(round(min(1.0, max(0.0, value)) * COORD_SCALE))
+
+
+class LayoutWriter:
+    """
+    ### 🧱 LayoutWriter
+    Collects the words of a document page by page (in any order, from any thread) and writes the
+    columnar file when the document is done.
+
+    ### 🖥️ Parameters
+        - `path` (`str`): Destination, usually `layout_path(output_path)`.
+
+    ### 💡 Example
+    >>> writer = LayoutWriter("Output/processo.layout.bin")
+    >>> writer.add_page(0, [(0, 0.98, 0.1, 0.1, 0.3, 0.12, "LAUDO")])
+    >>> writer.close()
+
+    ### 📚 Notes
+    - Pages are kept packed (about 22 bytes per word plus its text) until `close`, not as Python objects.
+    - A page added twice keeps its last words.
+    - The file is written to `<path>.part` and renamed, so readers never see a half-written file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pages: dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def add_page(self, page_num: int, words: list[Word]) -> None:
+        columns = {name: array.array(typecode) for name, typecode in COLUMNS if name not in ("page", "text_end")}
+        lengths = array.array("I")
+        heap = bytearray()
+        for block, confidence, x0, y0, x1, y1, text in words:
+            encoded = text.encode("utf-8")
+            columns["block"].append(min(block, 0xFFFF))
+            columns["confidence"].append(confidence)
+            columns["x0"].append(_coord(x0))
+            columns["y0"].append(_coord(y0))
+            columns["x1"].append(_coord(x1))
+            columns["y1"].append(_coord(y1))
+            lengths.append(len(encoded))
+            heap += encoded
+        with self._lock:
+            self._pages[page_num] = (columns, lengths, bytes(heap))
+
+    def close(self) -> str:
+        """Writes the file and returns its path."""
+        with self._lock:
+            pages = sorted(self._pages.items())
+            self._pages = {}
+
+        rows = sum(len(lengths) for _, (_, lengths, _) in pages)
+        page_index: dict[str, list[int]] = {}
+        merged = {name: array.array(typecode) for name, typecode in COLUMNS}
+        heap = bytearray()
+        for page_num, (columns, lengths, page_heap) in pages:
+            start = len(merged["page"])
+            merged["page"].extend([page_num] * len(lengths))
+            for name, values in columns.items():
+                merged[name].extend(values)
+            end = len(heap)
+            for length in lengths:
+                end += length
+                merged["text_end"].append(end)
+            heap += page_heap
+            page_index[str(page_num)] = [start, start + len(lengths)]
+
+        header = {
+            "version": LAYOUT_VERSION,
+            "byteorder": sys.byteorder,
+            "rows": rows,
+            "pages": page_index,
+            "columns": {},
+        }
+        # Os offsets dependem do tamanho do próprio cabeçalho: recalcula até estabilizar
+        encoded_header = b""
+        while True:
+            offset = _align(len(LAYOUT_MAGIC) + 4 + len(encoded_header))
+            for name, typecode in COLUMNS:
+                header["columns"][name] = [offset, typecode, merged[name].itemsize]
+                offset = _align(offset + len(merged[name]) * merged[name].itemsize)
+            header["text"] = [offset, len(heap)]
+            encoded = json.dumps(header).encode("utf-8")
+            stable = len(encoded) == len(encoded_header)
+            encoded_header = encoded
+            if stable:
+                break
+
+        with open(f"{self.path}.part", "wb") as file:
+            file.write(LAYOUT_MAGIC + struct.pack("<I", len(encoded_header)) + encoded_header)
+            for name, _ in COLUMNS:
+                file.write(b"\0" * (header["columns"][name][0] - file.tell()))
+                merged[name].tofile(file)
+            file.write(b"\0" * (header["text"][0] - file.tell()))
+            file.write(heap)
+        os.replace(f"{self.path}.part", self.path)
+        return self.path
+
+    def discard(self) -> None:
+        with self._lock:
+            self._pages = {}
+
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
+
+
+class LayoutFile:
+    """
+    ### 🧱 LayoutFile
+    Memory-mapped reader of a `.layout.bin` file. Columns are exposed as typed `memoryview`s over the
+    mapping, so nothing is loaded until it is read, and per-page queries only touch that page's rows.
+
+    ### 🖥️ Parameters
+        - `path` (`str`): The `.layout.bin` file.
+
+    #### ⚠️ Raises
+    - `ValueError`: If the file is not a layout file or has an unknown version.
+
+    ### 💡 Example
+    >>> layout = LayoutFile("Output/processo.layout.bin")
+    >>> layout.find(DATE_PATTERN, page=12, region=(0.0, 0.0, 1.0, 0.3))
+    [(12, '10/09/2025', (0.61, 0.08, 0.78, 0.1))]
+    >>> layout.low_confidence_regions()
+    [(40, 3, (0.08, 0.52, 0.91, 0.66))]
+    >>> layout.close()
+
+    ### 📚 Notes
+    - Boxes are `(x0, y0, x1, y1)` as fractions of the page width and height, so they map to any DPI:
+      multiply by `page.rect.width`/`height` for PDF points.
+    - Pages that came from the text layer have confidence `1.0`. Pages resumed from the OCR journal,
+      blank pages and failed pages have no rows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Arquivo vazio não pode ser mapeado
+            self._file.close()
+            raise ValueError(f"{path} is not a layout file")
+        self._views: list[memoryview] = []
+        try:
+            if self._map[:len(LAYOUT_MAGIC)] != LAYOUT_MAGIC:
+                raise ValueError(f"{path} is not a layout file")
+            (header_size,) = struct.unpack_from("<I", self._map, len(LAYOUT_MAGIC))
+            start = len(LAYOUT_MAGIC) + 4
+            self.header = json.loads(self._map[start:start + header_size].decode("utf-8"))
+            if self.header.get("version") != LAYOUT_VERSION:
+                raise ValueError(f"{path}: unsupported layout version {self.header.get('version')}")
+            self.rows = self.header["rows"]
+            self.columns = {name: self._column(*self.header["columns"][name]) for name, _ in COLUMNS}
+            text_offset, text_size = self.header["text"]
+            self.text = self._view(text_offset, text_size)
+        except Exception:
+            self.close()
+            raise
+
+    def _view(self, offset: int, size: int) -> memoryview:
+        view = memoryview(self._map)[offset:offset + size]
+        self._views.append(view)
+        return view
+
+    def _column(self, offset: int, typecode: str, itemsize: int):
+        raw = self._view(offset, self.rows * itemsize)
+        if self.header["byteorder"] == sys.byteorder and array.array(typecode).itemsize == itemsize:
+            view = raw.cast(typecode)
+            self._views.append(view)
+            return view
+        # Arquivo gerado em outra arquitetura: copia a coluna e corrige a ordem dos bytes
+        values = array.array(typecode, raw.tobytes())
+        if self.header["byteorder"] != sys.byteorder:
+            values.byteswap()
+        return values
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __enter__(self) -> "LayoutFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def pages(self) -> list[int]:
+        return sorted(int(page) for page in self.header["pages"])
+
+    def page_rows(self, page_num: int) -> range:
+        """Row range of a page (empty when the page has no words)."""
+        start, end = self.header["pages"].get(str(page_num), (0, 0))
+        return range(start, end)
+
+    def _rows(self, page: int | None) -> range:
+        return range(self.rows) if page is None else self.page_rows(page)
+
+    def word_text(self, row: int) -> str:
+        end = self.columns["text_end"][row]
+        start = self.columns["text_end"][row - 1] if row else 0
+        return bytes(self.text[start:end]).decode("utf-8")
+
+    def box(self, row: int) -> tuple[float, float, float, float]:
+        c = self.columns
+        return (c["x0"][row] / COORD_SCALE, c["y0"][row] / COORD_SCALE,
+                c["x1"][row] / COORD_SCALE, c["y1"][row] / COORD_SCALE)
+
+    def word(self, row: int) -> tuple[int, int, float, tuple[float, float, float, float], str]:
+        """(page, block, confidence, box, text) of one row."""
+        c = self.columns
+        return c["page"][row], c["block"][row], c["confidence"][row], self.box(row), self.word_text(row)
+
+    def _inside(self, row: int, region: tuple[float, float, float, float]) -> bool:
+        # Pelo centro da palavra: uma palavra cortada pela borda da região conta para um lado só
+        x0, y0, x1, y1 = self.box(row)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        return region[0] <= cx <= region[2] and region[1] <= cy <= region[3]
+
+    def words(self, page: int | None = None, region: tuple[float, float, float, float] | None = None,
+              max_confidence: float | None = None):
+        """
+        ### 🧱 words
+        Yields `word(row)` for the rows of `page` (all pages when `None`) whose center is inside `region`
+        and whose confidence is at most `max_confidence`.
+        """
+        confidence = self.columns["confidence"]
+        for row in self._rows(page):
+            if max_confidence is not None and confidence[row] > max_confidence:
+                continue
+            if region is not None and not self._inside(row, region):
+                continue
+            yield self.word(row)
+
+    def low_confidence_regions(self, threshold: float = LOW_CONFIDENCE,
+                               page: int | None = None) -> list[tuple[int, int, tuple[float, float, float, float]]]:
+        """
+        ### 🧱 low_confidence_regions
+        Blocks holding at least one word below `threshold`, as `(page, block, box)` with the union box of
+        the whole block, ready to be cropped and sent to OCR again.
+        """
+        c = self.columns
+        flagged: set[tuple[int, int]] = set()
+        for row in self._rows(page):
+            if c["confidence"][row] < threshold:
+                flagged.add((c["page"][row], c["block"][row]))
+
+        regions = []
+        for page_num, block in sorted(flagged):
+            boxes = [self.box(row) for row in self.page_rows(page_num) if c["block"][row] == block]
+            regions.append((page_num, block, (
+                min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes),
+            )))
+        return regions
+
+    def find(self, pattern: "str | re.Pattern", page: int | None = None,
+             region: tuple[float, float, float, float] | None = None) -> list[tuple[int, str, tuple]]:
+        """
+        ### 🧱 find
+        Searches `pattern` in the text of each block (words joined by spaces, so values split into several
+        words still match) and returns `(page, matched text, box of the matched words)`.
+
+        ### 💡 Example
+        >>> layout.find(CID_PATTERN, page=40)
+        [(40, 'M54.5', (0.22, 0.31, 0.29, 0.33))]
+        """
+        pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        c = self.columns
+        pages = [page] if page is not None else self.pages()
+        found = []
+        for page_num in pages:
+            blocks: dict[int, list[int]] = {}
+            for row in self.page_rows(page_num):
+                if region is None or self._inside(row, region):
+                    blocks.setdefault(c["block"][row], []).append(row)
+            for rows in blocks.values():
+                spans, parts, position = [], [], 0
+                for row in rows:
+                    text = self.word_text(row)
+                    spans.append((position, position + len(text), row))
+                    parts.append(text)
+                    position += len(text) + 1
+                joined = " ".join(parts)
+                for match in pattern.finditer(joined):
+                    boxes = [self.box(row) for start, end, row in spans if start < match.end() and end > match.start()]
+                    found.append((page_num, match.group(0), (
+                        min(b[0] for b in boxes), min(b[1] for b in boxes),
+                        max(b[2] for b in boxes), max(b[3] for b in boxes),
+                    )))
+        return found
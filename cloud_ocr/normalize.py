@@ -0,0 +1,191 @@
+"""
+### ✂️ Normalize Module
+Post-OCR cleanup of the `Output/*.txt` files before they are sent to the LLM. Header and footer lines
+that repeat across the pages of a document (letterheads, and the EPROC signature stamp whose page number
+and verification code change on every page) are learned per document by frequency and kept only on the
+first page where they appear. Lines are only learned from the page edges, and lines that differ in numbers
+only when they sit at the same edge position, occur once per page and carry no date or amount, so table rows
+(CNIS, PLENUS, lab results) are never taken for a stamp. The markers of failed and blank pages are never learned.
+Words hyphenated across line breaks are joined and whitespace is collapsed. The page markers are kept.
+"""
+
+import re
+
+from .dedup import BLANK_TEXT
+from .scheduler import FAILED_TEXT
+
+
+# GLOBAL VARIABLES
+
+EDGE_LINES = 5  # linhas do topo e do rodapé de cada página consideradas cabeçalho/rodapé
+MIN_REPEAT_PAGES = 3  # linha idêntica repetida em tantas páginas é cabeçalho/rodapé
+MIN_LINE_CHARS = 8  # linhas curtas ("Sim", "1") não são aprendidas
+# Linhas que só se repetem trocando números (carimbo com data, hora e código) precisam ser longas e
+# aparecer na maioria das páginas, para não apagar conteúdo como "dor lombar há 2 anos"
+VARIABLE_LINE_CHARS = 60
+VARIABLE_REPEAT_RATIO = 0.5
+# Marcam páginas que falharam ou estavam em branco: repetidos por natureza, nunca são cabeçalho
+PAGE_MARKER_KEYS = {" ".join(marker.lower().split()) for marker in (FAILED_TEXT, BLANK_TEXT)}
+
+PAGE_PATTERN = re.compile(
+    r"(------------ Inicio da pagina (\d+) ------------\n\n)(.*?)(\n\n------------ Fim da pagina \2 ------------)",
+    re.DOTALL,
+)
+_DIGITS = re.compile(r"\d+")
+_CODES = re.compile(r"\b(?=\w*\d)\w{10,}\b")  # códigos verificadores, hashes
+# Datas (12/03/2024, competência 03/2024) e valores (R$, 1.234,56): nessas linhas os números são o conteúdo
+_DATES_OR_AMOUNTS = re.compile(r"\b\d{1,2}/(?:\d{1,2}/)?\d{2,4}\b|R\$|\b\d{1,3}(?:\.\d{3})*,\d{2}\b")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+_HYPHEN_BREAK = re.compile(r"(\w)-\n(?=[a-zà-ÿ])")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def line_key(line: str) -> str:
+    """Whitespace- and case-normalized line."""
+    return _SPACES.sub(" ", line.strip().lower())
+
+
+def variable_key(line: str) -> str | None:
+    """
+    Line key with numbers and codes masked, so the stamp of every page maps to the same key. `None` for lines
+    with dates or amounts, whose numbers are never masked.
+    """
+    if _DATES_OR_AMOUNTS.search(line):
+        return None
+    return _DIGITS.sub("#", _CODES.sub("<code>", line_key(line)))
+
+
+def clean_whitespace(text: str) -> str:
+    """Joins words hyphenated across line breaks and collapses spaces and blank lines."""
+    text = _HYPHEN_BREAK.sub(r"\1", text)
+    text = "\n".join(_SPACES.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def _edge_indexes(lines: list[str]) -> list[int]:
+    """Indexes of the non-empty lines at the top and bottom of a page."""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return sorted(set(filled[:EDGE_LINES] + filled[-EDGE_LINES:]))
+
+
+def _edge_positions(lines: list[str]) -> list[tuple[int, int]]:
+    """`(index, position)` of the edge lines: position `0`, `1`... from the top and `-1`, `-2`... from the bottom."""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    top = [(i, position) for position, i in enumerate(filled[:EDGE_LINES])]
+    bottom = [(i, -position - 1) for position, i in enumerate(reversed(filled[-EDGE_LINES:]))]
+    return top + bottom
+
+
+def learn_boilerplate(pages: list[str]) -> tuple[set[str], set[tuple[int, str]]]:
+    """
+    ### ✂️ learn_boilerplate
+    Learns the header and footer lines repeated across pages.
+
+    ### 🔄 Returns
+    - `tuple[set[str], set[tuple[int, str]]]`: (keys of identical edge lines found on at least `MIN_REPEAT_PAGES`
+      pages, `(edge position, variable_key)` of long lines that only differ in numbers and codes).
+
+    ### 📌 Notes
+    - A variable line is learned only when it sits at the same edge position (see `_edge_positions`) on at least
+      `VARIABLE_REPEAT_RATIO` of the pages, and never when its key occurs more than once on any page: a stamp
+      is printed once per page, rows of a table (CNIS contributions, lab results) are not.
+    - Lines with dates or amounts are never masked (`variable_key`), and the page markers (`PAGE_MARKER_KEYS`)
+      are never learned.
+    """
+    exact: dict[str, int] = {}
+    variable: dict[tuple[int, str], int] = {}
+    repeated: set[str] = set()
+    for page in pages:
+        lines = page.split("\n")
+        edges = [lines[i].strip() for i in _edge_indexes(lines) if len(lines[i].strip()) >= MIN_LINE_CHARS]
+        for key in {line_key(line) for line in edges} - PAGE_MARKER_KEYS:
+            exact[key] = exact.get(key, 0) + 1
+
+        counts: dict[str, int] = {}
+        for line in lines:
+            key = variable_key(line) if len(line.strip()) >= VARIABLE_LINE_CHARS else None
+            if key is not None:
+                counts[key] = counts.get(key, 0) + 1
+        repeated.update(key for key, count in counts.items() if count > 1)
+        positioned = {(position, variable_key(lines[i])) for i, position in _edge_positions(lines)
+                      if len(lines[i].strip()) >= VARIABLE_LINE_CHARS}
+        for key in positioned:
+            if key[1] is not None:
+                variable[key] = variable.get(key, 0) + 1
+    variable_threshold = max(MIN_REPEAT_PAGES, VARIABLE_REPEAT_RATIO * len(pages))
+    return (
+        {key for key, count in exact.items() if count >= MIN_REPEAT_PAGES},
+        {key for key, count in variable.items() if count >= variable_threshold and key[1] not in repeated},
+    )
+
+
+def normalize_text(text: str) -> tuple[str, str]:
+    """
+    ### ✂️ normalize_text
+    Normalizes the text of one document made of `format_page` blocks.
+
+    ### 🔄 Returns
+    - `tuple[str, str]`: (normalized text, removed boilerplate lines joined by newlines).
+
+    ### 📌 Notes
+    - Only lines at the page edges are learned and removed; a repeated line in the middle of a page
+      (a form field, a table header) is kept.
+    - Each boilerplate line is kept on the first page where it appears (every occurrence there), so the stamp
+      text and verification code still appear once in the document; later pages lose at most one line per key.
+    - Text outside page markers is left as is.
+
+    ### 💡 Example
+
+    >>> text, removed = normalize_text(open("Output/processo.txt", encoding="utf-8").read())
+    """
+    matches = list(PAGE_PATTERN.finditer(text))
+    pages = [clean_whitespace(match.group(3)) for match in matches]
+    exact, variable = learn_boilerplate(pages)
+
+    seen: set = set()
+    removed: list[str] = []
+    output: list[str] = []
+    position = 0
+    for match, page in zip(matches, pages):
+        lines = page.split("\n")
+        keys: dict[int, object] = {}
+        for i in _edge_indexes(lines):
+            if line_key(lines[i]) in exact:
+                keys[i] = line_key(lines[i])
+        for i, edge in _edge_positions(lines):
+            if i not in keys and (edge, variable_key(lines[i])) in variable:
+                keys[i] = (edge, variable_key(lines[i]))
+
+        # No máximo uma linha por chave e por página, e nenhuma na primeira página em que a chave aparece
+        drop = set()
+        on_page: set = set()
+        for i, key in sorted(keys.items()):
+            if key in on_page:
+                continue
+            on_page.add(key)
+            if key in seen:
+                drop.add(i)
+                removed.append(lines[i])
+        seen |= on_page
+        body = clean_whitespace("\n".join(line for i, line in enumerate(lines) if i not in drop))
+        output.append(text[position:match.start()])
+        output.append(f"{match.group(1)}{body}{match.group(4)}")
+        position = match.end()
+    output.append(text[position:])
+    return "".join(output), "\n".join(removed)
+
+
+def normalize_file(path: str) -> tuple[int, int, str]:
+    """
+    ### ✂️ normalize_file
+    Normalizes a `.txt` output file in place.
+
+    ### 🔄 Returns
+    - `tuple[int, int, str]`: (characters before, characters after, removed boilerplate text).
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        original = file.read()
+    normalized, removed = normalize_text(original)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(normalized)
+    return len(original), len(normalized), removed
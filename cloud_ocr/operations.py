@@ -0,0 +1,365 @@
+"""
+### ⏳ Operations Module
+Document-level asynchronous OCR for very large processes. Instead of one request per page, the whole
+PDF is handed to a long-running operation (Vision `async_batch_annotate_files`): submit once, poll
+every few seconds, then read the results shard by shard. A 900-page process costs a handful of round
+trips instead of hundreds of page requests, and no worker thread is tied up per page.
+
+Vision only reads PDFs from, and writes results to, Cloud Storage, so the `ocr_async` section of
+`config.yaml` must name a bucket. Only the pages that need OCR are uploaded (`extract_pages`), in operations of
+at most `MAX_ASYNC_PAGES` pages (`split_pages`). `FakeOperationServer` runs the same submit/poll/fetch cycle offline.
+"""
+
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Iterator, Protocol, runtime_checkable
+
+import fitz
+
+from Tools import load_config_section
+
+from .backends import KEY_PATH, get_vision_client
+
+
+# GLOBAL VARIABLES
+
+DEFAULT_ASYNC = {
+    "bucket": "",
+    "prefix": "eproc-ocr",
+    "min_pages": 500,  # a partir daqui o PDF inteiro vai para uma operação assíncrona
+    "pages_per_shard": 100,  # páginas por arquivo de resultado (máx. 100 no Vision)
+    "poll_interval": 10.0,  # segundos entre consultas da operação
+    "timeout": 3600.0,  # segundos até desistir da operação
+}
+MAX_PAGES_PER_SHARD = 100
+MAX_ASYNC_PAGES = 2000  # limite de páginas por arquivo do `async_batch_annotate_files`
+
+_SHARD_START = re.compile(r"output-(\d+)-to-\d+\.json$")
+
+
+@runtime_checkable
+class DocumentBackend(Protocol):
+    """
+    ### ⏳ DocumentBackend
+    Anything that recognizes a whole PDF as a long-running operation.
+
+    - `name` (`str`): Short identifier.
+    - `submit(file_path) -> str`: Starts the operation and returns its name.
+    - `poll(operation) -> bool`: `True` once the operation is finished; raises if it failed.
+    - `fetch(operation) -> Iterator[tuple[int, str | None]]`: `(page, text)` for every page (0-based),
+      shard by shard in page order; `None` text marks a page the backend could not recognize.
+    - `cleanup(operation)`: Releases what the operation left behind (uploaded PDF, result shards).
+    - `stats() -> dict`: Counters for the run summary.
+    """
+
+    name: str
+
+    def submit(self, file_path: str) -> str:
+        ...
+
+    def poll(self, operation: str) -> bool:
+        ...
+
+    def fetch(self, operation: str) -> Iterator[tuple[int, str | None]]:
+        ...
+
+    def cleanup(self, operation: str) -> None:
+        ...
+
+    def stats(self) -> dict:
+        ...
+
+
+def pages_from_shard(data: bytes) -> list[tuple[int, str | None]]:
+    """
+    Parses one result shard (the JSON `AsyncBatchAnnotateFilesResponse` output written by Vision) into
+    `(page, text)` pairs, with 0-based pages and `None` for pages that came back with an error.
+    """
+    pages: list[tuple[int, str | None]] = []
+    for response in json.loads(data).get("responses", []):
+        page_num = int(response.get("context", {}).get("pageNumber", 0)) - 1
+        if (response.get("error") or {}).get("message"):
+            pages.append((page_num, None))
+        else:
+            pages.append((page_num, (response.get("fullTextAnnotation") or {}).get("text", "")))
+    return pages
+
+
+def split_pages(pages: list[int], max_pages: int = MAX_ASYNC_PAGES) -> list[list[int]]:
+    """Splits the pages to recognize into runs of at most `max_pages`, one async operation each."""
+    return [pages[start:start + max_pages] for start in range(0, len(pages), max(1, max_pages))]
+
+
+def extract_pages(file_path: str, pages: list[int], output_path: str) -> None:
+    """
+    ### ⏳ extract_pages
+    Writes `pages` (0-based, in the given order) of `file_path` to a new PDF at `output_path`, so an operation only
+    uploads, and is only billed for, the pages that need OCR. Page `i` of the result is `pages[i]` of the original.
+    """
+    with fitz.open(file_path) as document:
+        # `select` só mexe na cópia aberta; `garbage` descarta do arquivo novo os objetos das outras páginas
+        document.select(pages)
+        document.save(output_path, garbage=3, deflate=True)
+
+
+def wait_for(backend: DocumentBackend, operation: str, poll_interval: float, timeout: float) -> None:
+    """
+    ### ⏳ wait_for
+    Polls `operation` every `poll_interval` seconds until it finishes.
+
+    #### ⚠️ Raises
+    - `TimeoutError`: If it is still running after `timeout` seconds.
+    - `Exception`: Whatever `poll` raises when the operation failed.
+    """
+    deadline = time.monotonic() + timeout
+    while not backend.poll(operation):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"OCR operation {operation} still running after {timeout:.0f}s")
+        time.sleep(poll_interval)
+
+
+def create_storage_client(key_path: str = KEY_PATH):
+    """
+    ### 🔑 create_storage_client
+    Builds a Cloud Storage client from the same service account as the Vision client.
+    """
+    from google.cloud import storage
+    from google.oauth2 import service_account
+
+    with open(os.path.join(os.getcwd(), key_path), "r") as file:
+        key = json.load(file)
+    credentials = service_account.Credentials.from_service_account_info(key)
+    return storage.Client(project=key.get("project_id"), credentials=credentials)
+
+
+class VisionAsyncBackend:
+    """
+    ### ⏳ VisionAsyncBackend
+    Vision `async_batch_annotate_files` over Cloud Storage: the PDF is uploaded to
+    `gs://<bucket>/<prefix>/<id>/input.pdf` and the results are read from `gs://<bucket>/<prefix>/<id>/output-*.json`.
+
+    ### 🖥️ Parameters
+        - `bucket` (`str`, optional): Bucket for the input PDFs and result shards. Defaults to the
+          `ocr_async` section of `config.yaml`; without one the backend is not `available`.
+        - `prefix` (`str`, optional): Object prefix inside the bucket. Same default source.
+        - `pages_per_shard` (`int`, optional): Pages per result file (max 100). Same default source.
+        - `client` (`vision.ImageAnnotatorClient`, optional): Defaults to the shared client (`get_vision_client`).
+        - `storage_client` (`storage.Client`, optional): Defaults to one built from `key.json` on first use.
+
+    ### 💡 Example
+    >>> backend = VisionAsyncBackend(bucket="eproc-ocr-temp")
+    >>> operation = backend.submit("Processos/ABC50085259120254047102.PDF")
+    >>> wait_for(backend, operation, poll_interval=10, timeout=3600)
+    >>> for page_num, text in backend.fetch(operation): ...
+    >>> backend.cleanup(operation)
+
+    ### 📚 Notes
+    - Uses `DOCUMENT_TEXT_DETECTION`, the feature Vision supports for PDF files.
+    - `cleanup` deletes the uploaded PDF and the shards; give the bucket a lifecycle rule as a safety net
+      for runs that die before it.
+    """
+
+    name = "vision"
+
+    def __init__(self, bucket: str | None = None, prefix: str | None = None, pages_per_shard: int | None = None,
+                 client=None, storage_client=None):
+        config = load_config_section("ocr_async", DEFAULT_ASYNC)
+        self.bucket = bucket if bucket is not None else config["bucket"]
+        self.prefix = (prefix if prefix is not None else config["prefix"]).strip("/")
+        self.pages_per_shard = max(1, min(MAX_PAGES_PER_SHARD, int(
+            pages_per_shard if pages_per_shard is not None else config["pages_per_shard"])))
+        self._client = client
+        self._storage = storage_client
+        self._operations: dict[str, tuple] = {}
+        self.submitted = 0
+        self.polls = 0
+        self.shards = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.bucket)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_vision_client()
+        return self._client
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = create_storage_client()
+        return self._storage
+
+    def submit(self, file_path: str) -> str:
+        from google.cloud import vision
+
+        folder = f"{self.prefix}/{uuid.uuid4().hex}"
+        bucket = self.storage.bucket(self.bucket)
+        bucket.blob(f"{folder}/input.pdf").upload_from_filename(file_path, content_type="application/pdf")
+
+        request = vision.AsyncAnnotateFileRequest(
+            input_config=vision.InputConfig(
+                gcs_source=vision.GcsSource(uri=f"gs://{self.bucket}/{folder}/input.pdf"),
+                mime_type="application/pdf",
+            ),
+            features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+            output_config=vision.OutputConfig(
+                gcs_destination=vision.GcsDestination(uri=f"gs://{self.bucket}/{folder}/"),
+                batch_size=self.pages_per_shard,
+            ),
+        )
+        operation = self.client.async_batch_annotate_files(requests=[request])
+        name = operation.operation.name
+        with self._lock:
+            self._operations[name] = (operation, folder)
+            self.submitted += 1
+        return name
+
+    def poll(self, operation: str) -> bool:
+        handle, _ = self._operations[operation]
+        with self._lock:
+            self.polls += 1
+        if not handle.done():
+            return False
+        error = handle.exception()
+        if error is not None:
+            raise error
+        return True
+
+    def fetch(self, operation: str) -> Iterator[tuple[int, str | None]]:
+        _, folder = self._operations[operation]
+        blobs = [
+            blob for blob in self.storage.list_blobs(self.bucket, prefix=f"{folder}/")
+            if _SHARD_START.search(blob.name)
+        ]
+        # Os shards vêm em ordem alfabética ("output-101-to-200" antes de "output-21-to-40")
+        blobs.sort(key=lambda blob: int(_SHARD_START.search(blob.name).group(1)))
+        for blob in blobs:
+            with self._lock:
+                self.shards += 1
+            yield from pages_from_shard(blob.download_as_bytes())
+
+    def cleanup(self, operation: str) -> None:
+        _, folder = self._operations.pop(operation, (None, None))
+        if folder is None:
+            return
+        for blob in self.storage.list_blobs(self.bucket, prefix=f"{folder}/"):
+            blob.delete()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"operations": self.submitted, "polls": self.polls, "shards": self.shards}
+
+
+class FakeOperationServer:
+    """
+    ### 🧪 FakeOperationServer
+    Offline `DocumentBackend` with the same submit/poll/fetch cycle as `VisionAsyncBackend`. The result of
+    each page is its text layer, and the shards are built in the same JSON shape Vision writes, so they
+    go through `pages_from_shard` too.
+
+    ### 🖥️ Parameters
+        - `seconds_per_page` (`float`, optional): Simulated processing time; the operation is done
+          `seconds_per_page * pages` after `submit`. Defaults to `0.0`.
+        - `pages_per_shard` (`int`, optional): Pages per result shard. Defaults to `100`.
+        - `fail` (`bool`, optional): Make every operation fail when polled as done. Defaults to `False`.
+        - `failed_pages` (`set[int]`, optional): 0-based pages returned with a per-page error. Defaults to none.
+
+    ### 💡 Example
+    >>> Recognize(backend="fake", async_min_pages=300)   # PDFs from 300 pages go through this server
+    """
+
+    name = "fake"
+
+    def __init__(self, seconds_per_page: float = 0.0, pages_per_shard: int = MAX_PAGES_PER_SHARD,
+                 fail: bool = False, failed_pages: set[int] | None = None):
+        self.seconds_per_page = seconds_per_page
+        self.pages_per_shard = max(1, pages_per_shard)
+        self.fail = fail
+        self.failed_pages = failed_pages or set()
+        self._operations: dict[str, dict] = {}
+        self._ids = itertools.count(1)
+        self.submitted = 0
+        self.polls = 0
+        self.shards = 0
+        self._lock = threading.Lock()
+
+    def submit(self, file_path: str) -> str:
+        document = fitz.open(file_path)
+        try:
+            texts = [page.get_text("text").strip() for page in document]
+        finally:
+            document.close()
+        with self._lock:
+            name = f"operations/fake-{next(self._ids)}"
+            self.submitted += 1
+            self._operations[name] = {
+                "texts": texts,
+                "ready_at": time.monotonic() + self.seconds_per_page * len(texts),
+                "shards": None,
+            }
+        return name
+
+    def _shards(self, texts: list[str]) -> list[bytes]:
+        shards = []
+        for start in range(0, len(texts), self.pages_per_shard):
+            responses = []
+            for page_num in range(start, min(start + self.pages_per_shard, len(texts))):
+                response: dict = {"context": {"pageNumber": page_num + 1}}
+                if page_num in self.failed_pages:
+                    response["error"] = {"code": 13, "message": "fake operation server: page failed"}
+                else:
+                    response["fullTextAnnotation"] = {"text": texts[page_num]}
+                responses.append(response)
+            shards.append(json.dumps({"responses": responses}).encode("utf-8"))
+        return shards
+
+    def poll(self, operation: str) -> bool:
+        with self._lock:
+            self.polls += 1
+            state = self._operations[operation]
+        if time.monotonic() < state["ready_at"]:
+            return False
+        if self.fail:
+            raise RuntimeError(f"fake operation server: {operation} failed")
+        if state["shards"] is None:
+            state["shards"] = self._shards(state["texts"])
+        return True
+
+    def fetch(self, operation: str) -> Iterator[tuple[int, str | None]]:
+        for shard in self._operations[operation]["shards"]:
+            with self._lock:
+                self.shards += 1
+            yield from pages_from_shard(shard)
+
+    def cleanup(self, operation: str) -> None:
+        with self._lock:
+            self._operations.pop(operation, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"operations": self.submitted, "polls": self.polls, "shards": self.shards}
+
+
+def get_document_backend(backend: "str | DocumentBackend" = "vision") -> DocumentBackend:
+    """
+    ### ⏳ get_document_backend
+    Resolves `"vision"` or `"fake"` to a new document backend; instances are returned unchanged.
+
+    #### ⚠️ Raises
+    - `ValueError`: If the name is unknown.
+    """
+    if not isinstance(backend, str):
+        return backend
+    if backend == "vision":
+        return VisionAsyncBackend()
+    if backend == "fake":
+        return FakeOperationServer()
+    raise ValueError(f"Unknown document OCR backend: {backend}. Use 'vision' or 'fake'")
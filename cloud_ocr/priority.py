@@ -0,0 +1,85 @@
+"""
+### 🩺 Priority Module
+Cheap pre-OCR classifier that ranks the pages of a process by their value for the medical report.
+Medical evidence (atestados, laudos, receitas, exames, perícia do INSS) is recognized first, and
+procedural pages (petições, despachos, certidões) last. Only the text layer, the EPROC stamp and the
+page layout are read; nothing is rendered or OCR'd.
+"""
+
+import os
+import re
+import unicodedata
+
+import fitz
+
+from .segments import STAMP_PATTERN
+from .text_layer import image_coverage, MIN_CHARS, DENSE_CHARS, MAX_IMAGE_COVERAGE
+
+
+# GLOBAL VARIABLES
+
+MEDICAL_SUFFIX = ".medical.txt"
+
+PRIORITY_MEDICAL = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_PROCEDURAL = 2
+
+# Prefixos dos tipos de documento do carimbo do EPROC ("Evento 12, LAUDO1, Página 3")
+MEDICAL_TYPES = ("LAUDO", "LAUDPERI", "ATEST", "RECEIT", "EXMMED", "EXAME", "PRONT", "PERICIA", "RELATMED", "FICHAMED")
+PROCEDURAL_TYPES = ("INIC", "PET", "DESPADEC", "DESP", "DECIS", "SENT", "CERT", "INTIM", "ATOORD", "CONTES",
+                    "OFIC", "MAND", "DECL", "COMP", "CALC", "EMAIL")
+MEDICAL_KEYWORDS = re.compile(
+    r"\b(atestado|laudo|receita|receituario|cid|crm|pericia|perito|diagnostico|medic[oa]|exame|incapacidade|"
+    r"tratamento|prontuario|ressonancia|tomografia|radiografia|ultrassonografia|posologia|comprimidos?)\b"
+)
+MIN_KEYWORDS = 2  # palavras-chave distintas para considerar a página médica
+
+
+def medical_path(output_path: str) -> str:
+    """`Output/<processo>.txt` -> `Output/<processo>.medical.txt`."""
+    return f"{os.path.splitext(output_path)[0]}{MEDICAL_SUFFIX}"
+
+
+def _plain(text: str) -> str:
+    """Lowercase text without accents, so "Perícia" and "PERICIA" match the same keyword."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def page_priority(page: fitz.Page) -> int:
+    """
+    ### 🩺 page_priority
+    Ranks a page for OCR ordering. Lower runs first.
+
+    ### 🔄 Returns
+    - `int`: `PRIORITY_MEDICAL`, `PRIORITY_DEFAULT` or `PRIORITY_PROCEDURAL`.
+
+    ### 📌 Notes
+    - The document type in the EPROC stamp decides when it is known (`MEDICAL_TYPES`, `PROCEDURAL_TYPES`).
+    - Otherwise a page is medical when its text layer has at least `MIN_KEYWORDS` distinct medical keywords.
+    - Scanned pages without a usable text layer stay at the default rank: attachments are often medical, so
+      they go before dense born-digital text (petições, decisões), which is ranked procedural.
+
+    ### 💡 Example
+
+    >>> page_priority(document[40])
+    0
+    """
+    text = page.get_text("text")
+    stamp = STAMP_PATTERN.search(text)
+    if stamp:
+        kind = stamp.group(2).upper()
+        if kind.startswith(MEDICAL_TYPES):
+            return PRIORITY_MEDICAL
+        if kind.startswith(PROCEDURAL_TYPES):
+            return PRIORITY_PROCEDURAL
+
+    if len(set(MEDICAL_KEYWORDS.findall(_plain(text)))) >= MIN_KEYWORDS:
+        return PRIORITY_MEDICAL
+
+    chars = sum(1 for ch in text if not ch.isspace())
+    if chars < MIN_CHARS and image_coverage(page) >= MAX_IMAGE_COVERAGE:
+        return PRIORITY_DEFAULT
+    if chars >= DENSE_CHARS:
+        return PRIORITY_PROCEDURAL
+    return PRIORITY_DEFAULT
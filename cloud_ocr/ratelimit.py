@@ -0,0 +1,222 @@
+"""
+### 🚦 Rate Limit Module
+Pacing and retries in front of the OCR backend. A shared token bucket limits pages per second and
+bytes per minute across every OCR worker, and transient failures (quota, throttling, unavailable)
+are retried with jittered exponential backoff driven by the `retry` section of `config.yaml`.
+A quota error also pauses the shared bucket, so the other workers back off together instead of
+producing a burst of 429s.
+"""
+
+import random
+import threading
+import time
+
+import fitz
+
+from Tools import load_config_section
+from .backends import OcrBackend, TransientOcrError
+from .layout import Word
+
+
+# GLOBAL VARIABLES
+
+CONFIG_PATH = "config.yaml"
+
+DEFAULT_RETRY = {"max_attempts": 3, "base_delay": 1.0, "max_delay": 60.0, "backoff_factor": 2.0}
+DEFAULT_RATE_LIMIT = {"requests_per_second": 25.0, "bytes_per_minute": 1024 * 1024 * 1024}
+
+# Exceções do google.api_core tratadas como transitórias (comparadas pelo nome, sem importar o SDK)
+TRANSIENT_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "Aborted",
+}
+QUOTA_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a backend failure is worth retrying."""
+    return isinstance(error, TransientOcrError) or type(error).__name__ in TRANSIENT_ERRORS
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether a backend failure means the quota was hit (everyone should slow down, not just this page)."""
+    return type(error).__name__ in QUOTA_ERRORS or (
+        isinstance(error, TransientOcrError) and error.quota
+    )
+
+
+class TokenBucket:
+    """
+    ### 🪣 TokenBucket
+    Thread-safe token bucket. `acquire(n)` blocks until `n` tokens are available.
+
+    ### 🖥️ Parameters
+        - `rate` (`float`): Tokens added per second. `0` or less disables the limit.
+        - `capacity` (`float`, optional): Maximum burst. Defaults to one second worth of tokens.
+
+    ### 📚 Notes
+    - Requests larger than the capacity are let through once the bucket is full, so one oversized
+      page can never block forever.
+    - `pause(seconds)` stops refilling for everyone, used when the server reports a quota error.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.waited = 0.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(self.capacity, self._tokens + (now - start) * self.rate)
+        self._updated = max(now, self._updated)
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Takes `amount` tokens, sleeping as needed. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= amount:
+                    self._tokens -= amount
+                    self.waited += waited
+                    return waited
+                delay = max(self._paused_until - now, (amount - self._tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """Drains the bucket and stops refilling for `seconds`."""
+        with self._lock:
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RetryPolicy:
+    """
+    ### 🔁 RetryPolicy
+    Jittered exponential backoff ("full jitter"): attempt `n` sleeps a random time in
+    `[0, min(max_delay, base_delay * backoff_factor ** (n - 1))]`.
+
+    ### 🖥️ Parameters
+        - `max_attempts` (`int`, optional): Total attempts per page, including the first. Defaults to `3`.
+        - `base_delay` (`float`, optional): Seconds. Defaults to `1.0`.
+        - `max_delay` (`float`, optional): Seconds. Defaults to `60.0`.
+        - `backoff_factor` (`float`, optional): Defaults to `2.0`.
+
+    ### 💡 Example
+    >>> policy = RetryPolicy.from_config()   # seção `retry` do config.yaml
+    >>> policy.delay(1)
+    1.37
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 60.0,
+                 backoff_factor: float = 2.0, seed: int | None = None):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.backoff_factor = backoff_factor
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, path: str = CONFIG_PATH) -> "RetryPolicy":
+        return cls(**load_config_section("retry", DEFAULT_RETRY, path))
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number `attempt` (1 for the first retry)."""
+        ceiling = min(self.max_delay, self.base_delay * self.backoff_factor ** (attempt - 1))
+        return self._random.uniform(0, ceiling)
+
+
+class RateLimitedBackend:
+    """
+    ### 🚦 RateLimitedBackend
+    Wraps any `OcrBackend` with shared pacing (pages per second and bytes per minute) and retries of
+    transient failures. It is itself an `OcrBackend`, with the same `name` as the wrapped backend so
+    cache keys do not change.
+
+    ### 🖥️ Parameters
+        - `backend` (`OcrBackend`): The backend that does the work.
+        - `requests_per_second` (`float`, optional): Pages sent per second; `0` disables. Defaults to the
+          `ocr_rate_limit` section of `config.yaml`.
+        - `bytes_per_minute` (`int`, optional): Image bytes sent per minute; `0` disables. Same default source.
+        - `retry` (`RetryPolicy`, optional): Defaults to `RetryPolicy.from_config()`.
+
+    ### 💡 Example
+    >>> backend = RateLimitedBackend(VisionBackend(batch_size=8), requests_per_second=25)
+    >>> backend.detect_text(content)
+
+    ### 📚 Notes
+    - Pacing counts pages, not RPCs: Vision quotas are charged per image even inside a batch.
+    - `stats()` adds `retries`, `retried_pages`, `gave_up` and `throttled_s` to the wrapped backend stats.
+    """
+
+    def __init__(self, backend: OcrBackend, requests_per_second: float | None = None,
+                 bytes_per_minute: int | None = None, retry: RetryPolicy | None = None):
+        limits = load_config_section("ocr_rate_limit", DEFAULT_RATE_LIMIT)
+        if requests_per_second is None:
+            requests_per_second = float(limits["requests_per_second"])
+        if bytes_per_minute is None:
+            bytes_per_minute = int(limits["bytes_per_minute"])
+
+        self.backend = backend
+        self.name = backend.name
+        self.retry = retry if retry is not None else RetryPolicy.from_config()
+        self.requests = TokenBucket(requests_per_second)
+        self.bytes = TokenBucket(bytes_per_minute / 60.0, capacity=bytes_per_minute / 6.0)
+        self.retries = 0
+        self.retried_pages = 0
+        self.gave_up = 0
+        self._lock = threading.Lock()
+
+    def detect_text(self, content: bytes, page: fitz.Page | None = None) -> str:
+        return self._call(self.backend.detect_text, content, page)
+
+    def detect_layout(self, content: bytes, page: fitz.Page | None = None) -> tuple[str, list[Word]]:
+        detect_layout = getattr(self.backend, "detect_layout", None)
+        if detect_layout is None:
+            return self._call(self.backend.detect_text, content, page), []
+        return self._call(detect_layout, content, page)
+
+    def _call(self, detect, content: bytes, page: fitz.Page | None):
+        """Paces and retries one backend call."""
+        attempt = 0
+        while True:
+            self.requests.acquire(1)
+            self.bytes.acquire(len(content))
+            try:
+                return detect(content, page)
+            except Exception as e:
+                attempt += 1
+                if not is_transient(e) or attempt >= self.retry.max_attempts:
+                    if attempt > 1 or is_transient(e):
+                        with self._lock:
+                            self.gave_up += 1
+                    raise
+                delay = self.retry.delay(attempt)
+                with self._lock:
+                    self.retries += 1
+                    self.retried_pages += int(attempt == 1)
+                if is_quota_error(e):
+                    # Cota estourada: todos os workers esperam, não só esta página
+                    self.requests.pause(delay)
+                time.sleep(delay)
+
+    def stats(self) -> dict:
+        stats = dict(self.backend.stats())
+        with self._lock:
+            stats.update({
+                "retries": self.retries,
+                "retried_pages": self.retried_pages,
+                "gave_up": self.gave_up,
+                "throttled_s": self.requests.waited + self.bytes.waited,
+            })
+        return stats
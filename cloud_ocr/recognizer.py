@@ -4,21 +4,129 @@ This module is designed to perform Optical Character Recognition (OCR) on PDF do
 
 """
 
-import fitz
+import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+import fitz
 from cloud_ocr import OCR
-from Tools import ProgressBar
+from .cloud_ocr import format_page
+from .text_layer import classify_page, PAGE_TEXT, PAGE_OCR
+from .cache import PageCache, DEFAULT_CACHE_PATH
+from .encoding import EncodeStats
+from .batching import DEFAULT_BATCH_SIZE
+from .backends import OcrBackend, get_backend
+from .ratelimit import RateLimitedBackend
+from .scheduler import PageScheduler, DocumentJob, DEFAULT_WINDOW, PAGE_FAILED, FAILED_TEXT
+from .journal import DEFAULT_JOURNAL_DIR
+from .dedup import PageDeduplicator
+from .normalize import normalize_file
+from .segments import build_segment_index, write_segment_index
+from .layout import LayoutWriter, layout_path, text_layer_words
+from .operations import (
+    DocumentBackend, DEFAULT_ASYNC, extract_pages, get_document_backend, split_pages, wait_for
+)
+from .priority import page_priority, medical_path, PRIORITY_MEDICAL
+from .concurrency import AimdController, AdaptiveBackend
+from .render_pool import RenderPool, default_render_processes
+from Tools import ProgressBar, count_tokens, load_config_section
 import shutil
+import time
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+_async_notice_logged = False
+
+
+def _async_disabled(reason: str) -> None:
+    """Logs, once per process and at debug level, why the async path is off (the default without a bucket)."""
+    global _async_notice_logged
+    if not _async_notice_logged:
+        _async_notice_logged = True
+        logger.debug("async OCR disabled: %s", reason)
 
 
-def Recognize() -> bool:
+def _page_count(file_path: str) -> int:
+    with fitz.open(file_path) as document:
+        return document.page_count
+
+
+def Recognize(use_text_layer: bool = True, use_cache: bool = True, cache_path: str = DEFAULT_CACHE_PATH,
+              max_workers: int | None = None, max_open_documents: int = 4,
+              window: int = DEFAULT_WINDOW, use_embedded_images: bool = True,
+              batch_size: int = DEFAULT_BATCH_SIZE, backend: "str | OcrBackend" = "vision",
+              adaptive_resolution: bool = True, rate_limit: bool = True,
+              resume: bool = True, journal_dir: str = DEFAULT_JOURNAL_DIR, skip_duplicates: bool = True,
+              normalize: bool = True, token_model: str = "gemini-2.5-pro", segment_index: bool = True,
+              layout: bool = False, async_min_pages: int | None = None,
+              document_backend: "str | DocumentBackend | None" = None, prioritize: bool = True,
+              on_medical_text: Callable[[str], None] | None = None, adaptive_concurrency: bool = True,
+              render_processes: int | None = None) -> bool:
     """
     ### 📝 Recognize
     Coordinate the OCR process for PDF files located in the 'Processos' directory.
 
     #### 🖥️ Parameters
-    - None
+    - `use_text_layer` (`bool`, optional): If `True`, pages that already carry a usable text layer
+      (born-digital documents) are extracted with `page.get_text()` and never sent to Cloud Vision.
+      Defaults to `True`.
+    - `use_cache` (`bool`, optional): If `True`, OCR results are read from and stored in the persistent page
+      cache, so re-downloaded processes only send new or changed pages to Vision. Defaults to `True`.
+    - `cache_path` (`str`, optional): SQLite file of the page cache. Defaults to `Cache/ocr_pages.sqlite3`.
+    - `max_workers` (`int`, optional): Global limit of pages in flight across all PDFs. With `adaptive_concurrency`
+      it is the ceiling of the adaptive limit (defaults to `maximum` of the `ocr_concurrency` section of
+      `config.yaml`); without it, a fixed limit (defaults to `cpu_count * 2`).
+    - `max_open_documents` (`int`, optional): PDFs scheduled at the same time. Defaults to `4`.
+    - `window` (`int`, optional): Pages per PDF in flight or waiting for an earlier page before being
+      appended to the output. Bounds peak memory regardless of page count. Defaults to `64`.
+    - `use_embedded_images` (`bool`, optional): For scanned pages made of a single full-page image, send the
+      original image bytes to Vision instead of re-rasterizing the page. Defaults to `True`.
+    - `batch_size` (`int`, optional): Pages per `batch_annotate_images` call (max 16). `1` sends one
+      `text_detection` call per page. Defaults to `8`.
+    - `backend` (`str | OcrBackend`, optional): `"vision"`, `"fake"` (offline, see `backends.FakeBackend`)
+      or a backend instance. Defaults to `"vision"`.
+    - `adaptive_resolution` (`bool`, optional): Render each rendered OCR page at a DPI and colour space chosen
+      from its size, text density, contrast and colour (see `resolution.choose_render`), retrying once at a higher
+      DPI when the result looks unreliable. Defaults to `True`.
+    - `rate_limit` (`bool`, optional): Pace backend calls with the shared limits of the `ocr_rate_limit` section of
+      `config.yaml` and retry transient errors with the `retry` section (see `ratelimit.RateLimitedBackend`).
+      Defaults to `True`.
+    - `resume` (`bool`, optional): Checkpoint every finished page to a per-PDF journal and, when a previous run
+      was interrupted, only recognize the pages missing from it (see `journal.PageJournal`). Defaults to `True`.
+    - `journal_dir` (`str`, optional): Where the journals are kept until the output is written.
+      Defaults to `Cache/journal`.
+    - `skip_duplicates` (`bool`, optional): Before OCR, skip blank pages and reuse the text of pages that look the
+      same as one already recognized in this run or, with `use_cache`, in earlier runs (see `dedup`). Defaults to `True`.
+    - `normalize` (`bool`, optional): Strip header/footer lines repeated across the pages of each document, join
+      hyphenated words and collapse whitespace before the output is written (see `normalize`). Defaults to `True`.
+    - `token_model` (`str`, optional): Model whose tokenizer (`Tools.count_tokens`) measures the tokens saved by
+      `normalize`. Defaults to `"gemini-2.5-pro"`.
+    - `segment_index` (`bool`, optional): Write `Output/<processo>.segments.json` with the events, document types
+      and page ranges of each PDF (see `segments`), so later stages can load only the documents they need.
+      Defaults to `True`.
+    - `layout` (`bool`, optional): Also write `Output/<processo>.layout.bin`, a memory-mappable columnar file with
+      every word's page, block, confidence and bounding box (see `layout.LayoutFile`), for re-OCR of low-confidence
+      regions and region-based extraction of dates and CIDs. Defaults to `False`.
+    - `async_min_pages` (`int`, optional): PDFs with at least this many pages that need OCR are recognized with
+      long-running operations (submit, poll, fetch result shards; see `operations`) instead of page by page. `0`
+      disables. Defaults to `min_pages` of the `ocr_async` section of `config.yaml` (`500`).
+    - `document_backend` (`str | DocumentBackend`, optional): `"vision"` (`VisionAsyncBackend`, needs `bucket` in
+      the `ocr_async` section), `"fake"` (`FakeOperationServer`) or an instance. Defaults to the name of `backend`.
+    - `prioritize` (`bool`, optional): Rank the pages of each PDF with `priority.page_priority` and recognize medical
+      evidence first; once those pages are done, `Output/<processo>.medical.txt` is published with only them, before
+      the rest of the process. Needs `resume` (pages finish out of order into the journal). Defaults to `True`.
+    - `on_medical_text` (`Callable[[str], None]`, optional): Called with the path of each `.medical.txt` as soon as
+      it is published, e.g. to start the report of that process early. Defaults to `None`.
+    - `adaptive_concurrency` (`bool`, optional): Tune the number of backend requests in flight with AIMD: one more
+      per healthy round, hold when latency degrades, halve on throttling (see `concurrency.AimdController`).
+      Changes are logged with `[🎚️]`. Defaults to `True`.
+    - `render_processes` (`int`, optional): Processes that render and encode OCR pages (see `render_pool.RenderPool`),
+      so rasterization uses every core while the worker threads wait on the backend. `0` renders in the worker
+      threads. Defaults to `render_pool.default_render_processes()`: no pool below 4 cores, where it was measured
+      slower than the threads.
 
     #### 🔄 Returns
     - `None`: This function does not return any value. It processes files and writes output to the 'Output' directory.
@@ -29,62 +137,279 @@ def Recognize() -> bool:
 
     #### 📌 Notes
     - The function processes each PDF file, performs OCR, and moves processed files to a 'Processed' subdirectory.
+    - All PDFs share one long-lived worker pool fed page by page in round-robin order (see `PageScheduler`);
+      each file is written and moved as soon as its own pages are done.
     - Utilizes a progress bar to indicate the processing status of files.
+    - Per-file stats report how many pages took the text-layer path and how many went to OCR.
+    - A page that still fails after its retries is written with a failure marker and listed in the stats,
+      instead of disappearing from the output.
     - Ensures that the output directory structure is created if it does not exist.
+    - Only the `.txt` files in 'Output' are report inputs; the `.segments.json`, `.layout.bin` and `.medical.txt`
+      sidecars travel with them.
+    - Large PDFs sent as async operations skip the page cache, dedup, journal and word layout. Pages with a text
+      layer are read locally and never uploaded; the rest go in operations of at most `MAX_ASYNC_PAGES` pages
+      (Vision's per-file limit). A failed or timed-out operation falls back to page-by-page OCR.
 
     #### 💡 Example
     >>> Recognize()
     # Processes all PDF files in 'Processos' and outputs text files to 'Output'.
     """
 
-    def _process_page(page, page_num):
+    run_stats = {PAGE_TEXT: 0, PAGE_OCR: 0, PAGE_FAILED: 0}
+    token_stats = {"before": 0, "after": 0}
+    stats_lock = threading.Lock()
+    cache = PageCache(cache_path) if use_cache else None
+    encode_stats = EncodeStats()
+    ocr_backend = get_backend(backend, batch_size=batch_size)
+    controller = None
+    if adaptive_concurrency:
+        controller = AimdController(maximum=max_workers)
+        # Threads de sobra: quem limita as chamadas ao backend é o controlador
+        max_workers = controller.maximum
+        ocr_backend = AdaptiveBackend(ocr_backend, controller)
+    elif max_workers is None:
+        max_workers = int(os.cpu_count() * 2)
+    if rate_limit:
+        ocr_backend = RateLimitedBackend(ocr_backend)
+    # Processos só sobem na primeira página que precisar de OCR
+    if render_processes is None:
+        render_processes = default_render_processes()
+    renderer = RenderPool(render_processes) if render_processes != 0 else None
+    # Com layout, o texto deduplicado carrega as palavras: namespace próprio no cache
+    dedup = PageDeduplicator(cache, ocr_backend.name + (":layout" if layout else "")) if skip_duplicates else None
+    layout_writers: dict[str, LayoutWriter] = {}
+    async_config = load_config_section("ocr_async", DEFAULT_ASYNC)
+    if async_min_pages is None:
+        async_min_pages = int(async_config["min_pages"])
+    doc_backend = None
+    if async_min_pages > 0:
+        try:
+            doc_backend = get_document_backend(document_backend or ocr_backend.name)
+        except ValueError as e:
+            _async_disabled(str(e))
+        if doc_backend is not None and not getattr(doc_backend, "available", True):
+            _async_disabled("set 'bucket' in the ocr_async section of config.yaml")
+            doc_backend = None
+    async_executor = None
+    scheduler = None
+    progress_files = None
+
+    def _process_page(page, page_num, layout_writer: LayoutWriter | None = None,
+                      document_lock: "threading.Lock | None" = None):
         """
-        Process a single page with OCR
+        Process a single page, using the native text layer when possible and OCR otherwise.
+        Returns a tuple (path, text), where path is `PAGE_TEXT`, `PAGE_OCR` or `PAGE_FAILED`.
         """
         try:
-            return OCR(page, page_num)
+            if use_text_layer:
+                with document_lock if document_lock is not None else nullcontext():
+                    kind, text = classify_page(page)
+                    words = text_layer_words(page) if kind == PAGE_TEXT and layout_writer is not None else None
+                if kind == PAGE_TEXT:
+                    if words is not None:
+                        layout_writer.add_page(page_num, words)
+                    return PAGE_TEXT, format_page(page_num, text)
+            return PAGE_OCR, OCR(
+                page, page_num, cache=cache, use_embedded=use_embedded_images, encode_stats=encode_stats,
+                backend=ocr_backend, adaptive_resolution=adaptive_resolution, dedup=dedup, layout=layout_writer,
+                renderer=renderer, document_lock=document_lock,
+            )
         except Exception as e:
+            # Retentativas esgotadas: marca a página no texto em vez de perdê-la em silêncio
             print(f"Error processing page {page_num}: {str(e)}")
+            return PAGE_FAILED, format_page(page_num, FAILED_TEXT)
 
-    def _process_pdf(file_path: str, output_path: str, max_workers: int =int(os.cpu_count()*2),) -> str:
+    def _process_job_page(job: DocumentJob, page_num: int):
         """
-        Process a single PDF file and perform OCR on all its pages using multiple threads
+        Scheduler entry point: resolves the page from the job's open document, shared by the worker threads
         """
-        total_text = []  # Using list for thread-safe append
-        document = fitz.open(file_path)
-        executor = ThreadPoolExecutor(max_workers=max_workers)
+        with job.document_lock:
+            page = job.document[page_num]
+        return _process_page(page, page_num, layout_writers.get(job.output_path), job.document_lock)
 
+    def _normalize_output(part_path: str) -> None:
+        """
+        Post-OCR cleanup of a finished document, measuring the tokens it saves
+        """
+        name = os.path.basename(part_path)[:-len(".txt.part")]
         try:
+            tokens_before, _ = count_tokens(part_path, token_model, "input")
+            chars_before, chars_after, _ = normalize_file(part_path)
+            tokens_after, _ = count_tokens(part_path, token_model, "input")
+        except Exception as e:
+            print(f"Error normalizing {name}: {str(e)}")
+            return
+        with stats_lock:
+            token_stats["before"] += tokens_before
+            token_stats["after"] += tokens_after
+        print(
+            f"[✂️]: {name}: {chars_before - chars_after} characters, "
+            f"{tokens_before - tokens_after} tokens of boilerplate removed ({tokens_before} -> {tokens_after})"
+        )
 
-            with executor:
-                # Submit all pages to thread pool
-                future_to_page = {}
-                for page_num in range(len(document)):
+    def _index_segments(file_path: str, output_path: str) -> None:
+        """
+        The segment index only reads bookmarks and the text layer, so it is written before any OCR
+        """
+        try:
+            index = build_segment_index(file_path)
+            write_segment_index(output_path, index)
+            print(f"[🗂️]: {os.path.basename(file_path)}: {len(index['segments'])} segments indexed")
+        except Exception as e:
+            print(f"Error indexing segments of {os.path.basename(file_path)}: {str(e)}")
 
-                    future = executor.submit(_process_page, document[page_num], page_num)
-                    future_to_page[future] = page_num
+    def _process_pdf(file_path: str, output_path: str, on_complete) -> DocumentJob:
+        """
+        Register a PDF with the shared page scheduler. Its pages are recognized alongside the
+        pages of every other pending PDF, and `on_complete` runs as soon as its own output is written.
+        """
+        journal_path = None
+        if resume:
+            journal_path = os.path.join(journal_dir, f"{os.path.splitext(os.path.basename(output_path))[0]}.jsonl")
+        if layout:
+            layout_writers[output_path] = LayoutWriter(layout_path(output_path))
+        return scheduler.submit(
+            DocumentJob(file_path, output_path, on_complete=on_complete, window=window, journal_path=journal_path,
+                        postprocess=_normalize_output if normalize else None,
+                        priority=page_priority if prioritize else None, on_partial=_publish_medical)
+        )
 
-                # Collect results as they complete
+    def _publish_medical(job: DocumentJob) -> None:
+        """
+        Every medical page of the PDF is recognized: publish them on their own, before the rest of the process
+        """
+        if job.partial_rank != PRIORITY_MEDICAL:
+            return
+        path = medical_path(job.output_path)
+        try:
+            pages = job.write_partial(f"{path}.part")
+            if normalize:
+                normalize_file(f"{path}.part")
+            os.replace(f"{path}.part", path)
+        except Exception as e:
+            print(f"Error publishing the medical pages of {job.name}: {str(e)}")
+            return
+        print(f"[🩺]: {job.name}: {pages} medical pages published early to {path}")
+        if on_medical_text is not None:
+            on_medical_text(path)
 
-                for future in as_completed(future_to_page):
-                    page_num = future_to_page[future]
-                    try:
-                        result = future.result()
-                        total_text.append((page_num, result))
-                    # Page number used as index to correctly sort the future results
-                    except Exception as e:
-                        print(f"Error processing page {page_num}: {str(e)}")
-            # Sort results by page number and join texts
-            final_text = "".join(text for _, text in sorted(total_text))
+    def _text_layer_pages(file_path: str) -> tuple[dict[int, str], list[int]]:
+        """
+        Splits a PDF into the pages whose text layer is usable (page -> text) and the pages that need OCR
+        """
+        text_pages: dict[int, str] = {}
+        ocr_pages: list[int] = []
+        with fitz.open(file_path) as document:
+            for page_num, page in enumerate(document):
+                if use_text_layer:
+                    kind, text = classify_page(page)
+                    if kind == PAGE_TEXT:
+                        text_pages[page_num] = text
+                        continue
+                ocr_pages.append(page_num)
+        return text_pages, ocr_pages
 
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    def _process_pdf_async(file_path: str, output_path: str, on_complete) -> None:
+        """
+        Recognize a large PDF with long-running operations: only the pages that need OCR are uploaded, split
+        into operations within Vision's page limit, then every page is written in page order. With fewer than
+        `async_min_pages` such pages, or if an operation fails or times out, the PDF goes to the page scheduler.
+        """
+        name = os.path.basename(file_path)
+        try:
+            text_pages, ocr_pages = _text_layer_pages(file_path)
+        except Exception as e:
+            print(f"Error reading {name}: {str(e)}. Falling back to page-by-page OCR")
+            _process_pdf(file_path, output_path, on_complete)
+            return
+        if len(ocr_pages) < async_min_pages:
+            # A maior parte tem camada de texto: não compensa uma operação
+            print(f"[⏳]: {name}: only {len(ocr_pages)} pages need OCR, recognized page by page")
+            _process_pdf(file_path, output_path, on_complete)
+            return
 
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(final_text)
+        job = DocumentJob(file_path, output_path, on_complete=on_complete,
+                          postprocess=_normalize_output if normalize else None)
+        operations: list[tuple[str, list[int]]] = []
+        try:
+            started = time.monotonic()
+            with tempfile.TemporaryDirectory(prefix="eproc-ocr-") as temp_dir:
+                for index, pages in enumerate(split_pages(ocr_pages)):
+                    subset_path = os.path.join(temp_dir, f"{index}.pdf")
+                    extract_pages(file_path, pages, subset_path)
+                    operations.append((doc_backend.submit(subset_path), pages))
+                    print(f"[⏳]: {name}: {len(pages)} pages submitted as {operations[-1][0]}")
+            for operation, _ in operations:
+                wait_for(doc_backend, operation, float(async_config["poll_interval"]), float(async_config["timeout"]))
 
-            return final_text
+            job.open()
+            for page_num, text in text_pages.items():
+                job.record(page_num, PAGE_TEXT, format_page(page_num, text))
+            recorded = set(text_pages)
+            for operation, pages in operations:
+                # A página `i` do PDF enviado é `pages[i]` do original
+                for index, text in doc_backend.fetch(operation):
+                    if 0 <= index < len(pages) and pages[index] not in recorded:
+                        recorded.add(pages[index])
+                        if text is None:
+                            job.record(pages[index], PAGE_FAILED, format_page(pages[index], FAILED_TEXT))
+                        else:
+                            job.record(pages[index], PAGE_OCR, format_page(pages[index], text))
+            # Páginas ausentes do resultado entram com o marcador de falha
+            for page_num in sorted(set(range(job.page_count)) - recorded):
+                job.record(page_num, PAGE_FAILED, format_page(page_num, FAILED_TEXT))
+            job.finish()
+            print(
+                f"[⏳]: {job.name}: {len(ocr_pages)} of {job.page_count} pages in {len(operations)} operations "
+                f"({time.monotonic() - started:.1f}s)"
+            )
+        except Exception as e:
+            print(f"Error in async OCR of {job.name}: {str(e)}. Falling back to page-by-page OCR")
+            job.error = e
+            job.finish()
+            _process_pdf(file_path, output_path, on_complete)
+            return
         finally:
-            document.close()
+            for operation, _ in operations:
+                try:
+                    doc_backend.cleanup(operation)
+                except Exception as e:
+                    print(f"Error cleaning up {operation}: {str(e)}")
+        try:
+            on_complete(job)
+        finally:
+            job.done.set()
+
+    def _finish_pdf(job: DocumentJob) -> None:
+        """
+        Per-file completion: report stats, move the PDF to 'Processed' and advance the progress bar
+        """
+        layout_writer = layout_writers.pop(job.output_path, None)
+        if layout_writer is not None:
+            if job.error is None:
+                try:
+                    print(f"[🧱]: {job.name}: word layout written to {layout_writer.close()}")
+                except Exception as e:
+                    print(f"Error writing word layout of {job.name}: {str(e)}")
+            else:
+                layout_writer.discard()
+        if job.error is None:
+            print(
+                f"[📊]: {job.name}: {job.stats.get(PAGE_TEXT, 0)} text-layer pages, "
+                f"{job.stats.get(PAGE_OCR, 0)} OCR pages"
+            )
+            if job.replayed:
+                print(f"[♻️]: {job.name}: {job.replayed} pages resumed from the journal")
+            if job.failed_pages:
+                print(f"[⚠️]: {job.name}: failed pages {sorted(job.failed_pages)}")
+            shutil.move(
+                job.file_path,
+                os.path.join("Processos", "Processed", job.name),
+            )
+        with stats_lock:
+            for kind, count in job.stats.items():
+                run_stats[kind] = run_stats.get(kind, 0) + count
+        progress_files.update(1)
 
     try:
         base_process_dir = "Processos"
@@ -114,6 +439,9 @@ def Recognize() -> bool:
         else:
             progress_files = ProgressBar(len(files), "Processing files", "file")
             # Pasta Processed deve existir (criação automática removida)
+            scheduler = PageScheduler(
+                _process_job_page, max_workers=max_workers, max_open_documents=max_open_documents
+            )
 
             for file in files:
 
@@ -121,27 +449,75 @@ def Recognize() -> bool:
                     file_path = os.path.join(base_process_dir, file)
                     name = file[3:23]
                     output_path = os.path.join(output_dir, f"{name}.txt")
+                    if segment_index:
+                        _index_segments(file_path, output_path)
 
-                    _process_pdf(file_path, output_path)
-                    if os.path.exists(output_path):
-                        shutil.move(
-                            file_path,
-                            os.path.join(base_process_dir, "Processed", f"{file}"),
-                        )
+                    if doc_backend is not None and _page_count(file_path) >= async_min_pages:
+                        if async_executor is None:
+                            async_executor = ThreadPoolExecutor(
+                                max_workers=max_open_documents, thread_name_prefix="ocr-operation")
+                        async_executor.submit(_process_pdf_async, file_path, output_path, _finish_pdf)
                     else:
-                        shutil.move(
-                            file_path,
-                            os.path.join(base_process_dir, "Processed", f"{file}"),
-                        )
-                    progress_files.update(1)
+                        _process_pdf(file_path, output_path, _finish_pdf)
 
                 except Exception as e:
                     print(f"Error processing file {file}: {str(e)}")
+            if async_executor is not None:
+                # Operações que falharem ainda caem no scheduler: ele só fecha depois delas
+                async_executor.shutdown(wait=True)
+            scheduler.wait()
             progress_files.close()
+            print(
+                f"[📊]: total: {run_stats[PAGE_TEXT]} text-layer pages, "
+                f"{run_stats[PAGE_OCR]} OCR pages, {run_stats[PAGE_FAILED]} failed pages"
+            )
+            print(f"[🖼️]: encoding: {encode_stats.summary()}")
+            if renderer is not None and renderer.pages:
+                print(
+                    f"[🏭]: rendering: {renderer.pages} renders in {renderer.processes} processes, "
+                    f"{renderer.wait_seconds / renderer.pages * 1000:.0f} ms avg wait per render"
+                )
+            if dedup is not None:
+                print(f"[🧹]: dedup: {dedup.summary()}")
+            if normalize and token_stats["before"]:
+                saved = token_stats["before"] - token_stats["after"]
+                print(
+                    f"[✂️]: normalization: {saved} of {token_stats['before']} tokens removed "
+                    f"({saved / token_stats['before']:.1%}, {token_model})"
+                )
+            backend_stats = ocr_backend.stats()
+            print(
+                f"[🔌]: {ocr_backend.name} backend: {backend_stats.get('images', 0)} pages in "
+                f"{backend_stats.get('requests', 0)} requests, "
+                f"{backend_stats.get('retries', 0)} retries on {backend_stats.get('retried_pages', 0)} pages, "
+                f"{backend_stats.get('gave_up', 0)} gave up, {backend_stats.get('throttled_s', 0.0):.1f}s throttled"
+            )
+            if controller is not None:
+                print(f"[🎚️]: OCR concurrency: {controller.summary()}")
+            if async_executor is not None:
+                operation_stats = doc_backend.stats()
+                print(
+                    f"[⏳]: async OCR: {operation_stats.get('operations', 0)} operations, "
+                    f"{operation_stats.get('polls', 0)} polls, {operation_stats.get('shards', 0)} result shards"
+                )
+            if cache is not None:
+                cache_stats = cache.stats()
+                print(
+                    f"[🗄️]: page cache: {cache_stats['hits']} hits, "
+                    f"{cache_stats['misses']} misses (backend calls)"
+                )
 
     except Exception as e:
         print(f"Critical error in main process: {str(e)}")
         return False
     finally:
+        if async_executor is not None:
+            async_executor.shutdown(wait=True)
+        if scheduler is not None:
+            scheduler.wait()
+        if renderer is not None:
+            renderer.close()
+        if cache is not None:
+            cache.close()
         print("OCR process completed successfully")
         return True
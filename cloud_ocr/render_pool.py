@@ -0,0 +1,143 @@
+"""
+### 🏭 Render Pool Module
+Process pool for the CPU-bound part of OCR: choosing the render, rasterizing and encoding pages, and
+computing dedup signatures. Each worker process opens the PDF itself (a `fitz.Document` must not be
+shared across threads), and the encoded bytes come back to the calling I/O thread through the pool's
+result pipe, so the threads that wait on the OCR API never hold the GIL for rendering.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+from .encoding import page_image_bytes, EncodeStats, PATH_EMBEDDED, PATH_RENDERED
+from .resolution import RenderChoice
+from .dedup import PageSignature, page_signature
+
+
+# GLOBAL VARIABLES
+
+MAX_WORKER_DOCUMENTS = 4  # PDFs mantidos abertos por processo
+# Com poucos núcleos o pool só troca renderização por IPC: `benchmark render` mediu 2 processos a 0.68x das
+# threads em 30 páginas, e em 1 núcleo 1.00x com 2 processos e 0.77x com 4
+MIN_POOL_CPUS = 4
+
+# Estado de cada processo do pool
+_documents: "OrderedDict[tuple, fitz.Document]" = OrderedDict()
+
+
+def _open(file_path: str) -> fitz.Document:
+    """The worker's open handle of `file_path` (reopened if the file changed), keeping a few PDFs open."""
+    info = os.stat(file_path)
+    key = (os.path.abspath(file_path), info.st_mtime_ns, info.st_size)
+    document = _documents.get(key)
+    if document is None:
+        document = _documents[key] = fitz.open(file_path)
+        while len(_documents) > MAX_WORKER_DOCUMENTS:
+            _documents.popitem(last=False)[1].close()
+    _documents.move_to_end(key)
+    return document
+
+
+def default_render_processes() -> int:
+    """
+    Render processes used by `Recognize` by default: none below `MIN_POOL_CPUS` cores, otherwise one per core
+    but one, which is left to the OCR threads of the main process.
+    """
+    cpus = os.cpu_count() or 1
+    return cpus - 1 if cpus >= MIN_POOL_CPUS else 0
+
+
+def _render_page(file_path: str, page_num: int, image_format: str, quality: int, use_embedded: bool,
+                 adaptive_resolution: bool, dpi: int | None, grayscale: bool | None) -> tuple:
+    """Runs in a worker process. Returns `(content, content_format, dpi, grayscale, path, seconds)`."""
+    page = _open(file_path)[page_num]
+    choice = RenderChoice(adaptive_resolution, dpi, grayscale)
+    stats = EncodeStats()
+    content, content_format = page_image_bytes(page, image_format, quality, use_embedded, stats, render_options=choice)
+    path = PATH_EMBEDDED if stats.pages[PATH_EMBEDDED] else PATH_RENDERED
+    return content, content_format, choice.dpi, choice.grayscale, path, stats.seconds[path]
+
+
+def _page_signature(file_path: str, page_num: int) -> tuple[float, bytes, bool]:
+    """Runs in a worker process."""
+    signature = page_signature(_open(file_path)[page_num])
+    return signature.ink, signature.hash, signature.has_text
+
+
+class RenderPool:
+    """
+    ### 🏭 RenderPool
+    Renders and encodes pages in separate processes for the OCR worker threads.
+
+    ### 🖥️ Parameters
+        - `processes` (`int`, optional): Worker processes. Defaults to `os.cpu_count()`.
+
+    ### 💡 Example
+    >>> pool = RenderPool(4)
+    >>> content, content_format, dpi, grayscale = pool.render("Processos/processo.PDF", 12, "png", 85)
+    >>> pool.close()
+
+    ### 📚 Notes
+    - Processes are started on first use, with the `spawn` method: forking a process that already runs
+      OCR threads could copy a held lock into the child.
+    - Pages are addressed by file path and page number, so each call sends a few bytes to the worker and
+      only the encoded image comes back.
+    - Each worker keeps up to `MAX_WORKER_DOCUMENTS` PDFs open, reopening a file whose size or
+      modification time changed.
+    """
+
+    def __init__(self, processes: int | None = None):
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.pages = 0
+        self.wait_seconds = 0.0
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def render(self, file_path: str, page_num: int, image_format: str, quality: int, use_embedded: bool = True,
+               adaptive_resolution: bool = True, dpi: int | None = None, grayscale: bool | None = None,
+               encode_stats: EncodeStats | None = None) -> tuple[bytes, str, int | None, bool | None]:
+        """
+        ### 🏭 render
+        Encoded image of a page, as `page_image_bytes` would produce it in this thread.
+
+        ### 🔄 Returns
+        - `tuple[bytes, str, int | None, bool | None]`: (image bytes, format of the bytes, DPI, grayscale). DPI and
+          grayscale are chosen in the worker (`resolution.RenderChoice`) unless given, and are `None` when the
+          embedded image was sent.
+        """
+        start = time.perf_counter()
+        content, content_format, dpi, grayscale, path, seconds = self.executor.submit(
+            _render_page, file_path, page_num, image_format, quality, use_embedded, adaptive_resolution,
+            dpi, grayscale,
+        ).result()
+        with self._lock:
+            self.pages += 1
+            self.wait_seconds += time.perf_counter() - start
+        if encode_stats is not None:
+            encode_stats.add(path, len(content), seconds, bool(grayscale) and path == PATH_RENDERED)
+        return content, content_format, dpi, grayscale
+
+    def signature(self, file_path: str, page_num: int) -> PageSignature:
+        """Dedup signature of a page (see `dedup.page_signature`), computed in a worker."""
+        return PageSignature(*self.executor.submit(_page_signature, file_path, page_num).result())
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,212 @@
+"""
+### 🔎 Resolution Module
+Per-page render policy for OCR. Instead of rendering every page at 72 DPI in RGB, each page gets a
+DPI and colour space chosen from its size, text density, contrast and colour content: typed A4 pages
+stay at 72 DPI but in grayscale, small, densely printed or faint pages (handwritten prescriptions,
+carbon copies, fine-print exams) get a higher DPI, and colour is kept only where the page is actually
+colourful. The policy inspects a single 72 DPI render, and is only applied to pages that are rendered
+(scanned pages sent as their embedded image skip it). When the detected text looks unreliable (low word
+confidences, or little or noisy text on a page with enough ink), the page is rendered once more at a higher DPI.
+"""
+
+import statistics
+from typing import Callable
+
+import fitz
+from PIL import Image, ImageStat
+
+from .layout import Word
+from .text_layer import text_quality
+
+
+# GLOBAL VARIABLES
+
+BASE_DPI = 72  # fitz.Identity
+MIN_DPI = 72  # o render de sempre: páginas digitadas comuns não precisam de mais
+MAX_DPI = 300
+RETRY_DPI = 300
+MIN_LONG_SIDE = 842  # pixels no lado maior (A4 a 72 DPI); páginas menores (recibos, A5) ganham DPI
+
+INK_FRACTION = 0.002  # fração mais escura dos pixels tratada como "tinta"
+FAINT_INK = 128  # tinta mais clara que este nível de cinza indica página apagada/manuscrita
+FAINT_DPI_FACTOR = 1.5
+COLOR_SATURATION = 40.0  # saturação média acima disso mantém a página em RGB
+COLOR_PIXELS = 0.05  # ou fração de pixels bem saturados (carimbos, marca-texto)
+
+# Densidade do texto: altura mediana das linhas impressas, medida no mesmo render de 72 DPI
+LINE_INK_DELTA = 48  # pixel é "tinta" quando está este tanto mais escuro que o fundo
+MIN_TEXT_LINES = 3  # com menos linhas, a altura medida não é confiável
+TARGET_LINE_PIXELS = 10  # altura de linha que o OCR lê bem (corpo 10 pt a 72 DPI); letra miúda ganha DPI
+
+LOW_CONFIDENCE_CHARS = 40
+LOW_CONFIDENCE_QUALITY = 0.6
+LOW_WORD_CONFIDENCE = 0.8  # confiança média das palavras (ponderada pelo tamanho) abaixo disso pede nova leitura
+RETRY_MIN_INK = 0.005  # sem confianças, só tenta de novo se a página tem tinta para mais texto (não só assinatura)
+
+
+def _ink_level(image: Image.Image) -> int:
+    """Gray level (0 = black) of the darkest `INK_FRACTION` of the pixels: how dark the page's ink gets."""
+    histogram = image.histogram()
+    threshold = INK_FRACTION * image.width * image.height
+    seen = 0
+    for level, count in enumerate(histogram):
+        seen += count
+        if seen >= threshold:
+            return level
+    return 255
+
+
+def line_height(image: Image.Image) -> float | None:
+    """
+    ### 🔎 line_height
+    Median height, in points, of the printed text lines of a page: the bands of consecutive pixel rows that hold
+    ink in its 72 DPI grayscale render. Small print gives low values. `None` with fewer than `MIN_TEXT_LINES` lines.
+    """
+    histogram = image.histogram()
+    background = max(range(256), key=histogram.__getitem__)
+    threshold = background - LINE_INK_DELTA
+    # Média de cada linha de pixels da máscara de tinta: > 0 quando a linha tem pelo menos ~2 pixels de tinta
+    rows = image.point(lambda level: 255 if level < threshold else 0).resize((1, image.height), Image.BOX).tobytes()
+
+    bands, run = [], 0
+    for value in rows + b"\0":
+        if value:
+            run += 1
+        elif run:
+            if run > 1:  # poeira de um pixel não é linha
+                bands.append(run)
+            run = 0
+    if len(bands) < MIN_TEXT_LINES:
+        return None
+    return statistics.median(bands)
+
+
+def choose_render(page: fitz.Page) -> tuple[int, bool]:
+    """
+    ### 🔎 choose_render
+    Chooses the render DPI and colour space of a page that is going to OCR.
+
+    ### 🖥️ Parameters
+    - `page` (`fitz.Page`): The PDF page.
+
+    ### 🔄 Returns
+    - `tuple[int, bool]`: (DPI, grayscale).
+
+    ### 📌 Notes
+    - Typed A4 pages keep 72 DPI, the resolution every page was sent at before; the saving comes from grayscale.
+    - Pages smaller than A4 (receipts, A5 prescriptions) get enough DPI for `MIN_LONG_SIDE` pixels on the longer side.
+    - Text density raises it further: when the text lines (`line_height`) would be shorter than
+      `TARGET_LINE_PIXELS` (fine print, dense lab reports), the DPI is raised until they are not.
+    - Pages whose darkest ink is still light gray (faint scans, carbon copies, pencil) get
+      `FAINT_DPI_FACTOR` times more DPI. Blank pages are not faint.
+    - Pages are rendered in grayscale unless a meaningful part of them is saturated colour.
+    - All of it is measured on one 72 DPI RGB render. Call it only for pages that are going to be rendered.
+
+    ### 💡 Example
+
+    >>> choose_render(document[0])
+    (72, True)
+    """
+    pix = page.get_pixmap(colorspace=fitz.csRGB, alpha=False)  # type: ignore
+    image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    gray = image.convert("L")
+
+    long_side = max(page.rect.width, page.rect.height) / BASE_DPI  # polegadas
+    dpi = MIN_LONG_SIDE / long_side if long_side else MIN_DPI
+    height = line_height(gray)
+    if height:
+        dpi = max(dpi, TARGET_LINE_PIXELS * BASE_DPI / height)
+
+    histogram = gray.histogram()
+    background = max(range(256), key=histogram.__getitem__)
+    ink = _ink_level(gray)
+    if FAINT_INK < ink < background - LINE_INK_DELTA // 3:  # há tinta, mas clara
+        dpi *= FAINT_DPI_FACTOR
+
+    saturation = image.convert("HSV").getchannel("S")
+    saturated = saturation.histogram()[128:]
+    colorful = (
+        ImageStat.Stat(saturation).mean[0] > COLOR_SATURATION
+        or sum(saturated) / max(1, image.width * image.height) > COLOR_PIXELS
+    )
+
+    return int(round(min(max(dpi, MIN_DPI), MAX_DPI))), not colorful
+
+
+def render_matrix(dpi: int) -> fitz.Matrix:
+    """Render matrix for `dpi` (`fitz.Identity` is 72 DPI)."""
+    return fitz.Matrix(dpi / BASE_DPI, dpi / BASE_DPI)
+
+
+class RenderChoice:
+    """
+    ### 🔎 RenderChoice
+    Render options of one page for `page_image_bytes(render_options=...)`, chosen only if the page is rendered:
+    scanned pages sent as their embedded image never pay for `choose_render`.
+
+    ### 🖥️ Parameters
+        - `adaptive` (`bool`, optional): Use `choose_render`; `False` renders at 72 DPI RGB. Defaults to `True`.
+        - `dpi` (`int`, optional): Fixed DPI (the high-DPI retry). Defaults to `None` (chosen per page).
+        - `grayscale` (`bool`, optional): Fixed colour space. Defaults to `None` (chosen per page).
+
+    ### 📚 Notes
+    - After the call, `dpi` and `grayscale` hold what was used; both stay `None` when the embedded image was sent.
+    """
+
+    def __init__(self, adaptive: bool = True, dpi: int | None = None, grayscale: bool | None = None):
+        self.adaptive = adaptive
+        self.dpi = dpi
+        self.grayscale = grayscale
+
+    def __call__(self, page: fitz.Page) -> tuple[fitz.Matrix, bool]:
+        if self.dpi is None or self.grayscale is None:
+            dpi, grayscale = choose_render(page) if self.adaptive else (BASE_DPI, False)
+            self.dpi = dpi if self.dpi is None else self.dpi
+            self.grayscale = grayscale if self.grayscale is None else self.grayscale
+        return render_matrix(self.dpi), self.grayscale
+
+
+def mean_confidence(words: list[Word]) -> float | None:
+    """Mean confidence of the words, weighted by their length. `None` without words."""
+    total = sum(len(word[6]) for word in words)
+    if not total:
+        return None
+    return sum(word[1] * len(word[6]) for word in words) / total
+
+
+def is_low_confidence(text: str, words: list[Word] | None = None,
+                      ink: Callable[[], float] | None = None) -> bool:
+    """
+    ### 🔍 is_low_confidence
+    Whether an OCR result looks unreliable, as the signal for a high-DPI retry.
+
+    ### 📌 Notes
+    - With the backend's word confidences (`detect_layout`, see `layout`), the length-weighted mean is compared
+      with `LOW_WORD_CONFIDENCE`.
+    - Without them (text-only backends), the text itself is judged (almost no text, or text that is mostly
+      noise), and then the page's ink fraction, from `ink()` (`dedup.PageSignature.ink`), must be at least
+      `RETRY_MIN_INK`: signature and near-blank pages are short by nature and are never retried. `ink` is only
+      called for such suspect text; without it nothing is retried.
+    """
+    confidence = mean_confidence(words) if words else None
+    if confidence is not None:
+        return confidence < LOW_WORD_CONFIDENCE
+    chars = sum(1 for ch in text if not ch.isspace())
+    if chars >= LOW_CONFIDENCE_CHARS and text_quality(text) >= LOW_CONFIDENCE_QUALITY:
+        return False
+    return ink is not None and ink() >= RETRY_MIN_INK
+
+
+def better_text(first: str, second: str, first_words: list[Word] | None = None,
+                second_words: list[Word] | None = None) -> str:
+    """
+    Keeps the OCR result with more valid characters: length weighted by the mean word confidence when both
+    results have words, by `text_quality` otherwise.
+    """
+    first_confidence = mean_confidence(first_words) if first_words else None
+    second_confidence = mean_confidence(second_words) if second_words else None
+    if first_confidence is not None and second_confidence is not None:
+        scores = (len(first.strip()) * first_confidence, len(second.strip()) * second_confidence)
+    else:
+        scores = (len(first.strip()) * text_quality(first), len(second.strip()) * text_quality(second))
+    return second if scores[1] > scores[0] else first
@@ -0,0 +1,401 @@
+"""
+### 🗂️ Scheduler Module
+Cross-document page scheduler for the OCR pipeline. A single long-lived worker pool is fed with
+pages from every pending PDF in round-robin order, so small documents are not stuck behind a
+900-page process and the pool never idles while there is work left in any file. Each document is
+finalized (text written, callback fired) as soon as its own last page completes.
+
+Pages are written to the output file in order as soon as every earlier page is done, and each
+document only has a bounded window of pages in flight or buffered, so peak memory depends on the
+window size and not on the page count.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import fitz
+
+from .journal import PageJournal, file_fingerprint
+
+
+# GLOBAL VARIABLES
+
+DEFAULT_WINDOW = 64  # páginas em voo ou aguardando escrita, por documento
+PAGE_FAILED = "failed"
+FAILED_TEXT = "Não foi possivel processar esta pagina"  # texto da página que falhou
+
+
+class DocumentJob:
+    """
+    ### 📄 DocumentJob
+    One PDF registered with the `PageScheduler`: tracks its open document, dispatched pages,
+    the ordered reassembly buffer and per-path stats.
+
+    ### 🖥️ Parameters
+        - `file_path` (`str`): The PDF to be recognized.
+        - `output_path` (`str`): Where the assembled text is written.
+        - `on_complete` (`Callable[[DocumentJob], None]`, optional): Called from a worker thread once the
+          output has been written (or the job failed; check `error`).
+        - `window` (`int`, optional): Maximum pages of this document in flight or waiting for an earlier
+          page. Defaults to `64`.
+        - `journal_path` (`str`, optional): Per-page checkpoint journal (see `PageJournal`). When given, pages
+          found in the journal of an interrupted run are not recognized again, and the output is assembled
+          from the journal. Defaults to `None` (no checkpoints).
+        - `postprocess` (`Callable[[str], None]`, optional): Called with the path of the complete `.part` file
+          before it is renamed to `output_path`, to rewrite it in place (see `normalize`). Defaults to `None`.
+        - `priority` (`Callable[[fitz.Page], int]`, optional): Ranks each page when the job is opened (see
+          `priority.page_priority`); pages are dispatched by rank, then page number. Needs `journal_path`, since
+          pages then finish out of order. Defaults to `None` (page order).
+        - `on_partial` (`Callable[[DocumentJob], None]`, optional): Called from a worker thread as soon as every
+          page of the best rank (`partial_pages`) is done, before the rest of the document (see
+          `write_partial`). Defaults to `None`.
+
+    ### 📚 Notes
+    - The PDF is only opened when the scheduler admits the job, and closed right after it finishes.
+    - Pages are streamed to `<output_path>.part` in page order and the file is renamed to `output_path`
+      only when the document is complete, so a crash never leaves a truncated `.txt` behind for the
+      report stage.
+    - With a journal, pages are appended to it as they finish instead, in any order, and `.part` is written
+      from the journal at the end. The journal is deleted once the output is in place and kept if the job
+      fails. Pages journaled as `PAGE_FAILED` are recognized again on resume.
+    - With `priority`, `window` bounds the pages in flight; finished pages go straight to the journal.
+    - A `fitz.Document` is not thread-safe: workers hold `document_lock` while they read `document` or its pages.
+    """
+
+    def __init__(self, file_path: str, output_path: str, on_complete: Callable | None = None,
+                 window: int = DEFAULT_WINDOW, journal_path: str | None = None,
+                 postprocess: Callable[[str], None] | None = None,
+                 priority: Callable[[fitz.Page], int] | None = None,
+                 on_partial: Callable | None = None):
+        self.file_path = file_path
+        self.output_path = output_path
+        self.on_complete = on_complete
+        self.window = max(1, window)
+        self.journal_path = journal_path
+        self.postprocess = postprocess
+        self.priority = priority if journal_path is not None else None
+        self.on_partial = on_partial
+        self.partial_pages: list[int] = []
+        self.partial_rank: int | None = None
+        self.replayed = 0
+        self.document: fitz.Document | None = None
+        self.document_lock = threading.Lock()
+        self.page_count = 0
+        self.next_page = 0
+        self.written = 0
+        self.completed = 0
+        self.results: dict[int, str] = {}
+        self.stats: dict[str, int] = {}
+        self.failed_pages: list[int] = []
+        self.error: Exception | None = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._journal: PageJournal | None = None
+        self._journaled: set[int] = set()
+        self._finalized = False
+        self._order: list[int] | None = None
+        self._cursor = 0
+        self._partial_pending: set[int] = set()
+        self._partial_due = False
+
+    @property
+    def part_path(self) -> str:
+        return f"{self.output_path}.part"
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.file_path)
+
+    def open(self) -> None:
+        self.document = fitz.open(self.file_path)
+        self.page_count = len(self.document)
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        if self.journal_path is None:
+            self._writer = open(self.part_path, "w", encoding="utf-8")
+            return
+
+        self._journal = PageJournal(self.journal_path, file_fingerprint(self.file_path))
+        for page_num, (kind, _) in self._journal.replay().items():
+            # Páginas que falharam na execução anterior são refeitas
+            if kind == PAGE_FAILED or not 0 <= page_num < self.page_count:
+                continue
+            self._journaled.add(page_num)
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+            self.completed += 1
+            self.replayed += 1
+        self._advance_written()
+        self.next_page = self.written
+        while self.next_page in self._journaled:
+            self.next_page += 1
+        if self.priority is not None:
+            self._prioritize()
+
+    def _prioritize(self) -> None:
+        """Ranks the pages and builds the dispatch order; the best-ranked pages form `partial_pages`."""
+        ranks = {page_num: self.priority(self.document[page_num]) for page_num in range(self.page_count)}
+        pending = [p for p in range(self.written, self.page_count) if p not in self._journaled]
+        self._order = sorted(pending, key=lambda p: (ranks[p], p))
+        if ranks and min(ranks.values()) < max(ranks.values()):
+            best = self.partial_rank = min(ranks.values())
+            self.partial_pages = [p for p in range(self.page_count) if ranks[p] == best]
+            self._partial_pending = set(self.partial_pages) & set(pending)
+            # Todas já estavam no journal: publica no primeiro registro
+            self._partial_due = not self._partial_pending
+
+    def _advance_written(self) -> None:
+        """Moves `written` past the contiguous prefix of journaled pages."""
+        while self.written in self._journaled:
+            self._journaled.discard(self.written)
+            self.written += 1
+
+    def has_pending_pages(self) -> bool:
+        """`True` while there are undispatched pages inside the window after the last written page."""
+        if self._order is not None:
+            in_flight = self._cursor - (self.completed - self.replayed)
+            return self.error is None and self._cursor < len(self._order) and in_flight < self.window
+        limit = min(self.page_count, self.written + self.window)
+        return self.error is None and self.next_page < limit
+
+    def has_undispatched_pages(self) -> bool:
+        if self._order is not None:
+            return self.error is None and self._cursor < len(self._order)
+        return self.error is None and self.next_page < self.page_count
+
+    def take_page(self) -> int:
+        """Returns the next page to dispatch, skipping pages already journaled. Caller holds the scheduler lock."""
+        if self._order is not None:
+            self._cursor += 1
+            return self._order[self._cursor - 1]
+        page_num = self.next_page
+        self.next_page += 1
+        with self._lock:
+            while self.next_page in self._journaled:
+                self.next_page += 1
+        return page_num
+
+    def record(self, page_num: int, kind: str, text: str) -> bool:
+        """
+        Buffers a page result and appends every page of the now-contiguous prefix to the output.
+        Returns `True` when this was the last page of the document.
+        """
+        partial = False
+        with self._lock:
+            self.stats[kind] = self.stats.get(kind, 0) + 1
+            if kind == PAGE_FAILED:
+                self.failed_pages.append(page_num)
+            self.completed += 1
+            last = self.completed == self.page_count
+            if self._journal is not None:
+                self._journal.append(page_num, kind, text or "")
+                self._journaled.add(page_num)
+                self._advance_written()
+                if page_num in self._partial_pending:
+                    self._partial_pending.discard(page_num)
+                    self._partial_due = not self._partial_pending
+                partial, self._partial_due = self._partial_due and not last, False
+            else:
+                self.results[page_num] = text or ""
+                while self.written in self.results:
+                    self._writer.write(self.results.pop(self.written))
+                    self.written += 1
+        if partial and self.on_partial is not None:
+            # Fora do lock: o callback lê o journal em `write_partial`
+            self.on_partial(self)
+        return last
+
+    def write_partial(self, path: str) -> int:
+        """Writes the `partial_pages` already journaled, in page order, to `path`. Returns the page count."""
+        with self._lock:
+            if self._journal is None:
+                return 0
+            return self._journal.assemble(path, pages=set(self.partial_pages))
+
+    def finish(self) -> None:
+        """Closes the stream and moves the finished text into place (or discards it on error)."""
+        with self._lock:
+            journal, self._journal = self._journal, None
+        if journal is not None:
+            if self.error is None:
+                journal.assemble(self.part_path)
+                if self.postprocess is not None:
+                    self.postprocess(self.part_path)
+                os.replace(self.part_path, self.output_path)
+                journal.remove()
+            else:
+                journal.close()
+            self._journaled.clear()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            if self.error is None:
+                if self.postprocess is not None:
+                    self.postprocess(self.part_path)
+                os.replace(self.part_path, self.output_path)
+            elif os.path.exists(self.part_path):
+                os.remove(self.part_path)
+        self.results.clear()
+        if self.document is not None:
+            self.document.close()
+            self.document = None
+
+
+class PageScheduler:
+    """
+    ### 🗂️ PageScheduler
+    Global page-level work queue across documents, served by one bounded thread pool.
+
+    ### 🖥️ Parameters
+        - `page_fn` (`Callable[[DocumentJob, int], tuple[str, str]]`): Processes one page and returns
+          `(kind, text)`; `kind` feeds the per-document stats.
+        - `max_workers` (`int`, optional): Global concurrency limit (pages in flight). Defaults to `cpu_count * 2`.
+        - `max_open_documents` (`int`, optional): Documents open at the same time. Defaults to `4`.
+
+    ### 💡 Example
+    >>> scheduler = PageScheduler(process_page, max_workers=16)
+    >>> for path in pdfs:
+    ...     scheduler.submit(DocumentJob(path, out_path(path), on_complete=finish))
+    >>> scheduler.wait()
+
+    ### 📚 Notes
+    - Fairness: the dispatcher takes one page from each open document in turn, and only dispatches when a
+      worker slot is free, so a large document never floods the pool queue ahead of the others.
+    - Documents are opened (and their pages ranked) in a thread of their own, outside the scheduler's lock, so
+      opening a large PDF never stalls the pages of the documents already open.
+    - Errors raised by `page_fn` are logged and the page is recorded as `PAGE_FAILED` with empty text (see
+      `DocumentJob.failed_pages`); the document still completes.
+    """
+
+    def __init__(self, page_fn: Callable, max_workers: int = int(os.cpu_count() * 2), max_open_documents: int = 4):
+        self.page_fn = page_fn
+        self.max_workers = max(1, max_workers)
+        self.max_open_documents = max(1, max_open_documents)
+
+        self._pending: list[DocumentJob] = []
+        self._active: list[DocumentJob] = []
+        self._opening = 0
+        self._turn = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._slots = threading.Semaphore(self.max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr-page")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="ocr-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, job: DocumentJob) -> DocumentJob:
+        """Queues a document. Its pages are dispatched once it is admitted (see `max_open_documents`)."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("PageScheduler is closed")
+            self._pending.append(job)
+            self._condition.notify_all()
+        return job
+
+    def wait(self) -> None:
+        """Stops accepting documents and blocks until every submitted document is finished."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    # ■■■■■■■■■■■
+    #  DISPATCH
+    # ■■■■■■■■■■■
+
+    def _admit(self, job: DocumentJob) -> None:
+        """
+        Opens a document taken from the queue and makes it active, in its own thread and without the condition:
+        opening hashes the whole PDF, replays its journal and ranks every page, which takes seconds on a large
+        PDF, while the dispatcher keeps serving the open documents and the workers keep reporting their pages.
+        """
+        try:
+            job.open()
+        except Exception as e:
+            print(f"Error opening {job.name}: {str(e)}")
+            job.error = e
+        idle = job.page_count == 0 or job.error is not None or job.completed == job.page_count
+        if idle:
+            # Nada a despachar (enviado antes de liberar a vaga, para o pool ainda estar aberto)
+            self._executor.submit(self._finalize, job)
+        with self._condition:
+            self._opening -= 1
+            if not idle:
+                self._active.append(job)
+            self._condition.notify_all()
+
+    def _next_page(self) -> tuple[DocumentJob, int] | None:
+        """Round-robin pick of the next page. Blocks until one is available; `None` when all work is dispatched."""
+        with self._condition:
+            while True:
+                while self._pending and len(self._active) + self._opening < self.max_open_documents:
+                    self._opening += 1
+                    threading.Thread(target=self._admit, args=(self._pending.pop(0),),
+                                     name="ocr-open", daemon=True).start()
+                candidates = [job for job in self._active if job.has_pending_pages()]
+                if candidates:
+                    job = candidates[self._turn % len(candidates)]
+                    self._turn += 1
+                    return job, job.take_page()
+                undispatched = any(job.has_undispatched_pages() for job in self._active)
+                if self._closed and not self._pending and not self._opening and not undispatched:
+                    return None
+                self._condition.wait()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            self._slots.acquire()
+            item = self._next_page()
+            if item is None:
+                self._slots.release()
+                return
+            self._executor.submit(self._run, *item)
+
+    # ■■■■■■■■■■■
+    #  WORKERS
+    # ■■■■■■■■■■■
+
+    def _run(self, job: DocumentJob, page_num: int) -> None:
+        try:
+            kind, text = self.page_fn(job, page_num)
+        except Exception as e:
+            print(f"Error processing page {page_num} of {job.name}: {str(e)}")
+            kind, text = PAGE_FAILED, ""
+        finally:
+            self._slots.release()
+
+        try:
+            last = job.record(page_num, kind, text)
+        except Exception as e:
+            print(f"Error writing page {page_num} of {job.name}: {str(e)}")
+            job.error = e
+            last = True
+        with self._condition:
+            # Libera a janela do documento para o dispatcher
+            self._condition.notify_all()
+        if last:
+            self._finalize(job)
+
+    def _finalize(self, job: DocumentJob) -> None:
+        with self._condition:
+            if job._finalized:
+                return
+            job._finalized = True
+        try:
+            job.finish()
+        except Exception as e:
+            print(f"Error writing output for {job.name}: {str(e)}")
+            job.error = e
+        with self._condition:
+            if job in self._active:
+                self._active.remove(job)
+            self._condition.notify_all()
+        try:
+            if job.on_complete is not None:
+                job.on_complete(job)
+        except Exception as e:
+            print(f"Error finishing {job.name}: {str(e)}")
+        finally:
+            job.done.set()
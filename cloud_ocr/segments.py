@@ -0,0 +1,177 @@
+"""
+### 🗂️ Segments Module
+Segment index of an EPROC complete-process PDF: where each document of each event starts and ends.
+The index is written as a sidecar JSON next to the `.txt` (`<processo>.segments.json`) so later stages
+can load only the documents they need (e.g. only the `LAUDO` and `ATESTMED` of the process) instead of
+the whole text.
+
+Boundaries come from, in order of preference:
+- the EPROC stamp printed on every page ("Evento 12, LAUDO1, Página 3");
+- the PDF bookmarks (`document.get_toc()`);
+- event cover pages (short pages headed "Evento 12"), which start a new event for the following pages.
+"""
+
+import json
+import os
+import re
+
+import fitz
+
+
+# GLOBAL VARIABLES
+
+SEGMENT_SUFFIX = ".segments.json"
+COVER_MAX_CHARS = 600
+
+STAMP_PATTERN = re.compile(r"Evento\s+(\d+)\s*,\s*([A-Z][A-Z_]*?)(\d+)\s*,\s*P[áa]gina\s+(\d+)", re.IGNORECASE)
+EVENT_PATTERN = re.compile(r"\bEvento\s*:?\s*(\d+)\b", re.IGNORECASE)
+LABEL_PATTERN = re.compile(r"\b([A-Z][A-Z_]{1,20})(\d{1,3})\b")
+PAGE_PATTERN = re.compile(
+    r"------------ Inicio da pagina (\d+) ------------\n\n(.*?)\n\n------------ Fim da pagina \1 ------------",
+    re.DOTALL,
+)
+
+
+def segment_path(output_path: str) -> str:
+    """`Output/<processo>.txt` -> `Output/<processo>.segments.json`."""
+    return f"{os.path.splitext(output_path)[0]}{SEGMENT_SUFFIX}"
+
+
+def _toc_labels(document: fitz.Document) -> dict[int, dict]:
+    """Start page (0-based) -> {event, type, number, title} for each bookmark."""
+    starts: dict[int, dict] = {}
+    event = None
+    for level, title, page, *_ in document.get_toc(simple=False):
+        if page < 1:
+            continue
+        found = EVENT_PATTERN.search(title)
+        if found:
+            event = int(found.group(1))
+        label = LABEL_PATTERN.search(title)
+        starts[page - 1] = {
+            "event": event,
+            "type": label.group(1).upper() if label else None,
+            "number": int(label.group(2)) if label else None,
+            "title": title.strip(),
+        }
+    return starts
+
+
+def _page_label(text: str) -> dict | None:
+    """Event and document label from the EPROC stamp of a page, if present."""
+    found = STAMP_PATTERN.search(text)
+    if not found:
+        return None
+    return {"event": int(found.group(1)), "type": found.group(2).upper(), "number": int(found.group(3))}
+
+
+def build_segment_index(file_path: str) -> dict:
+    """
+    ### 🗂️ build_segment_index
+    Builds the segment index of a PDF from its text layer and bookmarks. Nothing is OCR'd: the EPROC stamp
+    and the bookmarks are in the PDF even for scanned pages.
+
+    ### 🔄 Returns
+    - `dict`: `{"source", "pages", "segments": [{event, type, number, title, start, end, cover, origin}]}`.
+      `start`/`end` are inclusive and use the page numbers of the `Inicio da pagina N` markers (0-based).
+
+    ### 💡 Example
+
+    >>> index = build_segment_index("Processos/ABC50085259120254047102.PDF")
+    >>> [(s["event"], s["type"], s["start"], s["end"]) for s in index["segments"]][:2]
+    [(1, 'INIC', 0, 11), (1, 'PROCADM', 12, 80)]
+    """
+    document = fitz.open(file_path)
+    try:
+        toc = _toc_labels(document)
+        labels: list[dict] = []
+        current = {"event": None, "type": None, "number": None, "title": None}
+        for page_num, page in enumerate(document):
+            text = page.get_text("text")
+            stamp = _page_label(text)
+            cover = False
+            if stamp is not None:
+                label = dict(current, **stamp, origin="stamp")
+                if page_num in toc and toc[page_num]["title"]:
+                    label["title"] = toc[page_num]["title"]
+            elif page_num in toc:
+                label = dict(toc[page_num], origin="toc")
+            else:
+                found = EVENT_PATTERN.search(text)
+                cover = bool(found) and len(text.strip()) <= COVER_MAX_CHARS
+                if cover:
+                    label = {"event": int(found.group(1)), "type": "CAPA", "number": None,
+                             "title": text.strip().split("\n")[0][:120], "origin": "cover"}
+                else:
+                    label = dict(current, origin=current.get("origin", "none"))
+            label["cover"] = cover
+            labels.append(label)
+            # Depois da capa, as páginas seguintes pertencem ao evento dela
+            current = dict(label, type=None, number=None, title=None) if cover else label
+
+        segments: list[dict] = []
+        for page_num, label in enumerate(labels):
+            key = (label["event"], label["type"], label["number"], label["cover"])
+            if segments and segments[-1]["key"] == key:
+                segments[-1]["end"] = page_num
+                continue
+            segments.append({
+                "key": key,
+                "event": label["event"],
+                "type": label["type"],
+                "number": label["number"],
+                "title": label.get("title"),
+                "start": page_num,
+                "end": page_num,
+                "cover": label["cover"],
+                "origin": label.get("origin", "none"),
+            })
+        for segment in segments:
+            del segment["key"]
+        return {"source": os.path.basename(file_path), "pages": len(document), "segments": segments}
+    finally:
+        document.close()
+
+
+def write_segment_index(output_path: str, index: dict) -> str:
+    """Writes the sidecar next to `output_path` (atomically) and returns its path."""
+    path = segment_path(output_path)
+    with open(f"{path}.part", "w", encoding="utf-8") as file:
+        json.dump(index, file, ensure_ascii=False, indent=2)
+    os.replace(f"{path}.part", path)
+    return path
+
+
+def load_segments(output_path: str, types: set[str] | None = None, events: set[int] | None = None) -> str:
+    """
+    ### 🗂️ load_segments
+    Reads only the pages of the selected segments from an OCR output file.
+
+    ### 🖥️ Parameters
+    - `output_path` (`str`): The `.txt` produced by `Recognize` (its sidecar must exist).
+    - `types` (`set[str]`, optional): Document types to keep, e.g. `{"LAUDO", "ATESTMED"}`. Defaults to all.
+    - `events` (`set[int]`, optional): Event numbers to keep. Defaults to all.
+
+    ### 🔄 Returns
+    - `str`: The selected pages, with their page markers, in page order.
+
+    #### ⚠️ Raises
+    - `FileNotFoundError`: If the `.txt` or its sidecar does not exist.
+
+    ### 💡 Example
+
+    >>> text = load_segments("Output/50085259120254047102.txt", types={"LAUDO", "ATESTMED", "RECEIT"})
+    """
+    with open(segment_path(output_path), "r", encoding="utf-8") as file:
+        index = json.load(file)
+    wanted: set[int] = set()
+    for segment in index["segments"]:
+        if types is not None and (segment["type"] or "").upper() not in {t.upper() for t in types}:
+            continue
+        if events is not None and segment["event"] not in events:
+            continue
+        wanted.update(range(segment["start"], segment["end"] + 1))
+
+    with open(output_path, "r", encoding="utf-8") as file:
+        text = file.read()
+    return "".join(match.group(0) + "\n\n" for match in PAGE_PATTERN.finditer(text) if int(match.group(1)) in wanted)
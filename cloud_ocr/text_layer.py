@@ -0,0 +1,99 @@
+"""
+### 📑 Text Layer Module
+Per-page classifier that decides whether a PDF page already carries a usable text layer
+(born-digital petitions, despachos, CNIS/PLENUS extracts) or needs to go through OCR
+(scanned or image-only pages).
+"""
+
+import fitz
+
+
+# GLOBAL VARIABLES
+
+PAGE_TEXT = "text"
+PAGE_OCR = "ocr"
+
+MIN_CHARS = 200  # o carimbo de assinatura do EPROC sozinho tem ~150 caracteres
+MIN_QUALITY = 0.85
+MAX_IMAGE_COVERAGE = 0.5
+DENSE_CHARS = 1500
+
+_EXTRA_VALID = set(" \n\t.,;:!?()[]{}-–—_/\\'\"ºª°%$#@&*+=<>|§")
+
+
+def text_quality(text: str) -> float:
+    """
+    ### 🔍 text_quality
+    Fraction of characters in `text` that look like real Portuguese text (letters, digits,
+    accented characters and common punctuation). Broken font encodings produce replacement
+    characters, control codes or private-use glyphs and score low.
+
+    ### 🔄 Returns
+    - `float`: Value between `0.0` and `1.0` (`0.0` for empty text).
+    """
+    if not text:
+        return 0.0
+    valid = sum(1 for ch in text if (ch.isalnum() and ch != "�") or ch in _EXTRA_VALID)
+    return valid / len(text)
+
+
+def image_coverage(page: fitz.Page) -> float:
+    """
+    ### 🖼️ image_coverage
+    Fraction of the page area covered by embedded images (clipped to the page, capped at `1.0`).
+    """
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page.rect
+        covered += abs(bbox)
+    return min(covered / page_area, 1.0)
+
+
+def classify_page(page: fitz.Page, min_chars: int = MIN_CHARS, min_quality: float = MIN_QUALITY,
+                  max_image_coverage: float = MAX_IMAGE_COVERAGE, dense_chars: int = DENSE_CHARS) -> tuple[str, str]:
+    """
+    ### 📑 classify_page
+    Decides whether a page can use its native text layer or must be sent to OCR.
+
+    ### 🖥️ Parameters
+    - `page` (`fitz.Page`): The PDF page to classify.
+    - `min_chars` (`int`, optional): Minimum non-whitespace characters for a usable text layer on a page
+      with images. Defaults to `200`.
+    - `min_quality` (`float`, optional): Minimum `text_quality` score. Defaults to `0.85`.
+    - `max_image_coverage` (`float`, optional): Above this image coverage the page is treated as a scan,
+      unless its text layer is dense (e.g. a searchable scan). Defaults to `0.5`.
+    - `dense_chars` (`int`, optional): Character count that overrides the image coverage rule. Defaults to `1500`.
+
+    ### 🔄 Returns
+    - `tuple[str, str]`: (`PAGE_TEXT` or `PAGE_OCR`, extracted text). The text is empty-safe and only
+      meaningful when the page was classified as `PAGE_TEXT`.
+
+    ### 📌 Notes
+    - Scanned EPROC pages still carry the electronic signature stamp as text, so a small amount of
+      text does not make a page born-digital; `min_chars` is set above the stamp length.
+    - A page without any image has nothing for OCR to read, so its text layer is accepted at any length
+      (certificates, prescriptions, signature pages).
+
+    ### 💡 Example
+
+    >>> kind, text = classify_page(document[0])
+    >>> kind
+    'text'
+    """
+    text = page.get_text("text").strip()
+    chars = sum(1 for ch in text if not ch.isspace())
+
+    if not chars or text_quality(text) < min_quality:
+        return PAGE_OCR, text
+
+    # Sem imagens não há o que o OCR ler além da própria camada de texto
+    if chars < min_chars and page.get_image_info():
+        return PAGE_OCR, text
+
+    if chars < dense_chars and image_coverage(page) > max_image_coverage:
+        return PAGE_OCR, text
+
+    return PAGE_TEXT, text
@@ -0,0 +1,24 @@
+"""
+Fixtures shared by the offline tests. Nothing here needs credentials, network access or the cloud SDKs.
+"""
+
+import fitz
+import pytest
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Builds a PDF with one page per text (an empty string gives a blank page) and returns its path."""
+
+    def build(texts: list[str], name: str = "processo.pdf") -> str:
+        document = fitz.open()
+        for text in texts:
+            page = document.new_page()
+            if text:
+                page.insert_text((72, 72), text, fontsize=11)
+        path = str(tmp_path / name)
+        document.save(path)
+        document.close()
+        return path
+
+    return build
@@ -0,0 +1,125 @@
+import threading
+
+import fitz
+import pytest
+
+from cloud_ocr.backends import FakeBackend, TransientOcrError, VisionBackend
+from cloud_ocr.fake_vision import FakeVisionClient
+from cloud_ocr.operations import FakeOperationServer, extract_pages, split_pages, wait_for
+
+
+def test_fake_backend_returns_text_layer(make_pdf):
+    document = fitz.open(make_pdf(["Atestado medico CID M54.5"]))
+    text, words = FakeBackend().detect_layout(b"image", document[0])
+    assert text == "Atestado medico CID M54.5"
+    assert [word[6] for word in words] == ["Atestado", "medico", "CID", "M54.5"]
+    assert all(word[1] == 1.0 for word in words)
+
+
+def test_fake_backend_errors_and_quota():
+    with pytest.raises(TransientOcrError) as error:
+        FakeBackend(error_rate=1.0, seed=1).detect_text(b"image")
+    assert not error.value.quota
+
+    backend = FakeBackend(quota=2, canned_text="texto")
+    assert [backend.detect_text(b"image") for _ in range(2)] == ["texto", "texto"]
+    with pytest.raises(TransientOcrError) as error:
+        backend.detect_text(b"image")
+    assert error.value.quota
+    assert backend.stats()["rejected"] == 1
+
+
+def test_vision_backend_unbatched_with_fake_client():
+    fake = FakeVisionClient(text_fn=lambda content: content.decode())
+    backend = VisionBackend(client=fake)
+    assert backend.detect_text(b"pagina um") == "pagina um"
+    text, words = backend.detect_layout(b"laudo pericial")
+    assert text == "laudo pericial"
+    assert [(word[6], word[1]) for word in words] == [("laudo", 0.99), ("pericial", 0.99)]
+    assert (fake.requests, fake.images) == (2, 2)
+
+
+def test_vision_backend_batches_concurrent_pages():
+    fake = FakeVisionClient(text_fn=lambda content: content.decode())
+    backend = VisionBackend(client=fake, batch_size=4, max_wait=0.5)
+    results: dict[int, str] = {}
+
+    def send(page_num: int) -> None:
+        results[page_num] = backend.detect_text(f"pagina {page_num}".encode())
+
+    threads = [threading.Thread(target=send, args=(page_num,)) for page_num in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {page_num: f"pagina {page_num}" for page_num in range(8)}
+    assert fake.images == 8
+    assert fake.requests < 8
+
+
+def test_vision_batches_stay_under_byte_limit():
+    sizes: list[int] = []
+
+    class RecordingClient(FakeVisionClient):
+        def batch_annotate_images(self, requests=None, **kwargs):
+            sizes.append(sum(len(request.image.content) for request in requests))
+            return super().batch_annotate_images(requests=requests, **kwargs)
+
+    fake = RecordingClient(text_fn=lambda content: content.decode().strip())
+    backend = VisionBackend(client=fake, batch_size=8, max_wait=0.5, max_batch_bytes=250)
+    results: dict[int, str] = {}
+
+    def send(page_num: int) -> None:
+        results[page_num] = backend.detect_text(f"pagina {page_num}".ljust(100).encode())
+
+    threads = [threading.Thread(target=send, args=(page_num,)) for page_num in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {page_num: f"pagina {page_num}" for page_num in range(8)}
+    assert sum(sizes) == 800
+    assert max(sizes) <= 250
+    # Uma imagem maior que o limite ainda é enviada, sozinha
+    assert backend.detect_text(b"x" * 400) == "x" * 400
+    assert sizes[-1] == 400
+
+
+def test_fake_operation_server_cycle(make_pdf):
+    path = make_pdf(["primeira", "segunda", "terceira"])
+    server = FakeOperationServer(pages_per_shard=2, failed_pages={1})
+    operation = server.submit(path)
+    wait_for(server, operation, poll_interval=0.01, timeout=5)
+
+    assert list(server.fetch(operation)) == [(0, "primeira"), (1, None), (2, "terceira")]
+    assert server.stats() == {"operations": 1, "polls": 1, "shards": 2}
+    server.cleanup(operation)
+
+
+def test_fake_operation_server_failure(make_pdf):
+    server = FakeOperationServer(fail=True)
+    operation = server.submit(make_pdf(["pagina"]))
+    with pytest.raises(RuntimeError):
+        server.poll(operation)
+
+
+def test_operation_on_extracted_pages(make_pdf, tmp_path):
+    path = make_pdf([f"pagina {n}" for n in range(7)])
+    pages = [1, 4, 5]
+    subset = str(tmp_path / "subset.pdf")
+    extract_pages(path, pages, subset)
+
+    server = FakeOperationServer()
+    operation = server.submit(subset)
+    wait_for(server, operation, poll_interval=0.01, timeout=5)
+    # A página `i` do PDF enviado é `pages[i]` do original
+    assert [(pages[index], text) for index, text in server.fetch(operation)] == [
+        (1, "pagina 1"), (4, "pagina 4"), (5, "pagina 5")]
+
+
+def test_split_pages_respects_limit():
+    runs = split_pages(list(range(4500)))
+    assert [len(run) for run in runs] == [2000, 2000, 500]
+    assert sum(runs, []) == list(range(4500))
@@ -0,0 +1,21 @@
+import fitz
+
+from cloud_ocr.dedup import page_signature
+
+
+def test_blank_page_is_blank(make_pdf):
+    document = fitz.open(make_pdf([""]))
+    assert page_signature(document[0]).blank
+
+
+def test_short_text_page_is_not_blank(make_pdf):
+    # Regressão: uma página nativa com uma linha curta (atestado) tinha pouca tinta e virava "em branco"
+    document = fitz.open(make_pdf(["CID M54.5"]))
+    assert not page_signature(document[0]).blank
+
+
+def test_same_page_same_hash(make_pdf):
+    document = fitz.open(make_pdf(["Receituario", "Receituario", "Receituario 2"]))
+    first, second, third = (page_signature(page) for page in document)
+    assert first.hash == second.hash
+    assert first.hash != third.hash
@@ -0,0 +1,13 @@
+import os
+
+from cloud_ocr.benchmark import benchmark_imports
+
+IMPORT_BUDGET_MS = 500  # mesmo orçamento do exemplo de `python -m cloud_ocr.benchmark imports`
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_workflow_import_budget(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    for row in benchmark_imports(("WorkFlow", "cloud_ocr", "Models")):
+        assert row["heavy_sdks"] == "-", row
+        assert row["import_ms"] < IMPORT_BUDGET_MS, row
@@ -0,0 +1,47 @@
+from cloud_ocr.journal import PageJournal
+
+
+def test_replay_resumes_pages(tmp_path):
+    path = str(tmp_path / "journal" / "processo.jsonl")
+    journal = PageJournal(path, "pdf-1")
+    assert journal.replay() == {}
+    journal.append(2, "ocr", "pagina tres")
+    journal.append(0, "text", "pagina um")
+    journal.append(2, "ocr", "pagina tres, de novo")
+    journal.close()
+
+    journal = PageJournal(path, "pdf-1")
+    assert journal.replay() == {0: ("text", "pagina um"), 2: ("ocr", "pagina tres, de novo")}
+    journal.append(1, "ocr", "pagina dois")
+    output = str(tmp_path / "processo.txt")
+    assert journal.assemble(output) == 3
+    journal.close()
+    with open(output, encoding="utf-8") as file:
+        assert file.read() == "pagina umpagina doispagina tres, de novo"
+
+
+def test_replay_drops_torn_line(tmp_path):
+    path = str(tmp_path / "processo.jsonl")
+    journal = PageJournal(path, "pdf-1")
+    journal.replay()
+    journal.append(0, "ocr", "inteira")
+    journal.append(1, "ocr", "cortada")
+    journal.close()
+    with open(path, "rb+") as file:
+        file.truncate(file.seek(0, 2) - 5)
+
+    journal = PageJournal(path, "pdf-1")
+    assert journal.replay() == {0: ("ocr", "inteira")}
+    journal.close()
+
+
+def test_replay_discards_other_pdf(tmp_path):
+    path = str(tmp_path / "processo.jsonl")
+    journal = PageJournal(path, "pdf-1")
+    journal.replay()
+    journal.append(0, "ocr", "texto antigo")
+    journal.close()
+
+    journal = PageJournal(path, "pdf-2")
+    assert journal.replay() == {}
+    journal.close()
@@ -0,0 +1,33 @@
+import pytest
+
+from cloud_ocr.layout import LayoutFile, LayoutWriter, pack_result, unpack_result
+
+WORDS = {
+    0: [(0, 0.98, 0.1, 0.1, 0.3, 0.12, "LAUDO"), (1, 0.4, 0.5, 0.5, 0.6, 0.52, "M54.5")],
+    3: [(0, 0.9, 0.2, 0.8, 0.4, 0.82, "12/03/2024"), (0, 0.95, 0.45, 0.8, 0.6, 0.82, "Médico")],
+}
+
+
+def test_layout_round_trip(tmp_path):
+    writer = LayoutWriter(str(tmp_path / "processo.layout.bin"))
+    writer.add_page(3, WORDS[3])
+    writer.add_page(0, WORDS[0])
+    path = writer.close()
+
+    with LayoutFile(path) as layout:
+        assert layout.pages() == [0, 3]
+        assert len(layout) == 4
+        for page_num, words in WORDS.items():
+            read = list(layout.words(page_num))
+            assert [word[4] for word in read] == [word[6] for word in words]
+            for (page, block, confidence, box, _), word in zip(read, words):
+                assert (page, block) == (page_num, word[0])
+                assert confidence == pytest.approx(word[1], abs=1e-6)
+                assert box == pytest.approx(word[2:6], abs=1e-4)
+        assert [word[4] for word in layout.words(max_confidence=0.5)] == ["M54.5"]
+
+
+def test_pack_result_round_trip():
+    text, words = unpack_result(pack_result("LAUDO M54.5", WORDS[0]))
+    assert text == "LAUDO M54.5"
+    assert [tuple(word) for word in words] == WORDS[0]
@@ -0,0 +1,25 @@
+from cloud_ocr.cloud_ocr import format_page
+from Models.map_reduce import plan_chunks
+
+
+def test_chunks_keep_pages_whole():
+    pages = [format_page(n, f"pagina {n} " + "x" * 200) for n in range(1, 11)]
+    chunks = plan_chunks("".join(pages), chunk_tokens=200, tokens_per_char=0.25)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 800 for chunk in chunks)
+    # Cada página inteira em um único trecho, com seus marcadores e na ordem do arquivo
+    assert "".join(chunks) == "".join(page.strip("\n") for page in pages)
+    for n in range(1, 11):
+        assert sum(f"Inicio da pagina {n} " in chunk and f"Fim da pagina {n} " in chunk for chunk in chunks) == 1
+
+
+def test_oversized_page_split_on_characters():
+    chunks = plan_chunks(format_page(1, "y" * 1000), chunk_tokens=100, tokens_per_char=0.25)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 400 for chunk in chunks)
+    assert sum(chunk.count("y") for chunk in chunks) == 1000
+
+
+def test_small_text_single_chunk():
+    page = format_page(1, "laudo")
+    assert plan_chunks(page, chunk_tokens=1000, tokens_per_char=0.25) == [page.strip("\n")]
@@ -0,0 +1,63 @@
+from cloud_ocr.cloud_ocr import format_page
+from cloud_ocr.dedup import BLANK_TEXT
+from cloud_ocr.normalize import normalize_text
+from cloud_ocr.scheduler import FAILED_TEXT
+
+HEADER = "PODER JUDICIARIO - JUSTICA FEDERAL"
+
+
+def test_repeated_header_kept_once():
+    text = "".join(format_page(n, f"{HEADER}\nconteudo da pagina {n}") for n in range(1, 5))
+    normalized, removed = normalize_text(text)
+    assert normalized.count(HEADER) == 1
+    assert removed == "\n".join([HEADER] * 3)
+    assert all(f"conteudo da pagina {n}" in normalized for n in range(1, 5))
+    assert normalized.count("------------ Inicio da pagina") == 4
+
+
+def test_hyphenated_words_joined():
+    normalized, _ = normalize_text(format_page(1, "incapaci-\ndade   laboral"))
+    assert "incapacidade laboral" in normalized
+
+
+def test_page_markers_never_removed():
+    # Regressão: os marcadores de página falha/em branco eram aprendidos como cabeçalho e apagados
+    pages = [FAILED_TEXT, BLANK_TEXT] * 3 + ["laudo"]
+    text = "".join(format_page(n, page) for n, page in enumerate(pages, 1))
+    normalized, removed = normalize_text(text)
+    assert removed == ""
+    assert normalized.count(FAILED_TEXT) == 3
+    assert normalized.count(BLANK_TEXT) == 3
+
+
+def test_rows_differing_in_numbers_survive():
+    # Regressão: linhas de tabela que só mudam nos números eram aprendidas como carimbo e apagadas
+    cnis = [
+        f"{n}{row} 12.345.678/0001-9{row} EMPRESA EXEMPLO COMERCIO LTDA 0{row}/201{n} 1.{n}{row}0,00 EMPREGADO"
+        for n in range(1, 7) for row in range(3)
+    ]
+    labs = [
+        f"Exame {n}{row} hemoglobina glicada resultado {n}{row} unidade {row} referencia ate {n} metodo HPLC"
+        for n in range(1, 7) for row in range(3)
+    ]
+    for rows in (cnis, labs):
+        text = "".join(format_page(n + 1, "\n".join(rows[3 * n:3 * n + 3])) for n in range(6))
+        normalized, removed = normalize_text(text)
+        assert removed == ""
+        assert all(row in normalized for row in rows)
+
+
+def test_repeated_rows_on_first_page_survive():
+    text = "".join(format_page(n, f"{HEADER}\n{HEADER}\nconteudo da pagina {n}") for n in range(1, 5))
+    normalized, removed = normalize_text(text)
+    assert normalized.count(HEADER) == 2 + 3
+    assert removed == "\n".join([HEADER] * 3)
+
+
+def test_stamp_with_changing_code_kept_once():
+    stamp = "Documento assinado eletronicamente, codigo verificador 7100{0}2345678v1, pagina {0} de 5"
+    text = "".join(format_page(n, f"conteudo da pagina {n}\n{stamp.format(n)}") for n in range(1, 6))
+    normalized, removed = normalize_text(text)
+    assert stamp.format(1) in normalized
+    assert all(stamp.format(n) not in normalized for n in range(2, 6))
+    assert all(f"conteudo da pagina {n}" in normalized for n in range(1, 6))
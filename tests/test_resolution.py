@@ -0,0 +1,44 @@
+import io
+
+import fitz
+from PIL import Image
+
+from cloud_ocr.encoding import page_image_bytes
+from cloud_ocr.resolution import RenderChoice, choose_render, is_low_confidence
+
+
+def test_typed_page_stays_at_72_dpi_in_grayscale():
+    document = fitz.open()
+    page = document.new_page()
+    for y in range(72, 760, 14):
+        page.insert_text((60, y), "Paciente apresenta dor lombar cronica, CID M54.5", fontsize=11)
+    assert choose_render(page) == (72, True)
+
+
+def test_fine_print_gets_more_dpi():
+    document = fitz.open()
+    page = document.new_page()
+    for y in range(60, 780, 8):
+        page.insert_text((50, y), "Hemograma completo leucocitos 5400 /mm3 referencia", fontsize=6)
+    assert choose_render(page)[0] > 100
+
+
+def test_embedded_image_skips_render_policy():
+    buffer = io.BytesIO()
+    Image.new("L", (620, 877), 230).save(buffer, "JPEG")
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_image(page.rect, stream=buffer.getvalue())
+
+    choice = RenderChoice()
+    content, content_format = page_image_bytes(page, render_options=choice)
+    assert content_format == "jpeg"
+    assert (choice.dpi, choice.grayscale) == (None, None)
+
+
+def test_short_text_retried_only_with_ink():
+    assert not is_low_confidence("Assinatura", ink=lambda: 0.0004)
+    assert is_low_confidence("Assinatura", ink=lambda: 0.05)
+    assert not is_low_confidence("Assinatura")
+    assert not is_low_confidence("Assinatura", [(0, 0.95, 0, 0, 1, 1, "Assinatura")], ink=lambda: 0.05)
+    assert is_low_confidence("Laudo " * 20, [(0, 0.4, 0, 0, 1, 1, "Laudo")])
@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+from cloud_ocr.scheduler import DocumentJob, PageScheduler
+
+
+def test_slow_open_does_not_stall_other_documents(make_pdf, tmp_path):
+    small = make_pdf([f"pagina {n}" for n in range(40)], "pequeno.pdf")
+    large = make_pdf([f"pagina {n}" for n in range(20)], "grande.pdf")
+    finished: list[tuple[str, float]] = []
+    opening: list[float] = []
+
+    def page_fn(job, page_num):
+        time.sleep(0.01)
+        finished.append((job.name, time.monotonic()))
+        return "ocr", f"pagina {page_num}"
+
+    def slow_priority(page):
+        # Ranquear um PDF grande leva segundos
+        opening.append(time.monotonic())
+        time.sleep(0.05)
+        return 0
+
+    scheduler = PageScheduler(page_fn, max_workers=2)
+    first = scheduler.submit(DocumentJob(small, str(tmp_path / "pequeno.txt")))
+    while not finished:
+        time.sleep(0.005)
+    second = scheduler.submit(DocumentJob(large, str(tmp_path / "grande.txt"),
+                                          journal_path=str(tmp_path / "grande.jsonl"), priority=slow_priority))
+    scheduler.wait()
+
+    assert first.error is None and second.error is None
+    assert os.path.exists(tmp_path / "pequeno.txt") and os.path.exists(tmp_path / "grande.txt")
+    start, end = opening[0], opening[-1]
+    during_open = [name for name, at in finished if start < at < end and name == "pequeno.pdf"]
+    assert len(during_open) > 2 * scheduler.max_workers
+
+
+def test_all_pages_written_in_order(make_pdf, tmp_path):
+    paths = [make_pdf([f"doc {d} pagina {n}" for n in range(5)], f"doc{d}.pdf") for d in range(6)]
+    scheduler = PageScheduler(lambda job, page_num: ("ocr", f"{job.name}:{page_num}\n"), max_workers=3,
+                              max_open_documents=2)
+    jobs = [scheduler.submit(DocumentJob(path, str(tmp_path / f"doc{d}.txt"))) for d, path in enumerate(paths)]
+    scheduler.wait()
+    for d, job in enumerate(jobs):
+        assert job.done.is_set() and job.error is None
+        with open(tmp_path / f"doc{d}.txt", encoding="utf-8") as file:
+            assert file.read() == "".join(f"doc{d}.pdf:{n}\n" for n in range(5))
@@ -0,0 +1,30 @@
+import fitz
+
+from cloud_ocr.text_layer import PAGE_OCR, PAGE_TEXT, classify_page
+
+STAMP = "Documento assinado eletronicamente por FULANO DE TAL, Perito, em 10/03/2023"
+
+
+def _png() -> bytes:
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 200, 200), False)
+    pixmap.clear_with(128)
+    return pixmap.tobytes("png")
+
+
+def test_short_page_without_images_uses_text_layer(make_pdf):
+    document = fitz.open(make_pdf(["Atestado: afastamento por 15 dias. CID M54.5", STAMP]))
+    assert classify_page(document[0]) == (PAGE_TEXT, "Atestado: afastamento por 15 dias. CID M54.5")
+    assert classify_page(document[1])[0] == PAGE_TEXT
+
+
+def test_scanned_page_with_stamp_goes_to_ocr():
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_image(page.rect, stream=_png())
+    page.insert_text((72, 820), STAMP, fontsize=8)
+    assert classify_page(page)[0] == PAGE_OCR
+
+
+def test_blank_page_goes_to_ocr(make_pdf):
+    document = fitz.open(make_pdf([""]))
+    assert classify_page(document[0]) == (PAGE_OCR, "")